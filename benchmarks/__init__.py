@@ -0,0 +1 @@
+"""Benchmarks of the framework itself, see `python -m benchmarks --help`"""
@@ -0,0 +1,58 @@
+"""
+Benchmark the framework's hot paths.
+
+    python -m benchmarks --output bench.json
+    python -m benchmarks --baseline bench.json --threshold 0.15
+    python -m benchmarks -k resolve --repetitions 15
+
+Each benchmark is calibrated to run at least --min-time seconds per
+repetition, warmed up, then timed --repetitions times with the garbage
+collector off. With --baseline, exits 1 when any median got slower than
+the baseline's by more than --threshold.
+"""
+
+import argparse
+import sys
+from typing import Optional, Sequence
+
+import benchmarks.bench_framework  # noqa: F401  (registers the benchmarks)
+from benchmarks import harness
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-k", dest="pattern", default="", help="only names containing")
+    parser.add_argument("--repetitions", type=int, default=7)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--min-time", type=float, default=0.05)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument("--list", action="store_true", help="list benchmarks")
+    args = parser.parse_args(argv)
+
+    names = [name for name in harness.list_benchmarks() if args.pattern in name]
+    if args.list:
+        print("\n".join(names))
+        return 0
+
+    print(f"{'benchmark':<32}{'median':>12}{'min':>12}{'stdev':>9}{'ops/s':>14}")
+    results = []
+    for name in names:
+        result = harness.run(name, args.repetitions, args.warmup, args.min_time)
+        print(harness.format_result(result), flush=True)
+        results.append(result)
+
+    if args.output:
+        harness.dump(results, args.output)
+    if args.baseline:
+        slower = harness.regressions(results, args.baseline, args.threshold)
+        for name, ratio in sorted(slower.items()):
+            print(f"REGRESSION {name}: {ratio:.2f}x the baseline median")
+        if slower:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
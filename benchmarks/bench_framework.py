@@ -0,0 +1,196 @@
+"""Benchmarks of the framework's hot paths; registered on import"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+import simply_serve
+from benchmarks.harness import benchmark
+from src.api_clients.simple_client import HTTPClient
+from src.case_runner import CaseRunner
+from src.functions.function_pool import FunctionPool
+from src.utils import suite_cache
+from src.utils.allure_utils import register_case_reporter, unregister_case_reporter
+from src.utils.case_utils import CaseResult, TestCase, _parse_step, load_test_cases
+from src.utils.matchers import get_matcher
+from src.utils.report import ReportLevel, get_report_level, set_report_level
+
+SUITE_CASES = 500
+
+
+def _suite(cases: int = SUITE_CASES) -> dict:
+    return {
+        "description": "benchmark suite",
+        "test_cases": [
+            {
+                "description": f"case {i}",
+                "variables": {"base": i},
+                "steps": [
+                    {
+                        "function": "int_add",
+                        "input_args": [i, "${base}"],
+                        "expected_result": 2 * i,
+                        "save_result_to": "sum",
+                    },
+                    {
+                        "function": "echo",
+                        "input_kwargs": {"id": "${sum}", "items": list(range(10))},
+                        "expected_result": "${sum}",
+                        "expected_key": "id",
+                    },
+                ],
+            }
+            for i in range(cases)
+        ],
+    }
+
+
+def _payload(depth: int = 4, width: int = 6) -> dict:
+    """Nested request body with a placeholder in every leaf"""
+    if depth == 0:
+        return {f"k{i}": f"${{v{i}}}" if i % 2 else "id-${v0}" for i in range(width)}
+    return {f"n{i}": _payload(depth - 1, width) for i in range(width)}
+
+
+def _with_tmpdir(op, tmpdir):
+    op.close = lambda: shutil.rmtree(tmpdir, ignore_errors=True)
+    return op
+
+
+def _suite_file() -> str:
+    tmpdir = tempfile.mkdtemp(prefix="simplytest-bench-")
+    path = os.path.join(tmpdir, "suite.json")
+    with open(path, "w") as f:
+        json.dump(_suite(), f)
+    return path
+
+
+@benchmark("suite_load.parse")
+def suite_load_parse():
+    path = _suite_file()
+
+    def op():
+        os.environ[suite_cache.SUITE_CACHE_ENV] = "0"
+        try:
+            load_test_cases(path)
+        finally:
+            del os.environ[suite_cache.SUITE_CACHE_ENV]
+
+    return _with_tmpdir(op, os.path.dirname(path))
+
+
+@benchmark("suite_load.cached")
+def suite_load_cached():
+    path = _suite_file()
+    cache = os.path.join(os.path.dirname(path), "cache")
+
+    def op():
+        os.environ[suite_cache.CACHE_DIR_ENV] = cache
+        try:
+            load_test_cases(path)
+        finally:
+            del os.environ[suite_cache.CACHE_DIR_ENV]
+
+    op()  # populate the cache
+    return _with_tmpdir(op, os.path.dirname(path))
+
+
+def _runner_with_context(variables: dict) -> CaseRunner:
+    runner = CaseRunner(FunctionPool())
+    runner.ctx = CaseResult(case=None, variables=variables)
+    return runner
+
+
+@benchmark("resolve.adhoc")
+def resolve_adhoc():
+    """Template compiled on every call, as _resolve_variables does"""
+    payload = _payload()
+    runner = _runner_with_context({f"v{i}": i for i in range(6)})
+    return lambda: runner._resolve_variables(payload)
+
+
+@benchmark("resolve.precompiled")
+def resolve_precompiled():
+    """Templates compiled at load time, as steps resolve their inputs"""
+    step = _parse_step({"function": "echo", "input_kwargs": _payload()})
+    runner = _runner_with_context({f"v{i}": i for i in range(6)})
+    return lambda: runner._resolve_step_input(step)
+
+
+@benchmark("matcher.lookup")
+def matcher_lookup():
+    get_matcher("equal_to")
+    return lambda: get_matcher("has_length")
+
+
+@benchmark("matcher.assert")
+def matcher_assert():
+    runner = CaseRunner(FunctionPool())
+    actual = {"items": list(range(100)), "id": "abc"}
+    expected = {"items": list(range(100)), "id": "abc"}
+    return lambda: runner._perform_assertion(actual, expected, "equal_to")
+
+
+def _reported_case(level: ReportLevel):
+    tmpdir = tempfile.mkdtemp(prefix="simplytest-allure-")
+    case_reporter = register_case_reporter(tmpdir)
+    previous_level = get_report_level()
+    set_report_level(level)
+
+    pool = FunctionPool()
+    pool.register(
+        "build", lambda n: {"rows": [{"id": i, "name": f"row {i}"} for i in range(n)]}
+    )
+    step = _parse_step(
+        {"function": "build", "input_args": [200], "expected_key": "rows[0].id"}
+    )
+    test_case = TestCase(steps=[step], description="report overhead")
+    runner = CaseRunner(pool)
+    runner.case_history = None  # thousands of repeats of a made-up case
+
+    def op():
+        with case_reporter.test_case("bench", "bench::report"):
+            runner.execute_test_case(test_case)
+
+    def close():
+        set_report_level(previous_level)
+        unregister_case_reporter(case_reporter)
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    op.close = close
+    return op
+
+
+@benchmark("allure.case_full")
+def allure_case_full():
+    return _reported_case(ReportLevel.FULL)
+
+
+@benchmark("allure.case_off")
+def allure_case_off():
+    return _reported_case(ReportLevel.OFF)
+
+
+@benchmark("http.echo_roundtrip")
+def http_echo_roundtrip():
+    server = simply_serve.make_server("localhost", 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = HTTPClient(f"http://localhost:{server.server_address[1]}")
+    previous_level = get_report_level()
+    set_report_level(ReportLevel.OFF)
+    body = {"id": 1, "items": list(range(20))}
+
+    def op():
+        client.echo(body)
+
+    def close():
+        set_report_level(previous_level)
+        client.close()
+        server.shutdown()
+        server.server_close()
+
+    op.close = close
+    return op
@@ -0,0 +1,161 @@
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from contextlib import redirect_stdout
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional
+
+import src
+
+# a benchmark's setup returns the operation to time; setup runs once and is
+# not timed, so fixtures (files, servers, payloads) belong there
+Setup = Callable[[], Callable[[], object]]
+
+_benchmarks: Dict[str, Setup] = {}
+
+
+def benchmark(name: str) -> Callable[[Setup], Setup]:
+    def register(setup: Setup) -> Setup:
+        if name in _benchmarks:
+            raise ValueError(f'benchmark "{name}" is already registered')
+        _benchmarks[name] = setup
+        return setup
+
+    return register
+
+
+def list_benchmarks() -> List[str]:
+    return sorted(_benchmarks)
+
+
+@dataclass
+class Result:
+    """Per-operation timings in seconds over all repetitions"""
+
+    name: str
+    number: int  # operations per repetition
+    repetitions: int
+    median: float
+    mean: float
+    min: float
+    stdev: float
+
+    @property
+    def ops_per_second(self) -> float:
+        return 1 / self.median if self.median else float("inf")
+
+
+def _time(op: Callable[[], object], number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        op()
+    return time.perf_counter() - start
+
+
+def _calibrate(op: Callable[[], object], min_time: float) -> int:
+    """Smallest power of two of calls that runs at least `min_time` seconds"""
+    number = 1
+    while _time(op, number) < min_time and number < 1 << 20:
+        number *= 2
+    return number
+
+
+def run(
+    name: str,
+    repetitions: int = 7,
+    warmup: int = 1,
+    min_time: float = 0.05,
+) -> Result:
+    # keep runner logs and anything step functions print out of the table
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        return _run(name, repetitions, warmup, min_time)
+
+
+def _run(name: str, repetitions: int, warmup: int, min_time: float) -> Result:
+    op = _benchmarks[name]()
+    try:
+        number = _calibrate(op, min_time)
+        for _ in range(warmup):
+            _time(op, number)
+        # like timeit: keep collections from landing in random repetitions
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            times = [_time(op, number) / number for _ in range(repetitions)]
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+    finally:
+        close = getattr(op, "close", None)
+        if close is not None:
+            close()
+    return Result(
+        name=name,
+        number=number,
+        repetitions=repetitions,
+        median=statistics.median(times),
+        mean=statistics.fmean(times),
+        min=min(times),
+        stdev=statistics.stdev(times) if len(times) > 1 else 0.0,
+    )
+
+
+def environment() -> Dict[str, str]:
+    return {
+        "framework": src.__version__,
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def dump(results: List[Result], path: str):
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "environment": environment(),
+                "results": {result.name: asdict(result) for result in results},
+            },
+            f,
+            indent=2,
+        )
+
+
+def regressions(
+    results: List[Result], baseline_path: str, threshold: float
+) -> Dict[str, float]:
+    """
+    Benchmarks whose median got slower than the baseline's by more than
+    `threshold` (0.1 = 10%), mapped to their slowdown ratio
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    slower = {}
+    for result in results:
+        previous: Optional[dict] = baseline.get(result.name)
+        if not previous or not previous["median"]:
+            continue
+        ratio = result.median / previous["median"]
+        if ratio > 1 + threshold:
+            slower[result.name] = ratio
+    return slower
+
+
+def format_result(result: Result) -> str:
+    return (
+        f"{result.name:<32}{_human(result.median):>12}{_human(result.min):>12}"
+        f"{result.stdev / result.median * 100 if result.median else 0:>8.1f}%"
+        f"{result.ops_per_second:>14,.0f}"
+    )
+
+
+def _human(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.0f}ns"
@@ -1,46 +1,179 @@
-from http.server import HTTPServer, BaseHTTPRequestHandler
+"""
+Local mock target for the test suites: a threaded HTTP/1.1 server with
+keep-alive, JSON-defined routes and per-route latency/error injection.
+
+    python simply_serve.py --port 8000 --routes routes.json
+
+A routes file holds a list of routes, each matched on method and path:
+
+    [
+        {"method": "GET", "path": "/api/items", "body": {"items": []}},
+        {"method": "POST", "path": "/api/echo", "echo": true,
+         "latency": 0.05, "latency_jitter": 0.01, "error_rate": 0.1},
+        {"method": "GET", "path": "/api/flaky", "drop_rate": 0.5}
+    ]
+
+`latency` and `latency_jitter` are in seconds. `error_rate` is the share of
+requests answered with `error_status`, `drop_rate` the share whose
+connection is closed without any response. Routes from the file are added
+to (or replace) the built-in `/`, `/api/health` and `/api/echo`.
+"""
+
+import argparse
 import json
+import random
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+HOST = "localhost"
+PORT = 8000
+
+
+@dataclass
+class Route:
+    method: str
+    path: str
+    status: int = 200
+    body: Any = None
+    # reply with the request body instead of `body`
+    echo: bool = False
+    content_type: str = "application/json"
+    headers: Dict[str, str] = field(default_factory=dict)
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 500
+    drop_rate: float = 0.0
+
+    def delay(self) -> float:
+        if not self.latency_jitter:
+            return self.latency
+        return max(self.latency + random.uniform(-1, 1) * self.latency_jitter, 0.0)
+
+
+DEFAULT_ROUTES = [
+    Route("GET", "/", body="<h1>Hello World!</h1>", content_type="text/html"),
+    Route(
+        "GET",
+        "/api/health",
+        body={"health": "healthy", "message": "Server is running"},
+    ),
+    Route("POST", "/api/echo", echo=True),
+]
+
+
+def load_routes(path: str) -> List[Route]:
+    with open(path) as f:
+        return [Route(**{"method": "GET", **route}) for route in json.load(f)]
+
+
+def _encode(body: Any, content_type: str) -> bytes:
+    if isinstance(body, bytes):
+        return body
+    if content_type == "application/json":
+        return json.dumps(body).encode()
+    return str(body).encode()
 
 
 class Handler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        if self.path == "/":
-            self.send_response(200)
-            self.send_header("Content-type", "text/html")
-            self.end_headers()
-            self.wfile.write(b"<h1>Hello World!</h1>")
-        elif self.path == "/api/health":
-            self.send_response(200)
-            self.send_header("Content-type", "application/json")
-            self.end_headers()
-            response = {"health": "healthy", "message": "Server is running"}
-            self.wfile.write(json.dumps(response).encode())
-        else:
-            self.send_response(404)
-            self.end_headers()
-            self.wfile.write(b"Not Found")
+    # keep-alive needs HTTP/1.1 and a Content-Length on every response
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
 
-    def do_POST(self):
-        if self.path == "/api/echo":
-            content_length = int(self.headers["Content-Length"])
-            post_data = self.rfile.read(content_length)
+    routes: Dict[Tuple[str, str], Route] = {}
+    quiet = True
 
-            self.send_response(200)
-            self.send_header("Content-type", "application/json")
-            self.end_headers()
+    def _handle(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request_body = self.rfile.read(length) if length else b""
 
-            try:
-                response = json.loads(post_data)
-            except Exception:
-                response = post_data.decode()
+        route = self.routes.get((self.command, self.path.split("?", 1)[0]))
+        if route is None:
+            self._send(404, b"Not Found", "text/plain")
+            return
 
-            self.wfile.write(json.dumps(response).encode())
+        delay = route.delay()
+        if delay:
+            time.sleep(delay)
+        if route.drop_rate and random.random() < route.drop_rate:
+            self.close_connection = True
+            return
+        if route.error_rate and random.random() < route.error_rate:
+            error = {"error": "injected failure", "path": route.path}
+            self._send(route.error_status, _encode(error, "application/json"))
+            return
+
+        if route.echo:
+            try:
+                body = json.dumps(json.loads(request_body)).encode()
+            except ValueError:
+                body = json.dumps(request_body.decode(errors="replace")).encode()
         else:
-            self.send_response(404)
-            self.end_headers()
+            body = _encode(route.body, route.content_type)
+        self._send(route.status, body, route.content_type, route.headers)
+
+    def _send(
+        self,
+        status: int,
+        body: bytes,
+        content_type: str = "application/json",
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+
+    def log_message(self, format, *args):
+        # per-request logging to stderr costs more than serving the request
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def make_server(
+    host: str = HOST,
+    port: int = PORT,
+    routes: Optional[List[Route]] = None,
+    quiet: bool = True,
+) -> Server:
+    """Build a server for DEFAULT_ROUTES plus `routes`; port 0 picks a free one"""
+    table = {(route.method, route.path): route for route in DEFAULT_ROUTES}
+    for route in routes or []:
+        table[route.method.upper(), route.path] = route
+    handler = type("Handler", (Handler,), {"routes": table, "quiet": quiet})
+    return Server((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--routes", help="JSON file with extra routes")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log requests")
+    args = parser.parse_args(argv)
+
+    routes = load_routes(args.routes) if args.routes else []
+    server = make_server(args.host, args.port, routes, quiet=not args.verbose)
+    print(f"Server running on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
 
 
 if __name__ == "__main__":
-    server = HTTPServer(("localhost", 8000), Handler)
-    print("Server running on http://localhost:8000")
-    server.serve_forever()
+    main()
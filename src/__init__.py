@@ -2,8 +2,29 @@
 JSON-based pytest test framework
 """
 
-from src.functions.function_pool import FunctionPool
-from src.case_runner import CaseRunner
-from src.utils.case_utils import TestCase, TestStep
+__version__ = "0.1.0"
 
-__all__ = ["FunctionPool", "CaseRunner", "TestCase", "TestStep"]
+from src.utils.lazy import lazy_exports
+
+# imported on first access: `import src` alone stays cheap, which matters
+# when CI spawns many short-lived pytest processes
+__getattr__ = lazy_exports(
+    globals(),
+    {
+        "FunctionPool": "src.functions.function_pool",
+        "CaseRunner": "src.case_runner",
+        "AsyncCaseRunner": "src.async_case_runner",
+        "TestCase": "src.utils.case_utils",
+        "TestStep": "src.utils.case_utils",
+        "register_matcher": "src.utils.matchers",
+    },
+)
+
+__all__ = [
+    "FunctionPool",
+    "CaseRunner",
+    "AsyncCaseRunner",
+    "TestCase",
+    "TestStep",
+    "register_matcher",
+]
@@ -0,0 +1,10 @@
+from src.utils.lazy import lazy_exports
+
+# the shared clients, importing requests / httpx only when first used
+__getattr__ = lazy_exports(
+    globals(),
+    {
+        "my_client": "src.api_clients.simple_client",
+        "my_async_client": "src.api_clients.async_client",
+    },
+)
@@ -0,0 +1,203 @@
+import asyncio
+import time
+import httpx
+import allure
+from typing import AsyncIterator, Dict, Optional, Set
+
+from src.api_clients.cassette import REPLAY, Cassette, Interaction, cassette_from_env
+from src.api_clients.circuit import CircuitBreaker, circuit_breaker
+from src.api_clients.simple_client import (
+    BASE_URL,
+    CHUNK_SIZE,
+    POOL_MAXSIZE,
+    BaseClient,
+    attach_body,
+    parsed_json,
+)
+from src.utils.lazy import lazy_singletons
+from src.utils.report import attach, dumps, report
+from src.utils import timing
+
+_SEND_FIELDS = ("auth", "follow_redirects")
+# what requests reports as ConnectionError, for the circuit breaker
+_CONNECTION_ERRORS = (httpx.NetworkError, httpx.ConnectTimeout)
+
+
+async def _aiter_body(
+    response: httpx.Response, chunk_size: int
+) -> AsyncIterator[bytes]:
+    try:
+        async for chunk in response.aiter_bytes(chunk_size):
+            yield chunk
+    finally:
+        await response.aclose()
+
+
+class AsyncHTTPClient(BaseClient):
+    """httpx-backed asyncio counterpart of HTTPClient"""
+
+    def __init__(
+        self,
+        base_url=BASE_URL,
+        max_connections: int = POOL_MAXSIZE * 10,
+        max_keepalive_connections: int = POOL_MAXSIZE,
+        timeout: Optional[float] = 30.0,
+        cassette: Optional[Cassette] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        super().__init__(base_url)
+        self.cassette = cassette if cassette is not None else cassette_from_env()
+        self.breaker = breaker or circuit_breaker
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self.timeout = timeout
+        self._clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+        # asyncio only keeps weak references to tasks
+        self._closers: Set[asyncio.Task] = set()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # httpx pools are bound to the event loop that opened them, so each
+        # loop (e.g. each asyncio.run) gets an AsyncClient of its own, closed
+        # before that loop is
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+            self._clients[loop] = client
+            closer = loop.create_task(self._close_at_shutdown(loop, client))
+            self._closers.add(closer)
+            closer.add_done_callback(self._closers.discard)
+        return client
+
+    async def _close_at_shutdown(
+        self, loop: asyncio.AbstractEventLoop, client: httpx.AsyncClient
+    ):
+        # asyncio.run cancels the tasks left over before it closes the loop
+        try:
+            await loop.create_future()
+        finally:
+            if self._clients.get(loop) is client:
+                del self._clients[loop]
+            await client.aclose()
+
+    async def aclose(self):
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    def _attach_allure(self, response: httpx.Response, streamed: bool = False):
+        request = response.request
+        with allure.step(f"{request.method.upper()} {request.url}"):
+            allure.attach(
+                dumps(dict(request.headers)),
+                name="HTTP Request Headers",
+                attachment_type=allure.attachment_type.JSON,
+            )
+            attach_body("HTTP Request Body", request.content, request.headers)
+            allure.attach(
+                dumps(dict(response.headers)),
+                name="Response Headers",
+                attachment_type=allure.attachment_type.JSON,
+            )
+            allure.attach(
+                str(response.status_code),
+                name="HTTP Status Code",
+                attachment_type=allure.attachment_type.TEXT,
+            )
+            if streamed:
+                attach("(streamed to the step, not kept)", "Response Body")
+            else:
+                attach_body(
+                    "Response Body", response.content, response.headers, response
+                )
+
+    async def _request(self, method, endpoint, **kwargs):
+        url = self.base_url + endpoint
+        headers = {**self.headers, **kwargs.pop("headers", {})}
+        streamed = kwargs.pop("stream", False)
+        start = time.perf_counter()
+        if self.cassette is not None and self.cassette.mode == REPLAY:
+            request = self.client.build_request(method, url, headers=headers, **kwargs)
+            interaction = self.cassette.lookup(
+                request.method, str(request.url), request.content
+            )
+            response = httpx.Response(
+                interaction.status,
+                headers=interaction.headers,
+                content=interaction.body,
+                request=request,
+            )
+        else:
+            # what AsyncClient.request() hands to send() rather than the request
+            send_kwargs = {
+                name: kwargs.pop(name) for name in _SEND_FIELDS if name in kwargs
+            }
+            request = self.client.build_request(method, url, headers=headers, **kwargs)
+            with self.breaker.guard(self.base_url, _CONNECTION_ERRORS):
+                response = await self.client.send(
+                    request, stream=streamed, **send_kwargs
+                )
+            if self.cassette is not None:
+                if streamed:
+                    await response.aread()  # recording needs the whole body
+                self.cassette.record(
+                    response.request.method,
+                    str(response.request.url),
+                    response.request.content,
+                    Interaction(
+                        response.status_code,
+                        response.reason_phrase,
+                        dict(response.headers),
+                        response.content,
+                    ),
+                )
+        timing.record(timing.HTTP, time.perf_counter() - start)
+        report(lambda: self._attach_allure(response, streamed))
+        return response
+
+    async def get(self, endpoint, **kwargs):
+        return await self._request("get", endpoint, **kwargs)
+
+    async def post(self, endpoint, **kwargs):
+        return await self._request("post", endpoint, **kwargs)
+
+    async def put(self, endpoint, **kwargs):
+        return await self._request("put", endpoint, **kwargs)
+
+    async def delete(self, endpoint, **kwargs):
+        return await self._request("delete", endpoint, **kwargs)
+
+    async def patch(self, endpoint, **kwargs):
+        return await self._request("patch", endpoint, **kwargs)
+
+    async def stream(
+        self, method, endpoint, chunk_size: int = CHUNK_SIZE, **kwargs
+    ) -> AsyncIterator[bytes]:
+        """HTTPClient.stream(), as an async iterator"""
+        response = await self._request(method, endpoint, stream=True, **kwargs)
+        return _aiter_body(response, chunk_size)
+
+    async def body_view(self, method, endpoint, **kwargs) -> memoryview:
+        response = await self._request(method, endpoint, **kwargs)
+        return memoryview(response.content)
+
+    async def echo(self, *args, **kwargs):
+        param = args[0] if args else kwargs
+        response = await self.post("/api/echo", json=param)
+        return parsed_json(response)
+
+    async def health_check(self):
+        response = await self.get("/api/health")
+        return parsed_json(response)
+
+
+__getattr__ = lazy_singletons(globals(), my_async_client=AsyncHTTPClient)
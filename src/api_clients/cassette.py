@@ -0,0 +1,291 @@
+"""
+Recorded HTTP interactions, for running suites without a live target.
+
+SIMPLYTEST_HTTP_MODE selects what the HTTP clients do:
+
+    live    send every request (default)
+    record  send every request and store the responses in the cassette
+    replay  answer every request from the cassette, without any I/O
+
+SIMPLYTEST_CASSETTE is the cassette file (default cassettes/http.cassette).
+Interactions are matched on method, URL and a hash of the request body
+(JSON bodies compared by content); headers are not part of the match.
+
+File layout: a 16 byte header (magic, slot count, entry count), an open
+addressing hash table of 32 byte slots (16 byte key digest, offset,
+length), then the records. Replay memory-maps the file and probes the
+table, so opening is constant time and a lookup touches a slot or two and
+the one record it returns.
+"""
+
+import atexit
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Union
+
+from src.utils.files import atomic_write
+
+HTTP_MODE_ENV = "SIMPLYTEST_HTTP_MODE"
+CASSETTE_ENV = "SIMPLYTEST_CASSETTE"
+DEFAULT_CASSETTE = "cassettes/http.cassette"
+
+LIVE, RECORD, REPLAY = "live", "record", "replay"
+MODES = (LIVE, RECORD, REPLAY)
+
+_MAGIC = b"SMPLCAS1"
+_HEADER = struct.Struct("<8sII")
+_SLOT = struct.Struct("<16sQI4x")
+_META_LENGTH = struct.Struct("<I")
+_EMPTY = bytes(16)
+
+
+class Interaction(NamedTuple):
+    status: int
+    reason: str
+    headers: Dict[str, str]
+    body: bytes
+
+
+class CassetteMiss(LookupError):
+    """A replayed request that was never recorded"""
+
+
+def _canonical_body(body: Union[bytes, str, None]) -> bytes:
+    if isinstance(body, str):
+        body = body.encode()
+    if body and body[:1] in (b"{", b"["):
+        # requests and httpx serialize JSON with different separators
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return body
+        return json.dumps(data, sort_keys=True, separators=(",", ":")).encode()
+    return body or b""
+
+
+def interaction_key(method: str, url: str, body: Union[bytes, str, None]) -> bytes:
+    body = _canonical_body(body)
+    body_hash = hashlib.sha256(body).digest()
+    key = f"{method.upper()}\0{url}\0".encode() + body_hash
+    return hashlib.sha256(key).digest()[:16]
+
+
+def _encode(interaction: Interaction) -> bytes:
+    meta = json.dumps(
+        {
+            "status": interaction.status,
+            "reason": interaction.reason,
+            "headers": interaction.headers,
+        },
+        separators=(",", ":"),
+    ).encode()
+    return _META_LENGTH.pack(len(meta)) + meta + interaction.body
+
+
+def _decode(record: bytes) -> Interaction:
+    (meta_length,) = _META_LENGTH.unpack_from(record)
+    meta_end = _META_LENGTH.size + meta_length
+    meta = json.loads(record[_META_LENGTH.size : meta_end])
+    return Interaction(
+        meta["status"], meta["reason"], meta["headers"], record[meta_end:]
+    )
+
+
+class Cassette:
+    def __init__(self, path: Union[str, Path], mode: str = REPLAY):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f'"{mode}" is not a cassette mode ({RECORD}, {REPLAY})')
+        self.path = Path(path)
+        self.mode = mode
+        self._map: Optional[mmap.mmap] = None
+        self._slots = 0
+        # record mode: everything recorded so far, and what of it is not
+        # yet saved (or drained to another process)
+        self._recorded: Dict[bytes, bytes] = {}
+        self._new: Dict[bytes, bytes] = {}
+        self._lock = threading.Lock()
+        if mode == REPLAY:
+            self._open()
+        else:
+            self._recorded.update(self._read())
+            atexit.register(self.save)
+
+    def _open(self):
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._slots, _ = _HEADER.unpack_from(self._map)
+        if magic != _MAGIC:
+            raise ValueError(f"{self.path} is not a cassette")
+
+    def _read(self) -> Dict[bytes, bytes]:
+        """The records on tape now, keyed by digest; empty without a file"""
+        if not self.path.exists():
+            return {}
+        self._open()
+        try:
+            return dict(self._items())
+        finally:
+            self.close()
+
+    def _items(self):
+        for index in range(self._slots):
+            digest, offset, length = _SLOT.unpack_from(
+                self._map, _HEADER.size + index * _SLOT.size
+            )
+            if digest != _EMPTY:
+                yield digest, self._map[offset : offset + length]
+
+    def __len__(self) -> int:
+        if self.mode == RECORD:
+            return len(self._recorded)
+        return _HEADER.unpack_from(self._map)[2]
+
+    def lookup(self, method: str, url: str, body=None) -> Interaction:
+        digest = interaction_key(method, url, body)
+        if self.mode == RECORD:
+            with self._lock:
+                record = self._recorded.get(digest)
+            if record is None:
+                raise CassetteMiss(f"{method.upper()} {url} is not recorded")
+            return _decode(record)
+
+        mask = self._slots - 1
+        index = int.from_bytes(digest[:8], "little") & mask
+        while True:
+            slot_digest, offset, length = _SLOT.unpack_from(
+                self._map, _HEADER.size + index * _SLOT.size
+            )
+            if slot_digest == digest:
+                return _decode(self._map[offset : offset + length])
+            if slot_digest == _EMPTY:
+                raise CassetteMiss(
+                    f"{method.upper()} {url} is not in cassette {self.path}"
+                )
+            index = (index + 1) & mask
+
+    def record(self, method: str, url: str, body, interaction: Interaction):
+        if self.mode != RECORD:
+            raise RuntimeError("cassette is not in record mode")
+        # clients hand over the decoded body, so it is no longer compressed
+        headers = {
+            name: value
+            for name, value in interaction.headers.items()
+            if name.lower() not in ("content-encoding", "content-length")
+        }
+        headers["Content-Length"] = str(len(interaction.body))
+        interaction = interaction._replace(headers=headers)
+        self.extend({interaction_key(method, url, body): _encode(interaction)})
+
+    def drain(self) -> Dict[bytes, bytes]:
+        """
+        Take the records not saved yet (e.g. to ship them to another
+        process), so this cassette won't write them itself
+        """
+        with self._lock:
+            records, self._new = self._new, {}
+        return records
+
+    def extend(self, records: Dict[bytes, bytes]):
+        with self._lock:
+            self._recorded.update(records)
+            self._new.update(records)
+
+    def save(self):
+        """
+        Write the recorded interactions; a no-op when nothing is new.
+        Records another process saved in the meantime are kept.
+        """
+        with self._lock:
+            if not self._new:
+                return
+            self._new = {}
+        # re-read, so processes saving one after the other don't drop records
+        on_tape = self._read()
+        with self._lock:
+            on_tape.update(self._recorded)
+            self._recorded = on_tape
+            records = list(on_tape.items())
+        # at most half full, so probes stay short
+        slots = 8
+        while slots < 2 * len(records):
+            slots *= 2
+        table = bytearray(slots * _SLOT.size)
+        offset = _HEADER.size + len(table)
+        for digest, record in records:
+            index = int.from_bytes(digest[:8], "little") & (slots - 1)
+            while table[index * _SLOT.size : index * _SLOT.size + 16] != _EMPTY:
+                index = (index + 1) & (slots - 1)
+            _SLOT.pack_into(table, index * _SLOT.size, digest, offset, len(record))
+            offset += len(record)
+
+        header = _HEADER.pack(_MAGIC, slots, len(records))
+        atomic_write(
+            self.path, b"".join([header, table, *(record for _, record in records)])
+        )
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+_cassettes: Dict[Path, Cassette] = {}
+_cassettes_lock = threading.Lock()
+
+
+def http_mode() -> str:
+    mode = os.environ.get(HTTP_MODE_ENV, LIVE).lower()
+    if mode not in MODES:
+        raise ValueError(f'{HTTP_MODE_ENV}="{mode}" is not one of {", ".join(MODES)}')
+    return mode
+
+
+def cassette_from_env() -> Optional[Cassette]:
+    """
+    The cassette selected by the environment, shared by every client in the
+    process; None in live mode
+    """
+    mode = http_mode()
+    if mode == LIVE:
+        return None
+    return _shared(Path(os.environ.get(CASSETTE_ENV, DEFAULT_CASSETTE)), mode)
+
+
+def _shared(path: Path, mode: str) -> Cassette:
+    with _cassettes_lock:
+        if path not in _cassettes:
+            _cassettes[path] = Cassette(path, mode)
+        return _cassettes[path]
+
+
+def _recording() -> List[Cassette]:
+    with _cassettes_lock:
+        return [c for c in _cassettes.values() if c.mode == RECORD]
+
+
+def drain_recordings() -> Dict[str, Dict[bytes, bytes]]:
+    """
+    Cassette path -> records taken from this process's recording cassettes,
+    for the process that saves them (see Cassette.drain)
+    """
+    recordings = {}
+    for cassette in _recording():
+        records = cassette.drain()
+        if records:
+            recordings[str(cassette.path)] = records
+    return recordings
+
+
+def extend_recordings(recordings: Dict[str, Dict[bytes, bytes]]):
+    for path, records in recordings.items():
+        _shared(Path(path), RECORD).extend(records)
+
+
+def save_recordings():
+    for cassette in _recording():
+        cassette.save()
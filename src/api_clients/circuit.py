@@ -0,0 +1,121 @@
+"""
+Fail fast once a target stops accepting connections.
+
+The HTTP clients count consecutive connection failures per base URL. After
+SIMPLYTEST_CIRCUIT_THRESHOLD of them (0, the default, turns this off) the
+circuit opens: every request to that base URL raises CircuitOpenError at
+once instead of waiting for its own connect timeout and retries. After
+SIMPLYTEST_CIRCUIT_COOLDOWN seconds (default 30) one request is let
+through; if it gets a response the circuit closes again.
+
+CircuitOpenError is a unittest.SkipTest, so the case that hits it is
+reported as skipped (by pytest too) and it is never retried. Each process
+has its own breaker: parallel_runner workers trip independently.
+"""
+
+import os
+import threading
+import time
+import unittest
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple, Type
+
+CIRCUIT_THRESHOLD_ENV = "SIMPLYTEST_CIRCUIT_THRESHOLD"
+CIRCUIT_COOLDOWN_ENV = "SIMPLYTEST_CIRCUIT_COOLDOWN"
+DEFAULT_COOLDOWN = 30.0
+
+
+class CircuitOpenError(unittest.SkipTest):
+    """A request not sent because its base URL keeps refusing connections"""
+
+
+class _Circuit:
+    __slots__ = ("failures", "opened_at", "probing", "last_error")
+
+    def __init__(self):
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self.last_error = ""
+
+
+class CircuitBreaker:
+    def __init__(
+        self, threshold: Optional[int] = None, cooldown: Optional[float] = None
+    ):
+        if threshold is None:
+            threshold = int(os.environ.get(CIRCUIT_THRESHOLD_ENV, 0))
+        if cooldown is None:
+            cooldown = float(os.environ.get(CIRCUIT_COOLDOWN_ENV, DEFAULT_COOLDOWN))
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._circuits: Dict[str, _Circuit] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def check(self, base_url: str):
+        """Raise CircuitOpenError unless a request to `base_url` may be sent"""
+        if not self.enabled:
+            return
+        with self._lock:
+            circuit = self._circuits.get(base_url)
+            if circuit is None or circuit.opened_at is None:
+                return
+            waited = time.monotonic() - circuit.opened_at
+            if waited >= self.cooldown and not circuit.probing:
+                circuit.probing = True  # this request finds out if it is back
+                return
+            message = (
+                f"{base_url} is unreachable ({circuit.failures} connection"
+                f" failures, last: {circuit.last_error}); request not sent"
+            )
+        raise CircuitOpenError(message)
+
+    @contextmanager
+    def guard(
+        self, base_url: str, connection_errors: Tuple[Type[BaseException], ...]
+    ) -> Iterator[None]:
+        """Check the circuit of `base_url`, then count how the request went"""
+        self.check(base_url)
+        try:
+            yield
+        except connection_errors as e:
+            self.failure(base_url, e)
+            raise
+        except BaseException:
+            self.success(base_url)  # it answered, if not well
+            raise
+        else:
+            self.success(base_url)
+
+    def success(self, base_url: str):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._circuits.pop(base_url, None)
+
+    def failure(self, base_url: str, error: BaseException):
+        if not self.enabled:
+            return
+        with self._lock:
+            circuit = self._circuits.setdefault(base_url, _Circuit())
+            circuit.failures += 1
+            circuit.last_error = f"{type(error).__name__}: {error}"
+            circuit.probing = False
+            if circuit.opened_at is not None or circuit.failures >= self.threshold:
+                circuit.opened_at = time.monotonic()
+
+    def is_open(self, base_url: str) -> bool:
+        with self._lock:
+            circuit = self._circuits.get(base_url)
+            return circuit is not None and circuit.opened_at is not None
+
+    def reset(self):
+        with self._lock:
+            self._circuits.clear()
+
+
+circuit_breaker = CircuitBreaker()
@@ -1,8 +1,21 @@
 import json
+import threading
+import time
 import requests
 from requests import PreparedRequest, Request, Response
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 import allure
-from typing import Dict
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from src.api_clients.cassette import REPLAY, Cassette, Interaction, cassette_from_env
+from src.api_clients.circuit import CircuitBreaker, circuit_breaker
+from src.utils.lazy import lazy_singletons
+from src.utils.report import attach, dumps, get_attachment_limit, is_pretty, report
+from src.utils import timing
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterator, Mapping, Optional
 import curlify
 
 
@@ -11,8 +24,151 @@ HOST = "localhost"
 PORT = 8000
 BASE_URL = f"{PROTOCOL}://{HOST}:{PORT}"
 
+POOL_CONNECTIONS = 10  # number of per-host pools kept by the session
+POOL_MAXSIZE = 10  # max connections kept alive per host
+POOL_BLOCK = False
+
+CHUNK_SIZE = 64 * 1024  # bytes per chunk of a streamed response body
+
+# Session.request() keywords that shape the request itself (and so the
+# cassette key), as opposed to how it is sent
+_REQUEST_FIELDS = ("params", "data", "json", "files", "auth", "cookies")
+
+# connect time spent by the current thread, so _request can split its own
+# elapsed time into connect vs. transfer even when the client is shared
+_thread_timing = threading.local()
+
+
+@dataclass
+class ClientStats:
+    requests: int = 0
+    connections_opened: int = 0
+    connect_time: float = 0.0
+    transfer_time: float = 0.0
+
+    @property
+    def connections_reused(self) -> int:
+        """
+        Requests that did not open a connection. Derived rather than
+        counted: a request retried by urllib3 over a fresh connection, or a
+        connection opened and dropped before its request, skews it.
+        """
+        return max(self.requests - self.connections_opened, 0)
+
+    @property
+    def reuse_rate(self) -> float:
+        return self.connections_reused / self.requests if self.requests else 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            **asdict(self),
+            "connections_reused": self.connections_reused,
+            "reuse_rate": self.reuse_rate,
+        }
+
+
+def parsed_json(response) -> Any:
+    """
+    The JSON body of a requests or httpx response, parsed once: the step and
+    the report of the request share the result, so neither may mutate it
+    """
+    try:
+        return response._parsed_json
+    except AttributeError:
+        pass
+    try:
+        data = json.loads(response.content)
+    except ValueError:
+        # not UTF-8 JSON: let the library decode it, or raise its own error
+        data = response.json()
+    response._parsed_json = data
+    return data
+
+
+def attach_body(
+    name: str, body: bytes, headers: Mapping[str, str], response: Any = None
+):
+    """
+    Attach a request or response body as sent or received, cut to the
+    attachment limit. A JSON response body is only re-dumped when reports
+    are pretty and it fits the limit, from the parse the step already made.
+    """
+    if "json" not in headers.get("Content-Type", ""):
+        attach(body, name)
+        return
+    limit = get_attachment_limit()
+    if is_pretty() and response is not None and (not limit or len(body) <= limit):
+        try:
+            body = dumps(parsed_json(response))
+        except ValueError:
+            pass
+    attach(body, name, allure.attachment_type.JSON)
+
+
+def _iter_body(response: Response, chunk_size: int) -> Iterator[bytes]:
+    try:
+        yield from response.iter_content(chunk_size)
+    finally:
+        if response.raw is not None:  # a replayed response has no connection
+            response.close()
+
+
+def connect_time() -> float:
+    return getattr(_thread_timing, "connect_time", 0.0)
+
+
+class _TimedConnectionMixin:
+    """Records every TCP (and TLS) connect into the owning client's stats"""
+
+    stats: ClientStats
+    lock: threading.Lock
+
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        elapsed = time.perf_counter() - start
+        _thread_timing.connect_time = connect_time() + elapsed
+        with self.lock:
+            self.stats.connections_opened += 1
+            self.stats.connect_time += elapsed
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose urllib3 pools report connection setup to ClientStats"""
+
+    def __init__(self, stats: ClientStats, lock: threading.Lock, **kwargs):
+        self.stats = stats
+        self.lock = lock
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        bound = {"stats": self.stats, "lock": self.lock}
+        http_conn = type("HTTPConnection", (_TimedHTTPConnection,), bound)
+        https_conn = type("HTTPSConnection", (_TimedHTTPSConnection,), bound)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": type(
+                "HTTPConnectionPool", (HTTPConnectionPool,), {"ConnectionCls": http_conn}
+            ),
+            "https": type(
+                "HTTPSConnectionPool",
+                (HTTPSConnectionPool,),
+                {"ConnectionCls": https_conn},
+            ),
+        }
+
+
+class BaseClient:
+    """Base URL and default headers shared by the sync and async clients"""
 
-class HTTPClient:
     def __init__(self, base_url=BASE_URL):
         self.base_url = base_url.rstrip("/")
         self.headers = {}
@@ -31,25 +187,77 @@ class HTTPClient:
         }
         self.set_header(headers)
 
-    def _attach_allure(self, request: PreparedRequest, response: Response):
+
+class HTTPClient(BaseClient):
+    def __init__(
+        self,
+        base_url=BASE_URL,
+        pool_connections: int = POOL_CONNECTIONS,
+        pool_maxsize: int = POOL_MAXSIZE,
+        pool_block: bool = POOL_BLOCK,
+        keep_alive: bool = True,
+        cassette: Optional[Cassette] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.cassette = cassette if cassette is not None else cassette_from_env()
+        self.breaker = breaker or circuit_breaker
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self._stats = ClientStats()
+        self._stats_lock = threading.Lock()
+        self.session = self._new_session()
+        super().__init__(base_url)
+
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = PooledAdapter(
+            self._stats,
+            self._stats_lock,
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers["Connection"] = "keep-alive" if self.keep_alive else "close"
+        return session
+
+    @property
+    def stats(self) -> ClientStats:
+        with self._stats_lock:
+            return ClientStats(**asdict(self._stats))
+
+    def reset_stats(self):
+        with self._stats_lock:
+            vars(self._stats).update(asdict(ClientStats()))
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _attach_allure(
+        self, request: PreparedRequest, response: Response, streamed: bool = False
+    ):
         method = request.method or ""
         url = request.url
-        request_headers = request.headers
-        request_body = str(request.body) or {}
+        request_body = request.body or b""
 
         with allure.step(f"{method.upper()} {url}"):
             allure.attach(
-                json.dumps(dict(request_headers), indent=2),
+                dumps(dict(request.headers)),
                 name="HTTP Request Headers",
                 attachment_type=allure.attachment_type.JSON,
             )
+            attach_body("HTTP Request Body", request_body, request.headers)
             allure.attach(
-                json.dumps(request_body, indent=2),
-                name="HTTP Request Body",
-                attachment_type=allure.attachment_type.JSON,
-            )
-            allure.attach(
-                json.dumps(dict(response.headers), indent=2),
+                dumps(dict(response.headers)),
                 name="Response Headers",
                 attachment_type=allure.attachment_type.JSON,
             )
@@ -58,34 +266,77 @@ class HTTPClient:
                 name="HTTP Status Code",
                 attachment_type=allure.attachment_type.TEXT,
             )
-            try:
-                response_body = response.json()
-                body_text = json.dumps(response_body, indent=2)
-                attachment_type = allure.attachment_type.JSON
-            except Exception:
-                body_text = response.text
-                attachment_type = allure.attachment_type.TEXT
-            allure.attach(
-                body_text, name="Response Body", attachment_type=attachment_type
-            )
-            allure.attach(
-                body=curlify.to_curl(response.request),
-                name="cURL Command",
-                attachment_type=allure.attachment_type.TEXT,
-            )
+            if streamed:
+                # reading it here would take it from the step
+                attach("(streamed to the step, not kept)", "Response Body")
+            else:
+                attach_body(
+                    "Response Body", response.content, response.headers, response
+                )
+            attach(curlify.to_curl(request), "cURL Command")
 
     def _request(self, method, endpoint, **kwargs):
         url = self.base_url + endpoint
         data = kwargs.get("json") or kwargs.get("data")
         headers = kwargs.get("headers", {})
 
-        response: Response = requests.request(
-            method,
-            url,
-            headers=self.headers,
-            **kwargs,
+        streamed = kwargs.get("stream", False)
+
+        if self.cassette is not None and self.cassette.mode == REPLAY:
+            response = self._replay(method, url, kwargs)
+            report(lambda: self._attach_allure(response.request, response, streamed))
+            return response
+
+        connect_before = connect_time()
+        start = time.perf_counter()
+        with self.breaker.guard(self.base_url, (requests.ConnectionError,)):
+            response: Response = self.session.request(
+                method,
+                url,
+                headers=self.headers,
+                **kwargs,
+            )
+        elapsed = time.perf_counter() - start
+        timing.record(timing.HTTP, elapsed)
+        connect_elapsed = connect_time() - connect_before
+        with self._stats_lock:
+            self._stats.requests += 1
+            self._stats.transfer_time += max(elapsed - connect_elapsed, 0.0)
+        if self.cassette is not None:
+            request = response.request
+            self.cassette.record(
+                request.method,
+                request.url,
+                request.body,
+                Interaction(
+                    response.status_code,
+                    response.reason,
+                    dict(response.headers),
+                    response.content,
+                ),
+            )
+        report(lambda: self._attach_allure(response.request, response, streamed))
+        return response
+
+    def _replay(self, method: str, url: str, kwargs: Dict) -> Response:
+        """Build the recorded response to a request without sending it"""
+        start = time.perf_counter()
+        request_kwargs = {k: v for k, v in kwargs.items() if k in _REQUEST_FIELDS}
+        prepared = self.session.prepare_request(
+            Request(method.upper(), url, headers=self.headers, **request_kwargs)
         )
-        self._attach_allure(response.request, response)
+        interaction = self.cassette.lookup(prepared.method, prepared.url, prepared.body)
+        response = Response()
+        response.status_code = interaction.status
+        response.reason = interaction.reason
+        response.headers = CaseInsensitiveDict(interaction.headers)
+        response._content = interaction.body
+        # read in full already: iter_content() slices _content, never raw
+        response._content_consumed = True
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = prepared.url
+        response.request = prepared
+        timing.record(timing.HTTP, time.perf_counter() - start)
         return response
 
     def get(self, endpoint, **kwargs):
@@ -103,14 +354,30 @@ class HTTPClient:
     def patch(self, endpoint, **kwargs):
         return self._request("patch", endpoint, **kwargs)
 
+    def stream(
+        self, method, endpoint, chunk_size: int = CHUNK_SIZE, **kwargs
+    ) -> Iterator[bytes]:
+        """
+        The response body in chunks, read off the connection as they are
+        consumed, so it is never held in memory whole. The request is sent
+        right away; the connection is released once the iterator is
+        exhausted or closed.
+        """
+        response = self._request(method, endpoint, stream=True, **kwargs)
+        return _iter_body(response, chunk_size)
+
+    def body_view(self, method, endpoint, **kwargs) -> memoryview:
+        """The response body as a read-only memoryview, sliced without copies"""
+        return memoryview(self._request(method, endpoint, **kwargs).content)
+
     def echo(self, *args, **kwargs):
         param = args[0] if args else kwargs
         response = self.post("/api/echo", json=param)
-        return response.json()
+        return parsed_json(response)
 
     def health_check(self):
         response = self.get("/api/health")
-        return response.json()
+        return parsed_json(response)
 
 
-my_client = HTTPClient()
+__getattr__ = lazy_singletons(globals(), my_client=HTTPClient)
@@ -0,0 +1,324 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+)
+
+from hamcrest.core.matcher import Matcher
+
+import src.utils.constants as const
+from src.case_runner import CaseRunner
+from src.functions import markers
+from src.functions.function_pool import FunctionPool
+from src.utils.allure_utils import allure_step
+from src.utils.case_utils import CaseResult, StepResult, TestCase, TestStep
+from src.utils.lazy import lazy_singletons
+from src.utils.logger import logger
+from src.utils.matchers import get_matcher
+from src.utils.profiling import profiled_acall, profiled_call
+from src.utils.step_graph import StepScheduler
+from src.utils.report import deferred_report
+from src.utils import fixtures, retrying, timing
+
+_ctx: ContextVar[CaseResult] = ContextVar("ctx")
+_current_step: ContextVar[Any] = ContextVar("current_step", default={})
+
+
+class AsyncCaseRunner(CaseRunner):
+    """
+    asyncio flavour of CaseRunner: coroutine step functions are awaited,
+    sync ones run in the default executor. Steps inside a case stay
+    sequential, while run_test_cases runs whole cases concurrently; the
+    per-case context lives in a ContextVar so each task sees its own.
+
+    Allure keeps its open steps per thread, not per task, so the steps of
+    cases that run_test_cases interleaves on the loop end up nested under
+    each other in the report. Run cases one at a time (concurrency=1), or
+    with SIMPLYTEST_REPORT_LEVEL=off, when the report matters.
+    """
+
+    # the loop thread runs other tasks, and sync functions run elsewhere
+    defer_cpu_profile = True
+
+    def __init__(
+        self,
+        function_pool: Optional[FunctionPool] = None,
+        concurrency: int = 100,
+    ):
+        super().__init__(function_pool)
+        self.concurrency = concurrency
+
+    @property
+    def ctx(self) -> CaseResult:
+        return _ctx.get()
+
+    @ctx.setter
+    def ctx(self, case_result: CaseResult):
+        _ctx.set(case_result)
+
+    @property
+    def current_step(self) -> Any:
+        return _current_step.get()
+
+    @current_step.setter
+    def current_step(self, step: Any):
+        _current_step.set(step)
+
+    async def run_test_cases(
+        self, test_cases: Iterable[TestCase], concurrency: Optional[int] = None
+    ) -> List[Any]:
+        """
+        Run cases concurrently, at most `concurrency` at a time. Returns one
+        entry per case, in input order: the result dict, or the exception the
+        case raised. Allure steps of concurrent cases get mixed up (see the
+        class docstring).
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.concurrency)
+
+        async def run_one(test_case: TestCase):
+            async with semaphore:
+                return await self.execute_test_case(test_case)
+
+        return await asyncio.gather(
+            *(run_one(test_case) for test_case in test_cases),
+            return_exceptions=True,
+        )
+
+    async def execute_test_case(self, test_case: TestCase) -> Dict[str, Any]:
+        cache_key, cached = self._cached_result(test_case)
+        if cached is not None:
+            return cached
+        try:
+            with self._record_case(test_case) as case_result:
+                async with self._fixture(test_case):
+                    await self._execute_steps(test_case)
+            return case_result.summary()
+        finally:
+            if cache_key is not None:
+                self.result_cache.put(cache_key, self.ctx.summary())
+
+    async def _execute_steps(self, test_case: TestCase):
+        if test_case.rows is not None:
+            await self._execute_batch(test_case)
+        elif test_case.parallel_steps:
+            await self._execute_steps_parallel(test_case)
+        else:
+            for i, step in enumerate(test_case.steps):
+                await self._run_step(i, step)
+
+    @asynccontextmanager
+    async def _fixture(self, test_case: TestCase) -> AsyncIterator[None]:
+        if not test_case.setup_steps and not test_case.teardown_steps:
+            yield
+            return
+        if test_case.setup_scope != const.CASE_SCOPE:
+            shared = await fixtures.shared_setups.asetup(
+                test_case,
+                lambda: self._run_shared_setup(test_case),
+                lambda variables: self._run_shared_teardown(test_case, variables),
+            )
+            self.ctx.variables.update(shared)
+            yield
+            return
+        try:
+            await self._run_setup(test_case.setup_steps)
+            yield
+        except Exception:
+            await self._run_teardown_after_failure(test_case.teardown_steps)
+            raise
+        await self._run_teardown(test_case.teardown_steps)
+
+    async def _run_setup(self, steps: List[TestStep]):
+        for i, step in enumerate(steps or ()):
+            await self._run_step(i, step, "Setup")
+
+    async def _run_teardown(self, steps: List[TestStep]):
+        errors = []
+        for i, step in enumerate(steps or ()):
+            try:
+                await self._run_step(i, step, "Teardown")
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+
+    async def _run_teardown_after_failure(self, steps: List[TestStep]):
+        try:
+            await self._run_teardown(steps)
+        except Exception as e:
+            logger.error(f"Teardown failed: {e}")
+
+    async def _run_shared_setup(self, test_case: TestCase) -> Dict[str, Any]:
+        await self._run_setup(test_case.setup_steps)
+        return {
+            step.save_result_to: self.ctx.variables[step.save_result_to]
+            for step in test_case.setup_steps
+            if step.save_result_to
+        }
+
+    async def _run_shared_teardown(self, test_case: TestCase, variables: Mapping):
+        async def teardown():
+            self.ctx = CaseResult(case=test_case, variables=dict(variables))
+            await self._run_teardown(test_case.teardown_steps)
+
+        # a task of its own sets ctx in its own copy of the context, leaving
+        # that of the case awaiting it (if any) alone
+        await asyncio.ensure_future(teardown())
+
+    async def _run_step(
+        self, index: int, step: TestStep, label: str = "Step"
+    ) -> StepResult:
+        with self._record_step(index, step, label) as step_result:
+            step_result.func_return = await self.execute_test_step(
+                step, step_result.description
+            )
+        return step_result
+
+    async def _execute_steps_parallel(self, test_case: TestCase):
+        """CaseRunner._execute_steps_parallel with a task per step"""
+        steps = test_case.steps
+        scheduler = StepScheduler(test_case.step_dependencies)
+        failures: Dict[int, BaseException] = {}
+        tasks = {}
+
+        def submit(indices):
+            # tasks copy the current context, so each step has its own timer
+            for i in indices:
+                tasks[asyncio.ensure_future(self._run_step(i, steps[i]))] = i
+
+        submit(scheduler.initial())
+        while tasks:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                i = tasks.pop(task)
+                if task.exception() is not None:
+                    failures[i] = task.exception()
+                elif not failures:
+                    submit(scheduler.done(i))
+        self._finish_parallel_steps(test_case, failures)
+
+    async def _execute_batch(self, test_case: TestCase):
+        step = test_case.steps[0]
+        func_to_call = self.function_pool.get_function(step.function)
+        with self._record_step(0, step) as step_result:
+            row_variables, calls = self._resolve_batch(test_case)
+
+            async def batch_call():
+                with allure_step(
+                    f"{step_result.description} - Calling function"
+                    f" `{step.function}` on {len(calls)} rows"
+                ), deferred_report():
+                    self._attach_batch_input(calls)
+                    with timing.phase(timing.CALL):
+                        return await self._call_batch(func_to_call, calls)
+
+            results = await retrying.acall(batch_call, step.retry_policy, logger)
+            step_result.func_return = results
+            self._check_rows(step, row_variables, results)
+
+    async def _call_batch(self, func: Callable, calls: List) -> List:
+        bulk = markers.batch_function(func)
+        if bulk is not None:
+            return self._batch_results(await self._call(bulk, (calls,), {}), calls)
+        if not inspect.iscoroutinefunction(func):
+            # one executor job for the whole loop rather than one per row
+            return await self._call(super()._call_batch, (func, calls), {})
+        results = await asyncio.gather(
+            *(func(*args, **kwargs) for args, kwargs in calls),
+            return_exceptions=True,
+        )
+        return list(results)
+
+    async def execute_test_step(
+        self, step: TestStep, description: Optional[str] = None
+    ) -> Dict[str, Any]:
+        self.current_step = step
+        description = description or step.description
+        self._log_step("Executing step", "step_started", step, description)
+
+        func_to_call = self.function_pool.get_function(step.function)
+        with timing.phase(timing.RESOLVE):
+            args, kwargs = self._resolve_step_input(step)
+        matcher = self._bind_matcher(step)
+
+        if step.poll:
+            actual_result = await self._poll_step(
+                step, description, func_to_call, args, kwargs, matcher
+            )
+            self._log_step("Step passed", "step_passed", step, description)
+            return actual_result
+
+        async def step_func_call():
+            with allure_step(
+                f"{description} - Calling function `{step.function}`"
+            ), deferred_report():
+                self._attach_step_input(args, kwargs)
+                with timing.phase(timing.CALL):
+                    func_res = await self._call(func_to_call, args, kwargs)
+                return self._handle_step_result(step, func_res, matcher)
+
+        actual_result = await retrying.acall(step_func_call, step.retry_policy, logger)
+        self._log_step("Step passed", "step_passed", step, description)
+        return actual_result
+
+    async def _poll_step(
+        self,
+        step: TestStep,
+        description: str,
+        func_to_call: Callable,
+        args: Tuple,
+        kwargs: Dict,
+        matcher: Optional[Matcher] = None,
+    ) -> Any:
+        if step.expected_result:
+            expected = self._resolve_expected(step)
+            matcher = matcher or get_matcher(step.assertion_type)(expected)
+        last = []
+
+        async def poll():
+            last.clear()
+            with timing.phase(timing.CALL):
+                last.append(await self._call(func_to_call, args, kwargs))
+            if step.expected_result:
+                self._check_result(step, last[0], expected, matcher)
+
+        try:
+            await retrying.acall(poll, step.retry_policy, logger)
+        except AssertionError:
+            if not last:
+                raise  # the function itself failed: there is no result to report
+            # otherwise raised again below, with the usual attachments
+
+        with allure_step(
+            f"{description} - Polling function `{step.function}`"
+        ), deferred_report():
+            self._attach_step_input(args, kwargs)
+            return self._handle_step_result(step, last[0], matcher)
+
+    async def _call(self, func, args, kwargs) -> Any:
+        if inspect.iscoroutinefunction(func):
+            return await profiled_acall(func, *args, **kwargs)
+        # run in a copy of this task's context so that attachments made by the
+        # function still land in the step's deferred report, and its profile
+        # (if any) is taken in the executor thread
+        context = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            functools.partial(context.run, profiled_call, func, *args, **kwargs),
+        )
+
+
+__getattr__ = lazy_singletons(globals(), async_case_runner=AsyncCaseRunner)
@@ -1,23 +1,59 @@
-import json
+import copy
+import contextvars
+import inspect
 import time
 import os
-from typing import Dict, List, Any, Optional
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Iterator, List, Any, Mapping, Optional, Tuple
+from src.functions import function_pool as pools
+from src.functions import markers
 from src.functions.function_pool import FunctionPool
 import src.utils.constants as const
-from src.utils.case_utils import TestCase, TestStep
-from retry.api import retry_call
-import importlib
+from src.utils.case_utils import (
+    CaseResult,
+    StepResult,
+    TestCase,
+    TestStep,
+    case_to_dict,
+    status_of,
+)
+from src.utils.matchers import get_matcher
+from src.utils.templates import Template
 from hamcrest import assert_that
+from hamcrest.core.matcher import Matcher
 from src.utils.allure_utils import allure_step, allure_func
+from src.utils.lazy import lazy_singletons
 from src.utils.logger import logger
-import allure
-from dataclasses import asdict
+from src.utils.step_graph import StepScheduler
+from src.utils.result_cache import ResultCache
+from src.utils.result_cache import default_cache as default_result_cache
+from src.utils.report import ReportLevel, attach_json, deferred_report
+from src.utils import case_history, fixtures, retrying, timing
+from src.utils.profiling import profiler
+from src.utils.case_history import CaseHistory, case_key
 import jmespath
 
+# threads per case for parallel_steps cases
+STEP_WORKERS = int(os.environ.get("SIMPLYTEST_STEP_WORKERS", 8))
+
 
 class CaseRunner:
-    def __init__(self, function_pool: Optional[FunctionPool] = None):
-        self.function_pool = function_pool or FunctionPool()
+    # see Profiler.profile: steps run on the thread that records them here
+    defer_cpu_profile = False
+
+    def __init__(
+        self,
+        function_pool: Optional[FunctionPool] = None,
+        result_cache: Optional[ResultCache] = None,
+    ):
+        # the shared pool by default, so functions registered on it are seen
+        self.function_pool = function_pool or pools.function_pool
+        self.result_cache = result_cache or default_result_cache()
+        # finished cases are recorded only when the history is in use
+        self.case_history: Optional[CaseHistory] = (
+            case_history.history if case_history.enabled() else None
+        )
         self.test_results = []
         self.current_step = {}
         # self._load_env_var()
@@ -27,152 +63,538 @@ class CaseRunner:
         return None
 
     def execute_test_case(self, test_case: TestCase) -> Dict[str, Any]:
-        self.ctx = test_case
-        allure.attach(
-            body=json.dumps(asdict(self.ctx), indent=2),
-            attachment_type=allure.attachment_type.JSON,
-            name="Context before test execution",
+        cache_key, cached = self._cached_result(test_case)
+        if cached is not None:
+            return cached
+        try:
+            with self._record_case(test_case) as case_result:
+                with self._fixture(test_case):
+                    self._execute_steps(test_case)
+            return case_result.summary()
+        finally:
+            if cache_key is not None:
+                self.result_cache.put(cache_key, self.ctx.summary())
+
+    def _cached_result(
+        self, test_case: TestCase
+    ) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        (result cache key, replayed summary): the key is set whenever the
+        cache is on, the summary only for a cacheable case that is unchanged
+        since it last passed
+        """
+        cache = self.result_cache
+        if cache is None:
+            return None, None
+        functions = self.function_pool.get_function
+        key = cache.key(test_case, functions)
+        if not cache.cacheable(test_case, functions):
+            return key, None
+        cached = cache.get(key)
+        if not cached or cached.get(const.STATUS) != "PASSED":
+            return key, None
+        logger.info(
+            "Replaying test case: %s (unchanged)",
+            test_case.description,
+            extra={"event": "case_replayed", "case": test_case.description},
         )
-        self.ctx.variables = test_case.variables or {}
-        print(f"\n--- Executing Test Case: {test_case.description} ---")
+        summary = {name: cached.get(name) for name in CaseResult.SUMMARY_KEYS}
+        return key, {**summary, "cached": True}
 
-        result = {
-            const.STATUS: "PASSED",
-            const.ERROR: None,
-            const.EXECUTION_TIME: 0,
+    def _execute_steps(self, test_case: TestCase):
+        if test_case.rows is not None:
+            self._execute_batch(test_case)
+        elif test_case.parallel_steps:
+            self._execute_steps_parallel(test_case)
+        else:
+            for i, step in enumerate(test_case.steps):
+                self._run_step(i, step)
+
+    def finish_suite(self, suite_path: str) -> List[Exception]:
+        """Run the teardowns of the setups shared by the cases of a suite"""
+        return fixtures.shared_setups.finish(os.path.abspath(suite_path))
+
+    @contextmanager
+    def _fixture(self, test_case: TestCase) -> Iterator[None]:
+        """Run the case's setup before the block and its teardown after it"""
+        if not test_case.setup_steps and not test_case.teardown_steps:
+            yield
+            return
+        if test_case.setup_scope != const.CASE_SCOPE:
+            shared = fixtures.shared_setups.setup(
+                test_case,
+                lambda: self._run_shared_setup(test_case),
+                lambda variables: self._run_shared_teardown(test_case, variables),
+            )
+            self.ctx.variables.update(shared)
+            yield
+            return
+        try:
+            self._run_setup(test_case.setup_steps)
+            yield
+        except Exception:
+            self._run_teardown_after_failure(test_case.teardown_steps)
+            raise
+        self._run_teardown(test_case.teardown_steps)
+
+    def _run_setup(self, steps: List[TestStep]):
+        for i, step in enumerate(steps or ()):
+            self._run_step(i, step, "Setup")
+
+    def _run_teardown(self, steps: List[TestStep]):
+        """Run every teardown step, then raise the first error if any failed"""
+        errors = []
+        for i, step in enumerate(steps or ()):
+            try:
+                self._run_step(i, step, "Teardown")
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+
+    def _run_teardown_after_failure(self, steps: List[TestStep]):
+        try:
+            self._run_teardown(steps)
+        except Exception as e:
+            # the case fails with its own error; this one is in its steps
+            logger.error(f"Teardown failed: {e}")
+
+    def _run_shared_setup(self, test_case: TestCase) -> Dict[str, Any]:
+        """Run a shared setup within the current case; returns what it saved"""
+        self._run_setup(test_case.setup_steps)
+        return {
+            step.save_result_to: self.ctx.variables[step.save_result_to]
+            for step in test_case.setup_steps
+            if step.save_result_to
         }
 
+    def _run_shared_teardown(self, test_case: TestCase, variables: Mapping):
+        # on a copy of the runner: this one may be in the middle of a case,
+        # whose context (and current step) must stay as they are
+        runner = copy.copy(self)
+        runner.ctx = CaseResult(case=test_case, variables=dict(variables))
+        runner._run_teardown(test_case.teardown_steps)
+
+    def _run_step(
+        self, index: int, step: TestStep, label: str = "Step"
+    ) -> StepResult:
+        with self._record_step(index, step, label) as step_result:
+            step_result.func_return = self.execute_test_step(
+                step, step_result.description
+            )
+        return step_result
+
+    def _execute_steps_parallel(self, test_case: TestCase):
+        """
+        Run the steps of `test_case` on a thread pool, each as soon as the
+        steps it depends on have passed. After a failure no new steps are
+        started; the error of the earliest failed step is raised once the
+        running ones are done.
+        """
+        steps = test_case.steps
+        scheduler = StepScheduler(test_case.step_dependencies)
+        failures: Dict[int, BaseException] = {}
+        futures = {}
+        workers = min(STEP_WORKERS, len(steps))
+        with ThreadPoolExecutor(workers, thread_name_prefix="step") as executor:
+
+            def submit(indices):
+                for i in indices:
+                    # each step runs in its own copy of the context, and so
+                    # gets its own step timer and report buffer
+                    run = contextvars.copy_context().run
+                    futures[executor.submit(run, self._run_step, i, steps[i])] = i
+
+            submit(scheduler.initial())
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = futures.pop(future)
+                    if future.exception() is not None:
+                        failures[i] = future.exception()
+                    elif not failures:
+                        submit(scheduler.done(i))
+        self._finish_parallel_steps(test_case, failures)
+
+    def _finish_parallel_steps(
+        self, test_case: TestCase, failures: Dict[int, BaseException]
+    ):
+        # report the steps in case order, not in completion order; setup
+        # steps keep their place in front
+        position = {id(step): i for i, step in enumerate(test_case.steps)}
+        self.ctx.steps.sort(
+            key=lambda step_result: position.get(id(step_result.step), -1)
+        )
+        if failures:
+            raise failures[min(failures)]
+
+    def _execute_batch(self, test_case: TestCase):
+        """Run the single step of a case with `rows` once over all rows"""
+        step = test_case.steps[0]
+        func_to_call = self.function_pool.get_function(step.function)
+        with self._record_step(0, step) as step_result:
+            row_variables, calls = self._resolve_batch(test_case)
+
+            @allure_step(
+                f"{step_result.description} - Calling function `{step.function}`"
+                f" on {len(calls)} rows"
+            )
+            def batch_call():
+                with deferred_report():
+                    self._attach_batch_input(calls)
+                    with timing.phase(timing.CALL):
+                        return self._call_batch(func_to_call, calls)
+
+            results = retrying.call(batch_call, step.retry_policy, logger)
+            step_result.func_return = results
+            self._check_rows(step, row_variables, results)
+
+    def _resolve_batch(
+        self, test_case: TestCase
+    ) -> Tuple[List[Dict[str, Any]], List[Tuple[Tuple, Dict]]]:
+        """
+        Variables of each row (the case's, overridden by the row's) and the
+        (args, kwargs) the step is called with for it
+        """
+        step = test_case.steps[0]
+        with timing.phase(timing.RESOLVE):
+            variables = self.ctx.variables
+            row_variables = [{**variables, **row} for row in test_case.rows]
+            calls = [
+                (
+                    step.resolve(const.INPUT_ARGS, values),
+                    step.resolve(const.INPUT_KWARGS, values),
+                )
+                for values in row_variables
+            ]
+        return row_variables, calls
+
+    def _call_batch(self, func: Callable, calls: List[Tuple[Tuple, Dict]]) -> List:
+        bulk = markers.batch_function(func)
+        if bulk is not None:
+            return self._batch_results(bulk(calls), calls)
+        results = []
+        for args, kwargs in calls:
+            try:
+                results.append(func(*args, **kwargs))
+            except Exception as e:
+                results.append(e)  # breaks the row, not the batch
+        return results
+
+    def _batch_results(self, results: Any, calls: List) -> List:
+        results = list(results)
+        if len(results) != len(calls):
+            raise ValueError(
+                f"batch function returned {len(results)} results for {len(calls)} rows"
+            )
+        return results
+
+    def _check_rows(
+        self, step: TestStep, row_variables: List[Dict[str, Any]], results: List
+    ):
+        """
+        Assert the result of every row, adding one StepResult per row to the
+        case; raises once all rows are checked if any of them failed
+        """
+        if step.save_result_to:
+            self.ctx.variables[step.save_result_to] = results
+        matcher = self._bind_matcher(step)
+        rows, failed = [], []
+        for i, (variables, result) in enumerate(zip(row_variables, results)):
+            row = StepResult(step, f"Row {i + 1}: {step.description}")
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                row.func_return = result
+                if step.expected_result:
+                    expected = step.resolve(const.EXPECTED_RESULT, variables)
+                    self._check_result(step, result, expected, matcher)
+                row.status = "PASSED"
+            except Exception as e:
+                row.status, row.error = status_of(e), str(e)
+                failed.append(row)
+            rows.append(row)
+        self.ctx.steps.extend(rows)
+
+        attach_json("Rows", lambda: [_row_report(row) for row in rows])
+        if not failed:
+            return
+        attach_json(
+            "Failed Rows",
+            lambda: [_row_report(row) for row in failed],
+            ReportLevel.FAILURES_ONLY,
+        )
+        message = (
+            f"{len(failed)} of {len(rows)} rows failed,"
+            f" first {failed[0].description}: {failed[0].error}"
+        )
+        if any(row.status == "FAILED" for row in failed):
+            raise AssertionError(message)
+        raise RuntimeError(message)
+
+    def _attach_batch_input(self, calls: List[Tuple[Tuple, Dict]]):
+        attach_json(
+            "Function Input",
+            lambda: [{"args": args, "kwargs": kwargs} for args, kwargs in calls],
+        )
+
+    @contextmanager
+    def _record_case(self, test_case: TestCase) -> Iterator[CaseResult]:
+        """Make a fresh CaseResult the runner's ctx for the duration of a case"""
+        self.ctx = case_result = CaseResult.start(test_case)
+        attach_json("Context before test execution", lambda: case_to_dict(test_case))
+        logger.info(
+            "Executing test case: %s",
+            test_case.description,
+            extra={"event": "case_started", "case": test_case.description},
+        )
+        start_time = time.perf_counter()
         try:
-            for i, step in enumerate(test_case.steps):
-                start_time = time.time()
-                step.description = f"Step {i + 1}: {step.description}"
-                func_return = self.execute_test_step(step)
-                end_time = time.time()
-                step.result = {
-                    "func_return": func_return,
-                    "exec_duration": f"{end_time - start_time:.2f} seconds",
-                }
+            yield case_result
         except Exception as e:
-            raise e
+            case_result.status, case_result.error = status_of(e), str(e)
+            raise
         finally:
-            # teardown
-            print("Executing teardown steps...")
-            print("test done")
-            allure.attach(
-                body=json.dumps(asdict(self.ctx), indent=2),
-                attachment_type=allure.attachment_type.JSON,
-                name="Context after test execution",
+            case_result.duration = time.perf_counter() - start_time
+            timing.collector.add_case(
+                test_case.description, case_result.status, case_result.duration
             )
-        return result
+            if self.case_history is not None:
+                self.case_history.record(
+                    case_key(test_case.suite, test_case.description),
+                    case_result.status,
+                    case_result.duration,
+                )
+            logger.info(
+                "%s %s in %.3fs",
+                case_result.status,
+                test_case.description,
+                case_result.duration,
+                extra={
+                    "event": "case_finished",
+                    "case": test_case.description,
+                    "status": case_result.status,
+                    "duration": case_result.duration,
+                    "error": case_result.error,
+                },
+            )
+            self._report_context_after(case_result)
+
+    @contextmanager
+    def _record_step(
+        self, index: int, step: TestStep, label: str = "Step"
+    ) -> Iterator[StepResult]:
+        step_result = StepResult(step, f"{label} {index + 1}: {step.description}")
+        self.ctx.steps.append(step_result)
+        case = self.ctx.case
+        profile = (
+            profiler.profile(
+                case.description or "",
+                step_result.description,
+                defer_cpu=self.defer_cpu_profile,
+            )
+            if profiler.wanted(step, case)
+            else nullcontext()
+        )
+        start_time = time.perf_counter()
+        with timing.step_timer() as timer, profile:
+            try:
+                yield step_result
+                step_result.status = "PASSED"
+            except Exception as e:
+                step_result.status, step_result.error = status_of(e), str(e)
+                raise
+            finally:
+                step_result.duration = time.perf_counter() - start_time
+                step_result.attempts = len(timer.attempts)
+                step_result.timings = dict(timer.phases)
+                timing.collector.add_step(
+                    self.ctx.case.description,
+                    step_result.description,
+                    step.function,
+                    step_result.status,
+                    step_result.duration,
+                    timer,
+                )
 
-    def execute_test_step(self, step: TestStep) -> Dict[str, Any]:
+    def execute_test_step(
+        self, step: TestStep, description: Optional[str] = None
+    ) -> Dict[str, Any]:
         self.current_step = step
-        print(f"Executing step: {step.description}")
+        description = description or step.description
+        self._log_step("Executing step", "step_started", step, description)
 
         func_to_call = self.function_pool.get_function(step.function)
-        step.input_args = self._resolve_variables(step.input_args)
-        step.input_kwargs = self._resolve_variables(step.input_kwargs)
-
-        @allure_step(f"{step.description} - Calling function `{step.function}`")
-        def step_func_call():
-            allure.attach(
-                name="Function Input",
-                body=json.dumps(
-                    {"args": step.input_args, "kwargs": step.input_kwargs},
-                    default=str,
-                    indent=2,
-                ),
-                attachment_type=allure.attachment_type.JSON,
+        if inspect.iscoroutinefunction(func_to_call):
+            raise TypeError(
+                f"`{step.function}` is a coroutine function, which CaseRunner "
+                "cannot await: run the case with AsyncCaseRunner"
             )
-            func_res = func_to_call(*step.input_args, **step.input_kwargs)
-            if step.save_result_to:
-                self.ctx.variables[step.save_result_to] = func_res
-
-            allure.attach(
-                name="Function Output",
-                body=json.dumps(
-                    {"result": func_res, "type": str(type(func_res))},
-                    indent=2,
-                ),
-                attachment_type=allure.attachment_type.JSON,
+        with timing.phase(timing.RESOLVE):
+            args, kwargs = self._resolve_step_input(step)
+        matcher = self._bind_matcher(step)
+
+        if step.poll:
+            actual_result = self._poll_step(
+                step, description, func_to_call, args, kwargs, matcher
             )
-            allure_attach = {
+            self._log_step("Step passed", "step_passed", step, description)
+            return actual_result
+
+        @allure_step(f"{description} - Calling function `{step.function}`")
+        def step_func_call():
+            with deferred_report():
+                self._attach_step_input(args, kwargs)
+                with timing.phase(timing.CALL):
+                    func_res = func_to_call(*args, **kwargs)
+                return self._handle_step_result(step, func_res, matcher)
+
+        actual_result = retrying.call(step_func_call, step.retry_policy, logger)
+        self._log_step("Step passed", "step_passed", step, description)
+        return actual_result
+
+    def _log_step(self, message: str, event: str, step: TestStep, description: str):
+        logger.debug(
+            "%s: %s",
+            message,
+            description,
+            extra={"event": event, "step": description, "function": step.function},
+        )
+
+    def _poll_step(
+        self,
+        step: TestStep,
+        description: str,
+        func_to_call: Callable,
+        args: Tuple,
+        kwargs: Dict,
+        matcher: Optional[Matcher] = None,
+    ) -> Any:
+        """
+        Re-run just the function and the assertion until they pass, then
+        report the last attempt once, as a regular step would
+        """
+        if step.expected_result:
+            expected = self._resolve_expected(step)
+            matcher = matcher or get_matcher(step.assertion_type)(expected)
+        last = []
+
+        def poll():
+            last.clear()
+            with timing.phase(timing.CALL):
+                last.append(func_to_call(*args, **kwargs))
+            if step.expected_result:
+                self._check_result(step, last[0], expected, matcher)
+
+        try:
+            retrying.call(poll, step.retry_policy, logger)
+        except AssertionError:
+            if not last:
+                raise  # the function itself failed: there is no result to report
+            # otherwise raised again below, with the usual attachments
+
+        @allure_step(f"{description} - Polling function `{step.function}`")
+        def report_last_attempt():
+            with deferred_report():
+                self._attach_step_input(args, kwargs)
+                return self._handle_step_result(step, last[0], matcher)
+
+        return report_last_attempt()
+
+    def _resolve_step_input(self, step: TestStep) -> Tuple[Tuple, Dict]:
+        variables = self.ctx.variables
+        return (
+            step.resolve(const.INPUT_ARGS, variables),
+            step.resolve(const.INPUT_KWARGS, variables),
+        )
+
+    def _report_context_after(self, case_result: CaseResult):
+        attach_json(
+            "Context after test execution",
+            case_result.to_dict,
+            ReportLevel.SUMMARY
+            if case_result.status == "PASSED"
+            else ReportLevel.FAILURES_ONLY,
+        )
+
+    def _attach_step_input(self, args: Tuple, kwargs: Dict):
+        attach_json("Function Input", lambda: {"args": args, "kwargs": kwargs})
+
+    def _handle_step_result(
+        self, step: TestStep, func_res: Any, matcher: Optional[Matcher] = None
+    ) -> Any:
+        """Save, report and assert the return value of a step function"""
+        if step.save_result_to:
+            self.ctx.variables[step.save_result_to] = func_res
+
+        attach_json(
+            "Function Output",
+            lambda: {"result": func_res, "type": str(type(func_res))},
+        )
+        attach_json(
+            "Assertion",
+            lambda: {
                 "actual": func_res,
                 "expected": step.expected_result,
                 "assertion_type": step.assertion_type,
-            }
-            allure.attach(
-                name="Assertion",
-                body=json.dumps(allure_attach, indent=2),
-                attachment_type=allure.attachment_type.JSON,
-            )
+            },
+        )
+        if step.expected_result:
+            expected = self._resolve_expected(step)
+            self._check_result(step, func_res, expected, matcher)
+        return func_res
+
+    def _resolve_expected(self, step: TestStep) -> Any:
+        with timing.phase(timing.RESOLVE):
+            return step.resolve(const.EXPECTED_RESULT, self.ctx.variables)
+
+    def _check_result(
+        self,
+        step: TestStep,
+        func_res: Any,
+        expected: Any,
+        matcher: Optional[Matcher] = None,
+    ):
+        """Assert the `expected_key` part of the result (or all of it)"""
+        with timing.phase(timing.ASSERTION):
             if step.expected_key:
                 actual = jmespath.search(step.expected_key, func_res)
             else:
                 actual = func_res
-            if step.expected_result:
-                self._resolve_variables(step.expected_result)
-                self._perform_assertion(
-                    actual, step.expected_result, step.assertion_type
-                )
-            return func_res
-
-        actual_result = retry_call(
-            step_func_call,
-            tries=step.retry_count,
-            delay=step.retry_delay,
-            backoff=1,
-            max_delay=None,
-            exceptions=(AssertionError,),
-            logger=logger,
-        )
-        print("Step passed")
-        return actual_result
+            self._perform_assertion(actual, expected, step.assertion_type, matcher)
 
     def _resolve_variables(self, obj: Any) -> Any:
         """Resolve variables in the format ${variable_name} within the object"""
-        if isinstance(obj, str):
-            # Simple variable substitution
-            if obj.startswith("${") and obj.endswith("}"):
-                var_name = obj[2:-1]
-                var_value = self.ctx.variables.get(var_name, None)
-                if not var_value:
-                    raise ValueError(f"Variable {obj} not found in context")
-                # TODO: this replacement is not enough
-                obj = var_value
-            return obj
-        elif isinstance(obj, list):
-            return [self._resolve_variables(item) for item in obj]
-        elif isinstance(obj, dict):
-            return {key: self._resolve_variables(value) for key, value in obj.items()}
-        else:
-            return obj
-
-    def _perform_assertion(self, actual: Any, expected: Any, assertion_type: str):
-        def _get_matcher(matcher_name: str):
-            matcher_modules = [
-                "hamcrest.core.core",
-                "hamcrest.library.collection",
-                "hamcrest.library.number",
-                "hamcrest.library.object",
-                "hamcrest.library.text",
-                "hamcrest.library.string",
-            ]
-            for module_name in matcher_modules:
-                try:
-                    module = importlib.import_module(module_name)
-                    if hasattr(module, matcher_name):
-                        return getattr(module, matcher_name)
-                except ImportError:
-                    continue
-            raise ValueError(f'"{assertion_type}" is not a valid matcher')
-
-        matcher = _get_matcher(assertion_type.lower())
+        return Template(obj).render(self.ctx.variables)
+
+    def _bind_matcher(self, step: TestStep) -> Optional[Matcher]:
+        """Build the step's matcher up front when `expected_result` is constant"""
+        if not step.expected_result or const.EXPECTED_RESULT in step.templates:
+            return None
+        return get_matcher(step.assertion_type)(step.expected_result)
+
+    def _perform_assertion(
+        self,
+        actual: Any,
+        expected: Any,
+        assertion_type: str,
+        matcher: Optional[Matcher] = None,
+    ):
+        matcher = matcher or get_matcher(assertion_type)(expected)
         assert_that(
             actual,
-            matcher(expected),
+            matcher,
             f"Assertion failed: {actual} does not match {expected}",
         )
 
 
-case_runner = CaseRunner()
+def _row_report(row: StepResult) -> Dict[str, Any]:
+    return {
+        const.DESCRIPTION: row.description,
+        const.STATUS: row.status,
+        "func_return": row.func_return,
+        const.ERROR: row.error,
+    }
+
+
+__getattr__ = lazy_singletons(globals(), case_runner=CaseRunner)
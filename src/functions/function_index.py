@@ -0,0 +1,160 @@
+"""
+Where step functions live, found without importing their modules.
+
+Function modules come from three places, each under a namespace that
+prefixes its function names (`http.echo` is `echo` in the `http` module):
+
+    src.functions.simple_funcs               the built-ins, no namespace
+    SIMPLYTEST_FUNCTION_MODULES              "http=acme.http_funcs,acme.db"
+    entry points in "simplytest.functions"   name = namespace, value = module
+
+A module listed without a namespace gets its last dotted component
+(`acme.db` -> `db`). The public top-level functions of each module, and
+what its __all__ re-exports, are read from its source with ast, and cached
+in .simplytest_cache/functions.json until the file changes, so only
+modules a suite actually calls are imported.
+"""
+
+import ast
+import importlib.util
+import inspect
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.utils.files import atomic_write
+from src.utils.suite_cache import cache_dir
+
+FUNCTION_MODULES_ENV = "SIMPLYTEST_FUNCTION_MODULES"
+ENTRY_POINT_GROUP = "simplytest.functions"
+BUILTIN_MODULES = {"": "src.functions.simple_funcs"}
+
+
+def configured_modules() -> Dict[str, str]:
+    """Namespace -> module path, from SIMPLYTEST_FUNCTION_MODULES"""
+    modules = {}
+    for item in filter(None, os.environ.get(FUNCTION_MODULES_ENV, "").split(",")):
+        namespace, _, module = item.strip().rpartition("=")
+        modules[namespace or module.rpartition(".")[2]] = module
+    return modules
+
+
+def entry_point_modules() -> Dict[str, str]:
+    """Namespace -> module path of installed plugins"""
+    from importlib.metadata import entry_points  # scans site-packages
+
+    return {
+        entry_point.name: entry_point.value.partition(":")[0].strip()
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP)
+    }
+
+
+def scan_source(source: str) -> List[str]:
+    """
+    Public functions defined at the top level of a module's source, then
+    the names its literal __all__ re-exports from other modules. Functions
+    imported without being listed in __all__ are left to FunctionPool,
+    which imports the module to find them.
+    """
+    defined, imported, exported = [], set(), ()
+    for node in ast.parse(source).body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            defined.append(node.name)
+        elif isinstance(node, ast.ImportFrom):
+            imported.update(alias.asname or alias.name for alias in node.names)
+        elif isinstance(node, ast.Assign) and any(
+            isinstance(target, ast.Name) and target.id == "__all__"
+            for target in node.targets
+        ):
+            try:
+                exported = ast.literal_eval(node.value)
+            except ValueError:
+                pass  # built at import time: not readable here
+    names = [name for name in defined if not name.startswith("_")]
+    names += [
+        name
+        for name in exported
+        if name in imported and name not in names and not name.startswith("_")
+    ]
+    return names
+
+
+class FunctionIndex:
+    """Module path -> names of its step functions, persisted between runs"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or cache_dir() / "functions.json"
+        self._entries: Optional[Dict[str, dict]] = None
+        # modules already checked against their file by this process
+        self._checked: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, dict]:
+        if self._entries is None:
+            try:
+                with open(self.path) as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def functions(self, module: str) -> List[str]:
+        functions = self._checked.get(module)
+        if functions is None:
+            functions = self._checked[module] = self._functions(module)
+        return functions
+
+    def _functions(self, module: str) -> List[str]:
+        spec = importlib.util.find_spec(module)
+        if spec is None or not spec.origin or not spec.origin.endswith(".py"):
+            # compiled or namespace module: nothing to parse, so import it
+            return _imported_functions(module)
+        stat = os.stat(spec.origin)
+        with self._lock:
+            entry = self._load().get(module)
+            if (
+                entry is not None
+                and entry["file"] == spec.origin
+                and entry["mtime_ns"] == stat.st_mtime_ns
+                and entry["size"] == stat.st_size
+            ):
+                return entry["functions"]
+            functions = scan_source(Path(spec.origin).read_text(encoding="utf-8"))
+            self._entries[module] = {
+                "file": spec.origin,
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "functions": functions,
+            }
+            self._save()
+        return functions
+
+    def _save(self):
+        try:
+            atomic_write(self.path, json.dumps(self._entries, indent=1, sort_keys=True))
+        except OSError:
+            pass  # read-only checkout: the index just isn't kept
+
+
+def _imported_functions(module: str) -> List[str]:
+    imported = importlib.import_module(module)
+    return [
+        name
+        for name, func in inspect.getmembers(imported, inspect.isfunction)
+        if not name.startswith("_") and func.__module__ == module
+    ]
+
+
+_index: Optional[FunctionIndex] = None
+_index_lock = threading.Lock()
+
+
+def default_index() -> FunctionIndex:
+    """The process-wide index, so pools share one scan of each module"""
+    global _index
+    with _index_lock:
+        if _index is None or _index.path != cache_dir() / "functions.json":
+            _index = FunctionIndex()
+        return _index
@@ -1,31 +1,79 @@
-import time
-from typing import List, Callable
-import src.functions.simple_funcs as funcs
+import importlib
 import inspect
-from src.api_clients.simple_client import my_client
+from typing import Callable, Dict, List, Optional
+
+from src.functions import function_index
+from src.utils.lazy import lazy_singletons
 
 
 class FunctionPool:
-    """Central registry for all functions available to test steps"""
+    """
+    Central registry for all functions available to test steps.
+
+    Functions registered explicitly are kept as given. Everything else is
+    looked up by name in the function modules (see function_index), and a
+    module is imported only when one of its functions is first requested.
+    """
 
-    def __init__(self):
-        self._functions = {}
-        self._register_default_functions()
+    def __init__(self, modules: Optional[Dict[str, str]] = None):
+        self._functions: Dict[str, Callable] = {}
+        # namespace -> module path; "" is the un-prefixed built-ins
+        self._modules = {
+            **function_index.BUILTIN_MODULES,
+            **function_index.configured_modules(),
+            **(modules or {}),
+        }
+        self._entry_points_loaded = False
 
     def register(self, name: str, func: Callable):
         self._functions[name] = func
 
+    def register_module(self, namespace: str, module: str):
+        """Serve `module`'s functions as `<namespace>.<function>`"""
+        self._modules[namespace] = module
+
     def get_function(self, name: str) -> Callable:
-        if name not in self._functions:
-            raise ValueError(f"Function '{name}' not found in function pool")
-        return self._functions[name]
+        func = self._functions.get(name)
+        if func is None:
+            func = self._functions[name] = self._import_function(name)
+        return func
 
     def list_functions(self) -> List[str]:
-        return list(self._functions.keys())
+        self._load_entry_points()
+        names = set(self._functions)
+        for namespace, module in self._modules.items():
+            prefix = f"{namespace}." if namespace else ""
+            names.update(prefix + name for name in self._index_of(module))
+        return sorted(names)
+
+    def _import_function(self, name: str) -> Callable:
+        namespace, _, attr = name.rpartition(".")
+        if namespace not in self._modules:
+            self._load_entry_points()
+        module = self._modules.get(namespace)
+        if module is None:
+            raise ValueError(f"Function '{name}' not found in function pool")
+        if attr in self._index_of(module):
+            return getattr(importlib.import_module(module), attr)
+        # the index misses functions a module imports from elsewhere
+        # without listing them in __all__: only the module itself knows
+        func = None
+        if not attr.startswith("_"):
+            func = getattr(importlib.import_module(module), attr, None)
+        if not inspect.isfunction(func):
+            raise ValueError(f"Function '{name}' not found in function pool")
+        return func
+
+    def _index_of(self, module: str) -> List[str]:
+        return function_index.default_index().functions(module)
 
-    def _register_default_functions(self):
-        for name, func in inspect.getmembers(funcs, inspect.isfunction):
-            self.register(name, func)
+    def _load_entry_points(self):
+        # only when a name is not otherwise known: scanning installed
+        # distributions costs more than everything else here
+        if not self._entry_points_loaded:
+            self._entry_points_loaded = True
+            for namespace, module in function_index.entry_point_modules().items():
+                self._modules.setdefault(namespace, module)
 
 
-function_pool = FunctionPool()
+__getattr__ = lazy_singletons(globals(), function_pool=FunctionPool)
@@ -0,0 +1,42 @@
+from typing import Callable, Optional, TypeVar
+
+F = TypeVar("F", bound=Callable)
+
+_NONDETERMINISTIC = "__simplytest_nondeterministic__"
+_BATCH = "__simplytest_batch__"
+
+
+def nondeterministic(func: F) -> F:
+    """
+    Mark a step function whose result can change between runs with the
+    same input (randomness, clocks, remote services). Cases calling it are
+    never replayed from the result cache.
+    """
+    setattr(func, _NONDETERMINISTIC, True)
+    return func
+
+
+def is_nondeterministic(func: Callable) -> bool:
+    return getattr(func, _NONDETERMINISTIC, False)
+
+
+def batch(bulk: Callable) -> Callable[[F], F]:
+    """
+    Declare `bulk` as the batched form of the decorated step function, used
+    by cases with `rows`. It is called once with a list of (args, kwargs),
+    one per row, and returns a list with one result per row; a result that
+    is an exception instance breaks just that row.
+
+        @markers.batch(_echo_batch)
+        def echo(*args, **kwargs): ...
+    """
+
+    def mark(func: F) -> F:
+        setattr(func, _BATCH, bulk)
+        return func
+
+    return mark
+
+
+def batch_function(func: Callable) -> Optional[Callable]:
+    return getattr(func, _BATCH, None)
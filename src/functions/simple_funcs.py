@@ -1,8 +1,9 @@
 # from src.utils.allure_utils import allure_func
-from src.api_clients.simple_client import my_client
 import time
 import random
-import allure
+from src.utils.report import attach_text
+from src.functions import markers
+from src import api_clients  # the clients are built on first use
 
 
 # @allure_func
@@ -30,19 +31,56 @@ def sleep(seconds: int):
     time.sleep(seconds)
 
 
+def _echo_params(calls):
+    # what echo() would send for each row
+    return [args[0] if args else kwargs for args, kwargs in calls]
+
+
+def _echo_batch(calls):
+    """All rows in one request: the echo endpoint returns the list it gets"""
+    return api_clients.my_client.echo(_echo_params(calls))
+
+
+async def _async_echo_batch(calls):
+    return await api_clients.my_async_client.echo(_echo_params(calls))
+
+
+@markers.nondeterministic
+@markers.batch(_echo_batch)
 def echo(*args, **kwargs):
-    return my_client.echo(*args, **kwargs)
+    return api_clients.my_client.echo(*args, **kwargs)
 
 
+@markers.nondeterministic
 def edgeos_health(*args, **kwargs):
-    return my_client.health_check(*args, **kwargs)
+    return api_clients.my_client.health_check(*args, **kwargs)
+
+
+@markers.nondeterministic
+def stream_body(endpoint, method="get", **kwargs):
+    """The response body as an iterator of byte chunks, for large payloads"""
+    return api_clients.my_client.stream(method, endpoint, **kwargs)
+
+
+@markers.nondeterministic
+def body_view(endpoint, method="get", **kwargs):
+    """The response body as a memoryview, sliced without copying"""
+    return api_clients.my_client.body_view(method, endpoint, **kwargs)
+
+
+@markers.nondeterministic
+@markers.batch(_async_echo_batch)
+async def async_echo(*args, **kwargs):
+    return await api_clients.my_async_client.echo(*args, **kwargs)
+
+
+@markers.nondeterministic
+async def async_edgeos_health(*args, **kwargs):
+    return await api_clients.my_async_client.health_check(*args, **kwargs)
 
 
+@markers.nondeterministic
 def add_rando(*args):
     rando = random.randint(1, 10)
-    allure.attach(
-        name="add_rando log",
-        body=f"Rando generated is: {rando}",
-        attachment_type=allure.attachment_type.TEXT,
-    )
+    attach_text("add_rando log", lambda: f"Rando generated is: {rando}")
     return sum(args) + rando
@@ -0,0 +1,259 @@
+"""
+Replay the cases of suite files as load: at a fixed rate or concurrency,
+for a fixed duration, with allure reporting switched off.
+
+    python -m src.load_runner tests/simpletest.json --rate 200 --duration 60
+    python -m src.load_runner tests/simpletest.json -c 16 --duration 60
+
+With --rate, cases are started on a fixed schedule (open loop) and their
+latency is measured from the scheduled start, so a slow target shows up
+as latency instead of as a lower request rate. With --concurrency alone,
+that many workers run cases back to back (closed loop).
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.case_runner import CaseRunner
+from src.functions.function_pool import FunctionPool
+from src.utils.case_utils import TestCase, iter_test_cases, status_of
+from src.utils.histogram import Histogram
+from src.utils.logger import logger
+from src.utils.report import ReportLevel, get_report_level, set_report_level
+
+# worker threads used to keep up with --rate when no concurrency is given
+DEFAULT_RATE_WORKERS = 64
+
+
+@dataclass
+class FunctionStats:
+    latency: Histogram = field(default_factory=Histogram)
+    errors: Counter = field(default_factory=Counter)
+
+    def to_dict(self) -> Dict[str, Any]:
+        failed = sum(self.errors.values())
+        return {
+            **self.latency.summary(),
+            "errors": failed,
+            "error_rate": failed / self.latency.count if self.latency.count else 0.0,
+            "error_statuses": dict(self.errors),
+        }
+
+
+@dataclass
+class LoadReport:
+    duration: float = 0.0
+    cases: Histogram = field(default_factory=Histogram)
+    statuses: Counter = field(default_factory=Counter)
+    functions: Dict[str, FunctionStats] = field(
+        default_factory=lambda: defaultdict(FunctionStats)
+    )
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, latency: float, status: str, runner: CaseRunner):
+        self.cases.record(latency)
+        for step_result in runner.ctx.steps:
+            with self._lock:
+                stats = self.functions[step_result.step.function]
+            stats.latency.record(step_result.duration)
+            if step_result.status != "PASSED":
+                with self._lock:
+                    stats.errors[step_result.status] += 1
+        with self._lock:
+            self.statuses[status] += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "duration": self.duration,
+            "throughput": self.cases.count / self.duration if self.duration else 0.0,
+            "statuses": dict(self.statuses),
+            "cases": self.cases.summary(),
+            "functions": {
+                name: stats.to_dict() for name, stats in sorted(self.functions.items())
+            },
+        }
+
+    def format(self) -> str:
+        data = self.to_dict()
+        lines = [
+            f"{data['cases']['count']} cases in {self.duration:.1f}s "
+            f"({data['throughput']:.1f}/s), "
+            + ", ".join(f"{n} {s}" for s, n in sorted(self.statuses.items())),
+            f"{'':<24}{'count':>9}{'err%':>8}{'p50':>10}{'p90':>10}"
+            f"{'p99':>10}{'p99.9':>10}{'max':>10}",
+        ]
+        rows = [("(case)", {**data["cases"], "error_rate": self._case_error_rate()})]
+        rows += list(data["functions"].items())
+        for name, stats in rows:
+            lines.append(
+                f"{name:<24}{stats['count']:>9}{stats['error_rate'] * 100:>7.2f}%"
+                + "".join(
+                    f"{stats[key] * 1000:>8.1f}ms"
+                    for key in ("p50", "p90", "p99", "p99.9", "max")
+                )
+            )
+        return "\n".join(lines)
+
+    def _case_error_rate(self) -> float:
+        failed = sum(n for status, n in self.statuses.items() if status != "PASSED")
+        return failed / self.cases.count if self.cases.count else 0.0
+
+
+class LoadRunner:
+    """Drives CaseRunner over `cases`, round-robin, recording into a LoadReport"""
+
+    def __init__(
+        self,
+        cases: Sequence[TestCase],
+        function_pool: Optional[FunctionPool] = None,
+    ):
+        if not cases:
+            raise ValueError("no test cases to run")
+        self.cases = list(cases)
+        self.function_pool = function_pool or FunctionPool()
+        self.report = LoadReport()
+        # CaseRunner keeps the running case on the instance: one per thread
+        self._local = threading.local()
+        self._next_case = itertools.count()
+        # crashes of _run_one itself (not case failures), raised after a run
+        self._errors: List[BaseException] = []
+
+    def _runner(self) -> CaseRunner:
+        runner = getattr(self._local, "runner", None)
+        if runner is None:
+            runner = self._local.runner = CaseRunner(self.function_pool)
+            # load means running every case, cached or not, and its many
+            # repeats say nothing about how the case usually fares
+            runner.result_cache = None
+            runner.case_history = None
+        return runner
+
+    def _run_one(self, scheduled: Optional[float] = None):
+        runner = self._runner()
+        test_case = self.cases[next(self._next_case) % len(self.cases)]
+        start = time.perf_counter()
+        try:
+            runner.execute_test_case(test_case)
+            status = "PASSED"
+        except Exception as e:
+            status = status_of(e)
+        # open loop: count the time the case waited for a free worker too
+        latency = time.perf_counter() - (scheduled or start)
+        self.report.add(latency, status, runner)
+
+    def _check(self, future: Future):
+        # futures aren't kept: a soak run would pile up millions of them
+        if future.exception() is not None:
+            self._errors.append(future.exception())
+
+    def _raise_errors(self):
+        if self._errors:
+            error = self._errors[0]
+            raise RuntimeError(
+                f"{len(self._errors)} load worker(s) crashed, the first with: {error!r}"
+            ) from error
+
+    def run_at_rate(self, rate: float, duration: float, workers: int) -> LoadReport:
+        interval = 1 / rate
+        with ThreadPoolExecutor(workers, thread_name_prefix="load") as executor:
+            start = time.perf_counter()
+            for n in itertools.count():
+                scheduled = start + n * interval
+                if scheduled - start >= duration:
+                    break
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self._run_one, scheduled).add_done_callback(
+                    self._check
+                )
+        self.report.duration = time.perf_counter() - start
+        self._raise_errors()
+        return self.report
+
+    def run_with_concurrency(self, concurrency: int, duration: float) -> LoadReport:
+        start = time.perf_counter()
+        deadline = start + duration
+
+        def worker():
+            try:
+                while time.perf_counter() < deadline:
+                    self._run_one()
+            except BaseException as e:
+                self._errors.append(e)
+
+        threads = [
+            threading.Thread(target=worker, name=f"load-{i}")
+            for i in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.report.duration = time.perf_counter() - start
+        self._raise_errors()
+        return self.report
+
+
+def run_load(
+    suite_paths: Sequence[str],
+    duration: float,
+    rate: Optional[float] = None,
+    concurrency: Optional[int] = None,
+    function_pool: Optional[FunctionPool] = None,
+) -> LoadReport:
+    cases: List[TestCase] = []
+    for suite_path in suite_paths:
+        cases.extend(iter_test_cases(suite_path))
+    runner = LoadRunner(cases, function_pool)
+    report_level = get_report_level()
+    set_report_level(ReportLevel.OFF)
+    # the runners log every case and every retry; under load that is just
+    # overhead, the report has the numbers
+    log_level = logger.level
+    logger.setLevel(logging.ERROR)
+    try:
+        if rate:
+            return runner.run_at_rate(
+                rate, duration, concurrency or DEFAULT_RATE_WORKERS
+            )
+        return runner.run_with_concurrency(concurrency or 1, duration)
+    finally:
+        logger.setLevel(log_level)
+        set_report_level(report_level)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("suites", nargs="+", help="suite JSON files")
+    parser.add_argument("-d", "--duration", type=float, default=10, help="seconds")
+    parser.add_argument("-r", "--rate", type=float, default=None, help="cases/second")
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=None,
+        help="workers (caps in-flight cases with --rate)",
+    )
+    parser.add_argument("--results", default=None, help="write the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = run_load(args.suites, args.duration, args.rate, args.concurrency)
+    print(report.format())
+    if args.results:
+        with open(args.results, "w") as f:
+            json.dump(report.to_dict(), f, indent=2)
+    return 1 if report.statuses.keys() - {"PASSED"} else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
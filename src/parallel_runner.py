@@ -0,0 +1,211 @@
+"""
+Run suite JSON files with their test cases sharded across worker processes.
+
+    python -m src.parallel_runner tests/simpletest.json -n 4 --alluredir allure-results
+
+Every worker builds its own CaseRunner/FunctionPool, so no runner state is
+shared between cases running at the same time. Cases tagged `serial` are
+kept out of the pool and run one by one, in a worker of their own, afterwards.
+With SIMPLYTEST_SCHEDULE=history both are started most failure-prone
+first (see src.utils.case_history); outcomes are listed in suite order.
+"""
+
+import argparse
+import json
+import multiprocessing
+import multiprocessing.util
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import src.utils.constants as const
+from src.api_clients import cassette
+from src.case_runner import CaseRunner
+from src.functions.function_pool import FunctionPool
+from src.utils import case_history, fixtures, timing
+from src.utils.allure_utils import AllureCaseReporter, register_case_reporter
+from src.utils.case_utils import (
+    CaseRef,
+    TestCase,
+    has_tag,
+    iter_case_refs,
+    status_of,
+)
+
+
+@dataclass
+class CaseOutcome:
+    suite: str
+    index: int
+    description: Optional[str]
+    status: str
+    error: Optional[str] = None
+    duration: float = 0.0
+
+
+# cases travel to the workers as CaseRefs and are parsed there, so the main
+# process never holds more than the locations of the cases
+Job = Tuple[str, int, str, CaseRef]
+
+# per-process state, set up by _init_worker
+_runner: Optional[CaseRunner] = None
+_reporter: Optional[AllureCaseReporter] = None
+
+
+def _init_worker(alluredir: Optional[str]):
+    global _runner, _reporter
+    _runner = CaseRunner(FunctionPool())
+    _reporter = register_case_reporter(alluredir) if alluredir else None
+    # pool workers exit without running atexit hooks, but do run these
+    multiprocessing.util.Finalize(
+        None, fixtures.shared_setups.finish, exitpriority=10
+    )
+
+
+def _execute(suite_path: str, index: int, suite_name: str, test_case: TestCase):
+    if _reporter is None:
+        return _runner.execute_test_case(test_case)
+    with _reporter.test_case(
+        name=test_case.description or f"case {index}",
+        full_name=f"{suite_path}::{index}",
+        labels={"suite": suite_name},
+    ):
+        return _runner.execute_test_case(test_case)
+
+
+def _run_case(job: Job) -> Tuple[CaseOutcome, Dict, List, Dict]:
+    suite_path, index, suite_name, case_ref = job
+    start = time.perf_counter()
+    status, error = "PASSED", None
+    try:
+        _execute(suite_path, index, suite_name, case_ref.load())
+    except Exception as e:
+        status = status_of(e)
+        error = str(e) if status == "FAILED" else f"{type(e).__name__}: {e}"
+    outcome = CaseOutcome(
+        suite=suite_path,
+        index=index,
+        description=case_ref.description,
+        status=status,
+        error=error,
+        duration=time.perf_counter() - start,
+    )
+    # timing records, history updates and recorded HTTP interactions travel
+    # back with the outcome and are written by the main process only
+    return (
+        outcome,
+        timing.collector.drain(),
+        case_history.history.drain(),
+        cassette.drain_recordings(),
+    )
+
+
+def collect_jobs(suite_paths: Sequence[str]) -> Tuple[List[Job], List[Job]]:
+    """Split all cases of the given suites into (parallel, serial) jobs"""
+    parallel, serial = [], []
+    for suite_path in suite_paths:
+        header = {}
+        refs = list(iter_case_refs(suite_path, header))
+        if not refs:
+            raise ValueError(f"no test cases found in {suite_path}")
+        suite_name = header.get(const.DESCRIPTION, "No description")
+        for index, case_ref in enumerate(refs):
+            job = (suite_path, index, suite_name, case_ref)
+            if has_tag(case_ref, const.SERIAL_TAG):
+                serial.append(job)
+            else:
+                parallel.append(job)
+    return parallel, serial
+
+
+def _by_history(jobs: List[Job]) -> List[Job]:
+    keys = [
+        case_history.case_key(os.path.abspath(suite_path), case_ref.description)
+        for suite_path, _, _, case_ref in jobs
+    ]
+    return [jobs[i] for i in case_history.history.prioritize(keys)]
+
+
+def run_suites(
+    suite_paths: Sequence[str],
+    workers: Optional[int] = None,
+    alluredir: Optional[str] = None,
+) -> List[CaseOutcome]:
+    """
+    Run every case of `suite_paths` and return their outcomes in suite/JSON
+    order. All workers write allure results straight into `alluredir`;
+    result files are uuid-named, so the directory is the merged report.
+    """
+    workers = workers or os.cpu_count() or 1
+    parallel, serial = collect_jobs(suite_paths)
+    position = {path: n for n, path in enumerate(suite_paths)}
+    if case_history.schedule() == case_history.HISTORY_ORDER:
+        parallel, serial = _by_history(parallel), _by_history(serial)
+
+    outcomes = []
+
+    def collect(results):
+        for outcome, timing_records, history_updates, recordings in results:
+            outcomes.append(outcome)
+            timing.collector.extend(timing_records)
+            case_history.history.extend(history_updates)
+            cassette.extend_recordings(recordings)
+
+    def run_in_pool(jobs: List[Job], max_workers: int):
+        chunksize = max(1, len(jobs) // (max_workers * 4))
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(alluredir,),
+        ) as executor:
+            collect(executor.map(_run_case, jobs, chunksize=chunksize))
+
+    if parallel:
+        run_in_pool(parallel, workers)
+    if serial:
+        # a single worker, rather than this process: allure keeps one step
+        # stack per thread for all its reporters, so a case reporter here
+        # would tangle its steps with those of any listener already running
+        # (allure-pytest's, or the one of a previous run)
+        run_in_pool(serial, 1)
+    case_history.history.save()
+    cassette.save_recordings()
+
+    return sorted(outcomes, key=lambda o: (position[o.suite], o.index))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("suites", nargs="+", help="suite JSON files")
+    parser.add_argument("-n", "--workers", type=int, default=None)
+    parser.add_argument("--alluredir", default=None)
+    parser.add_argument("--results", default=None, help="write outcomes as JSON")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    outcomes = run_suites(args.suites, args.workers, args.alluredir)
+    elapsed = time.perf_counter() - start
+
+    for outcome in outcomes:
+        line = f"{outcome.status:<7} {outcome.suite}::{outcome.index} {outcome.description}"
+        print(line if not outcome.error else f"{line}\n        {outcome.error}")
+    failed = [o for o in outcomes if o.status in ("FAILED", "BROKEN")]
+    skipped = sum(o.status == "SKIPPED" for o in outcomes)
+    passed = len(outcomes) - len(failed) - skipped
+    print(
+        f"{passed} passed, {len(failed)} failed, {skipped} skipped"
+        f" in {elapsed:.2f}s"
+    )
+
+    if args.results:
+        with open(args.results, "w") as f:
+            json.dump([asdict(o) for o in outcomes], f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,40 @@
 import allure
+from allure_commons import hookimpl, plugin_manager
+from allure_commons.logger import AllureFileLogger
+from allure_commons.model2 import (
+    Label,
+    Parameter,
+    Status,
+    StatusDetails,
+    TestResult,
+    TestStepResult,
+)
+from allure_commons.reporter import AllureReporter
+from allure_commons.utils import (
+    format_exception,
+    format_traceback,
+    md5,
+    now,
+    uuid4,
+)
+from contextlib import contextmanager
 from functools import wraps
 import logging
 import json
+from src.utils.report import ReportLevel, get_report_level
 
 
+@contextmanager
 def allure_step(message):
-    def wrapper(func):
-        @allure.step(message)
-        @wraps(func)
-        def _wrapper(*args, **kwargs):
-            print(f"Executing step: {message}")
-            return func(*args, **kwargs)
-
-        return _wrapper
-
-    return wrapper
+    """
+    allure.step, left out at ReportLevel.OFF. Works as a decorator or as a
+    context manager; the level is checked each time the step runs.
+    """
+    if get_report_level() == ReportLevel.OFF:
+        yield
+        return
+    with allure.step(message):
+        yield
 
 
 def allure_func(func):
@@ -42,7 +62,6 @@ def allure_func(func):
 
         with allure.step(func_description):
             logging.info(f"STEP: {func_description}")
-            print(f"STEP: {func_description}")
             allure.attach(
                 body=json.dumps(context, indent=2),
                 name="func_input",
@@ -57,3 +76,98 @@ def allure_func(func):
             return res
 
     return wrapper
+
+
+def _status(exception):
+    if exception is None:
+        return Status.PASSED
+    if isinstance(exception, AssertionError):
+        return Status.FAILED
+    return Status.BROKEN
+
+
+def _status_details(exc_type, exception, exc_tb):
+    message = format_exception(exc_type, exception)
+    trace = format_traceback(exc_tb)
+    return StatusDetails(message=message, trace=trace) if message or trace else None
+
+
+class AllureCaseReporter:
+    """
+    Minimal allure listener for running cases outside pytest (e.g. in the
+    worker processes of the parallel runner): collects steps and attachments
+    into one allure test result per case.
+    """
+
+    def __init__(self, alluredir: str):
+        self.reporter = AllureReporter()
+        self.file_logger = AllureFileLogger(alluredir)
+
+    @contextmanager
+    def test_case(self, name: str, full_name: str, labels: dict = None):
+        uuid = uuid4()
+        result = TestResult(
+            uuid=uuid,
+            name=name,
+            fullName=full_name,
+            historyId=md5(full_name),
+            start=now(),
+            labels=[Label(name=k, value=v) for k, v in (labels or {}).items()],
+        )
+        self.reporter.schedule_test(uuid, result)
+        try:
+            yield result
+        except BaseException as e:
+            result.status = _status(e)
+            result.statusDetails = _status_details(type(e), e, e.__traceback__)
+            raise
+        else:
+            result.status = Status.PASSED
+        finally:
+            result.stop = now()
+            self.reporter.close_test(uuid)
+
+    @hookimpl
+    def start_step(self, uuid, title, params):
+        parameters = [Parameter(name=name, value=value) for name, value in params.items()]
+        step = TestStepResult(name=title, start=now(), parameters=parameters)
+        self.reporter.start_step(None, uuid, step)
+
+    @hookimpl
+    def stop_step(self, uuid, exc_type, exc_val, exc_tb):
+        self.reporter.stop_step(
+            uuid,
+            stop=now(),
+            status=_status(exc_val),
+            statusDetails=_status_details(exc_type, exc_val, exc_tb),
+        )
+
+    @hookimpl
+    def attach_data(self, body, name, attachment_type, extension):
+        self.reporter.attach_data(
+            uuid4(), body, name=name, attachment_type=attachment_type, extension=extension
+        )
+
+    @hookimpl
+    def attach_file(self, source, name, attachment_type, extension):
+        self.reporter.attach_file(
+            uuid4(), source, name=name, attachment_type=attachment_type, extension=extension
+        )
+
+
+def register_case_reporter(alluredir: str) -> AllureCaseReporter:
+    """
+    Write allure results for cases run in this process into `alluredir`,
+    until unregister_case_reporter(). Allure reporters share one step stack
+    per thread, so this is meant for processes without another allure
+    listener (such as allure-pytest's) reporting at the same time.
+    """
+    case_reporter = AllureCaseReporter(alluredir)
+    plugin_manager.register(case_reporter.file_logger)
+    plugin_manager.register(case_reporter)
+    return case_reporter
+
+
+def unregister_case_reporter(case_reporter: AllureCaseReporter):
+    plugin_manager.unregister(case_reporter)
+    plugin_manager.unregister(case_reporter.file_logger)
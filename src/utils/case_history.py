@@ -0,0 +1,185 @@
+"""
+How each case fared in past runs, for running likely failures first.
+
+With SIMPLYTEST_SCHEDULE=history (or SIMPLYTEST_HISTORY=1, to keep the
+history without using it), every finished case updates its record in
+.simplytest_cache/history.json: an exponentially weighted failure rate and
+duration, so recent runs count most. With SIMPLYTEST_SCHEDULE=history,
+pytest (tests/conftest.py) and parallel_runner run cases by descending
+failure rate, shorter cases first among equals; cases without a record
+count as failing, so new ones go first. The default, SIMPLYTEST_SCHEDULE=file,
+keeps the suite order and records nothing.
+
+Cases are identified by suite file and description, so a record survives
+edits to the steps; cases sharing both share a record. Skipped cases are
+not recorded.
+"""
+
+import atexit
+import json
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.utils.files import atomic_write
+from src.utils.suite_cache import cache_dir
+
+SCHEDULE_ENV = "SIMPLYTEST_SCHEDULE"
+FILE_ORDER = "file"
+HISTORY_ORDER = "history"
+SCHEDULES = (FILE_ORDER, HISTORY_ORDER)
+HISTORY_ENV = "SIMPLYTEST_HISTORY"  # set to 1 to record under the file schedule
+# weight of the latest run in the failure rate and duration averages
+WEIGHT = 0.3
+
+
+def schedule() -> str:
+    value = os.environ.get(SCHEDULE_ENV, FILE_ORDER).lower()
+    if value not in SCHEDULES:
+        raise ValueError(
+            f'{SCHEDULE_ENV}="{value}" is not one of {", ".join(SCHEDULES)}'
+        )
+    return value
+
+
+def enabled() -> bool:
+    """Whether runners record finished cases into the history"""
+    if os.environ.get(SCHEDULE_ENV, "").lower() == HISTORY_ORDER:
+        return True
+    return os.environ.get(HISTORY_ENV, "0").lower() in ("1", "true", "yes")
+
+
+def case_key(suite: str, description: Optional[str]) -> str:
+    return f"{suite}::{description or ''}"
+
+
+@dataclass(slots=True)
+class Pending:
+    """
+    The runs of one case since the last save, folded into the record they
+    would make on their own. Applying them to an older record only needs
+    their first run and how little of the older record is left after them.
+    """
+
+    runs: int
+    failure_rate: float
+    duration: float
+    first_failure: float
+    first_duration: float
+    decay: float
+
+    @classmethod
+    def of(cls, status: str, duration: float) -> "Pending":
+        failed = 0.0 if status == "PASSED" else 1.0
+        return cls(1, failed, duration, failed, duration, 1.0 - WEIGHT)
+
+    def apply(self, record: Optional[Dict[str, float]]) -> Dict[str, float]:
+        """`record` updated with these runs, or their own record without one"""
+        if record is None:
+            return {
+                "runs": self.runs,
+                "failure_rate": self.failure_rate,
+                "duration": self.duration,
+            }
+        return {
+            "runs": record["runs"] + self.runs,
+            "failure_rate": self.failure_rate
+            + self.decay * (record["failure_rate"] - self.first_failure),
+            "duration": self.duration
+            + self.decay * (record["duration"] - self.first_duration),
+        }
+
+    def then(self, later: "Pending") -> "Pending":
+        """These runs followed by `later`, folded into one"""
+        record = later.apply(self.apply(None))
+        return Pending(
+            record["runs"],
+            record["failure_rate"],
+            record["duration"],
+            self.first_failure,
+            self.first_duration,
+            self.decay * later.decay,
+        )
+
+
+class CaseHistory:
+    """
+    Failure rate and duration per case. record() folds finished cases into
+    one pending update per case, which save() merges into the file, at the
+    latest on exit.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self._path = path
+        self._records: Optional[Dict[str, Dict[str, float]]] = None
+        self._pending: Dict[str, Pending] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> Path:
+        # the default follows SIMPLYTEST_CACHE_DIR, as it is when saving
+        return self._path or cache_dir() / "history.json"
+
+    def _load(self) -> Dict[str, Dict[str, float]]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def records(self) -> Dict[str, Dict[str, float]]:
+        """The records as of the start of the run (or the last save)"""
+        with self._lock:
+            if self._records is None:
+                self._records = self._load()
+            return self._records
+
+    def priority(self, key: str) -> Tuple[float, float]:
+        """Sort key: most failure-prone first, then shortest"""
+        record = self.records().get(key)
+        if record is None:
+            return -1.0, 0.0
+        return -record["failure_rate"], record["duration"]
+
+    def prioritize(self, keys: Sequence[str]) -> List[int]:
+        """Indices of `keys` in the order their cases should run"""
+        return sorted(range(len(keys)), key=lambda i: self.priority(keys[i]))
+
+    def record(self, key: str, status: str, duration: float):
+        if status == "SKIPPED":
+            return
+        self.extend({key: Pending.of(status, duration)})
+
+    def drain(self) -> Dict[str, Pending]:
+        """Take the updates pending so far (e.g. to ship them to another process)"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def extend(self, pending: Dict[str, Pending]):
+        with self._lock:
+            for key, update in pending.items():
+                earlier = self._pending.get(key)
+                self._pending[key] = update if earlier is None else earlier.then(update)
+
+    def save(self):
+        """Merge the pending updates into the file; a no-op without any"""
+        pending = self.drain()
+        if not pending:
+            return
+        # re-read, so runs finishing one after the other don't drop updates
+        records = self._load()
+        for key, update in pending.items():
+            records[key] = update.apply(records.get(key))
+        with self._lock:
+            self._records = records
+        try:
+            atomic_write(self.path, json.dumps(records, indent=1, sort_keys=True))
+        except OSError:
+            pass  # read-only checkout: the history just isn't kept
+
+
+history = CaseHistory()
+atexit.register(history.save)
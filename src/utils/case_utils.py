@@ -1,26 +1,133 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, asdict
+import hashlib
+import os
 import src.utils.constants as const
+from src.utils.json_stream import iter_json_lines, iter_object_array, read_value_at
+from src.utils.matchers import get_matcher
+from src.utils import suite_cache
+from src.utils.step_graph import Dependencies, build_dependencies
+from src.utils.retrying import (
+    DEFAULT_POLICY,
+    RetryPolicy,
+    exception_classes,
+    is_skip,
+)
+from src.utils.templates import Template
 import json
+import sys
 
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, FrozenSet, List, Any, Iterator, Optional, Tuple
 
+TEMPLATED_FIELDS = (const.INPUT_ARGS, const.INPUT_KWARGS, const.EXPECTED_RESULT)
+# shared by every step without placeholders; never mutated
+_NO_TEMPLATES: Dict[str, Template] = {}
 
-@dataclass
+# suites in these formats hold one test case object per line; a first line
+# without "steps" is the suite header (description, tag)
+JSON_LINES_SUFFIXES = (".jsonl", ".ndjson")
+
+
+# Parsed definitions (TestStep, TestCase) are frozen and slotted: one
+# instance is shared by every execution of a case, sequential or parallel.
+# Everything an execution produces goes into StepResult/CaseResult.
+
+
+# Pickling state of TestStep/TestCase: the field values as a tuple, in slot
+# order. The suite cache unpickles thousands of these per suite, and the
+# dataclasses default walks fields() once per object.
+_slot_setters: Dict[type, Tuple[Callable[[Any, Any], None], ...]] = {}
+
+
+def _get_slot_state(self) -> Tuple[Any, ...]:
+    return tuple([getattr(self, name) for name in self.__slots__])
+
+
+def _set_slot_state(self, state: Tuple[Any, ...]):
+    cls = type(self)
+    setters = _slot_setters.get(cls)
+    if setters is None:
+        # the slot descriptors themselves: frozen classes refuse setattr
+        setters = tuple(getattr(cls, name).__set__ for name in cls.__slots__)
+        _slot_setters[cls] = setters
+    for set_slot, value in zip(setters, state):
+        set_slot(self, value)
+
+
+@dataclass(frozen=True, slots=True)
 class TestStep:
     function: str
-    input_args: List[Any]
+    input_args: Tuple[Any, ...]
     input_kwargs: Dict[str, Any]
     expected_result: Any = None
     assertion_type: str = "equal_to"
-    retry_count: int = 3
+    retry_count: Optional[int] = 3
     retry_delay: float = 1.0
     description: str = "No step description provided"
-    result: Optional[Dict] = None
     save_result_to: str = ""
     expected_key: str = ""
+    retry_backoff: float = 1.0
+    retry_max_delay: Optional[float] = None
+    retry_jitter: float = 0.0
+    retry_deadline: Optional[float] = None
+    # exception names retried on top of AssertionError, see retrying.exception_classes
+    retry_on: Tuple[str, ...] = ()
+    # re-run only the function and the assertion until it passes
+    poll: bool = False
+    # profile every execution of the step, see src.utils.profiling
+    profile: bool = False
+    # for parallel_steps cases: names of steps to wait for on top of the
+    # ones the data flow already implies
+    name: str = ""
+    depends_on: Tuple[str, ...] = ()
+    # compiled once per step, for the templated fields holding placeholders
+    templates: Dict[str, Template] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    retry_policy: RetryPolicy = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
+    __getstate__ = _get_slot_state
+    __setstate__ = _set_slot_state
 
-@dataclass
+    def __post_init__(self):
+        templates = {}
+        for name in TEMPLATED_FIELDS:
+            template = Template(getattr(self, name))
+            if template.plan is not None:
+                templates[name] = template
+        object.__setattr__(self, "templates", templates or _NO_TEMPLATES)
+
+        policy = RetryPolicy(
+            tries=self.retry_count,
+            delay=self.retry_delay,
+            backoff=self.retry_backoff,
+            max_delay=self.retry_max_delay,
+            jitter=self.retry_jitter,
+            deadline=self.retry_deadline,
+            exceptions=(AssertionError, *exception_classes(self.retry_on)),
+        )
+        # most steps keep the defaults and share one policy
+        if policy == DEFAULT_POLICY:
+            policy = DEFAULT_POLICY
+        object.__setattr__(self, "retry_policy", policy)
+
+    @property
+    def reads(self) -> FrozenSet[str]:
+        """Root names of the variables the step's placeholders refer to"""
+        return frozenset().union(
+            *(template.references for template in self.templates.values())
+        )
+
+    def resolve(self, name: str, variables: Dict[str, Any]) -> Any:
+        """Value of a templated field with its placeholders filled in"""
+        template = self.templates.get(name)
+        if template is None:
+            return getattr(self, name)
+        return template.render(variables)
+
+
+@dataclass(frozen=True, slots=True)
 class TestCase:
     steps: List[TestStep]
     description: Optional[str] = None
@@ -28,6 +135,64 @@ class TestCase:
     setup_steps: Optional[List[TestStep]] = None
     teardown_steps: Optional[List[TestStep]] = None
     variables: Dict[str, Any] = field(default_factory=dict)
+    # run independent steps concurrently, see src.utils.step_graph
+    parallel_steps: bool = False
+    # batched case: the single step runs once per row, with the row's values
+    # as variables; a function marked @batch gets all rows in one call
+    rows: Optional[Tuple[Dict[str, Any], ...]] = None
+    # how often setup_steps/teardown_steps run, see src.utils.fixtures
+    setup_scope: str = const.CASE_SCOPE
+    # absolute path of the suite file the case was loaded from
+    suite: str = ""
+    step_dependencies: Optional[Dependencies] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    # identifies a shared (suite or session scoped) setup: cases with the
+    # same key share one execution of it
+    setup_key: Optional[str] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    __getstate__ = _get_slot_state
+    __setstate__ = _set_slot_state
+
+    def __post_init__(self):
+        if self.parallel_steps:
+            object.__setattr__(
+                self, "step_dependencies", build_dependencies(self.steps)
+            )
+        if self.setup_scope not in const.SETUP_SCOPES:
+            raise ValueError(
+                f'"{self.setup_scope}" is not a setup scope'
+                f" ({', '.join(const.SETUP_SCOPES)})"
+            )
+        if self.setup_scope != const.CASE_SCOPE and (
+            self.setup_steps or self.teardown_steps
+        ):
+            self._check_shared_variables()
+            object.__setattr__(self, "setup_key", self._shared_setup_key())
+
+    def _check_shared_variables(self):
+        shared = {step.save_result_to for step in self.setup_steps or ()}
+        for step in self.steps:
+            if step.save_result_to and step.save_result_to in shared:
+                raise ValueError(
+                    f'step "{step.description}" saves to "{step.save_result_to}",'
+                    f" which the {self.setup_scope} setup shares read-only"
+                )
+
+    def _shared_setup_key(self) -> str:
+        definition = {
+            const.SETUP_SCOPE: self.setup_scope,
+            const.SETUP_STEPS: [_step_to_dict(s) for s in self.setup_steps or ()],
+            const.TEARDOWN_STEPS: [
+                _step_to_dict(s) for s in self.teardown_steps or ()
+            ],
+        }
+        if self.setup_scope == const.SUITE_SCOPE:
+            definition["suite"] = self.suite
+        encoded = json.dumps(definition, sort_keys=True, default=str).encode()
+        return hashlib.sha256(encoded).hexdigest()
 
 
 @dataclass
@@ -37,22 +202,141 @@ class TestSuites:
     test_cases: List[TestCase]
 
 
+@dataclass(slots=True)
+class StepResult:
+    """Outcome of one execution of a TestStep"""
+
+    step: TestStep
+    description: str
+    status: str = "PENDING"
+    func_return: Any = None
+    duration: float = 0.0
+    error: Optional[str] = None
+    attempts: int = 0
+    # seconds per phase, see src.utils.timing.PHASES
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            const.DESCRIPTION: self.description,
+            const.FUNCTION: self.step.function,
+            const.STATUS: self.status,
+            "func_return": self.func_return,
+            "duration": self.duration,
+            "attempts": self.attempts,
+            "timings": self.timings,
+            const.ERROR: self.error,
+        }
+
+
+@dataclass(slots=True)
+class CaseResult:
+    """
+    Per-execution state of a TestCase: the variables it reads and writes
+    (a copy of the case's initial variables) and its step results
+    """
+
+    case: TestCase
+    variables: Dict[str, Any]
+    steps: List[StepResult] = field(default_factory=list)
+    status: str = "PASSED"
+    error: Optional[str] = None
+    duration: float = 0.0
+
+    @classmethod
+    def start(cls, test_case: TestCase) -> "CaseResult":
+        return cls(case=test_case, variables=dict(test_case.variables or {}))
+
+    SUMMARY_KEYS = (const.STATUS, const.ERROR, const.EXECUTION_TIME)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            const.STATUS: self.status,
+            const.ERROR: self.error,
+            const.EXECUTION_TIME: self.duration,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            const.DESCRIPTION: self.case.description,
+            const.TAG: self.case.tag,
+            const.VARIABLES: self.variables,
+            const.STEPS: [step.to_dict() for step in self.steps],
+            const.STATUS: self.status,
+            const.ERROR: self.error,
+            const.EXECUTION_TIME: self.duration,
+        }
+
+
+def status_of(exception: BaseException) -> str:
+    if isinstance(exception, AssertionError):
+        return "FAILED"
+    return "SKIPPED" if is_skip(exception) else "BROKEN"
+
+
+def _strip_step_internals(step: Dict[str, Any]) -> Dict[str, Any]:
+    del step["templates"], step["retry_policy"]
+    return step
+
+
+def _step_to_dict(step: TestStep) -> Dict[str, Any]:
+    return _strip_step_internals(asdict(step))
+
+
+def case_to_dict(test_case: TestCase) -> Dict[str, Any]:
+    """asdict() of a case without the compiled step internals, for reporting"""
+    data = asdict(test_case)
+    for key in (const.STEPS, const.SETUP_STEPS, const.TEARDOWN_STEPS):
+        for step in data.get(key) or []:
+            _strip_step_internals(step)
+    del data["step_dependencies"], data["setup_key"]
+    return data
+
+
+def has_tag(test_case: "TestCase | CaseRef", tag: str) -> bool:
+    """`tag` may be a single string or a list of strings in the suite JSON"""
+    if isinstance(test_case.tag, str):
+        return test_case.tag == tag
+    return tag in (test_case.tag or [])
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
 def _parse_step(step_data: Dict) -> TestStep:
+    # unknown assertion types fail here, at load time, rather than mid-run
+    get_matcher(step_data.get(const.ASSERTION_TYPE, "equal_to"))
+    # names repeat across the steps of data-driven suites, so intern them
     return TestStep(
-        function=step_data[const.FUNCTION],
-        input_args=step_data.get(const.INPUT_ARGS, []),
+        function=_intern(step_data[const.FUNCTION]),
+        input_args=tuple(step_data.get(const.INPUT_ARGS, ())),
         input_kwargs=step_data.get(const.INPUT_KWARGS, {}),
         expected_result=step_data.get(const.EXPECTED_RESULT),
-        assertion_type=step_data.get(const.ASSERTION_TYPE, "equal_to"),
-        retry_count=step_data.get(const.RETRY_COUNT, 3),
+        assertion_type=_intern(step_data.get(const.ASSERTION_TYPE, "equal_to")),
+        # a deadline on its own replaces the attempt count
+        retry_count=step_data.get(
+            const.RETRY_COUNT, None if const.RETRY_DEADLINE in step_data else 3
+        ),
         retry_delay=step_data.get(const.RETRY_DELAY, 1),
-        description=step_data.get(const.DESCRIPTION, "No step description provided"),
-        save_result_to=step_data.get(const.SAVE_RESULT_TO, ""),
-        expected_key=step_data.get("expected_key", ""),
+        retry_backoff=step_data.get(const.RETRY_BACKOFF, 1),
+        retry_max_delay=step_data.get(const.RETRY_MAX_DELAY),
+        retry_jitter=step_data.get(const.RETRY_JITTER, 0),
+        retry_deadline=step_data.get(const.RETRY_DEADLINE),
+        retry_on=tuple(step_data.get(const.RETRY_ON, ())),
+        poll=step_data.get(const.POLL, False),
+        profile=step_data.get(const.PROFILE, False),
+        name=_intern(step_data.get(const.NAME, "")),
+        depends_on=tuple(step_data.get(const.DEPENDS_ON, ())),
+        description=_intern(
+            step_data.get(const.DESCRIPTION, "No step description provided")
+        ),
+        save_result_to=_intern(step_data.get(const.SAVE_RESULT_TO, "")),
+        expected_key=_intern(step_data.get("expected_key", "")),
     )
 
 
-def _parse_test_case(test_case: Dict) -> TestCase:
+def _parse_test_case(test_case: Dict, suite: str = "") -> TestCase:
     steps = test_case.get(const.STEPS, [])
     if not steps:
         raise ValueError("no test steps found")
@@ -66,25 +350,142 @@ def _parse_test_case(test_case: Dict) -> TestCase:
 
     return TestCase(
         description=test_case.get(const.DESCRIPTION),
-        tag=test_case.get("tag", ""),
+        tag=test_case.get(const.TAG, ""),
         steps=parsed_steps,
         setup_steps=parsed_setup,
         teardown_steps=parsed_teardown,
         variables=test_case.get(const.VARIABLES, {}),
+        parallel_steps=test_case.get(const.PARALLEL_STEPS, False),
+        rows=_parse_rows(test_case),
+        setup_scope=test_case.get(const.SETUP_SCOPE, const.CASE_SCOPE),
+        suite=suite,
     )
 
 
+def _parse_rows(test_case: Dict) -> Optional[Tuple[Dict[str, Any], ...]]:
+    """
+    `rows` as dicts; with `columns`, each row may instead be a list of
+    values in column order
+    """
+    rows = test_case.get(const.ROWS)
+    if rows is None:
+        return None
+    if len(test_case[const.STEPS]) != 1:
+        raise ValueError("a case with rows takes exactly one step")
+    columns = [_intern(column) for column in test_case.get(const.COLUMNS, ())]
+    parsed = []
+    for i, row in enumerate(rows):
+        if isinstance(row, dict):
+            parsed.append(row)
+        elif len(row) == len(columns):
+            parsed.append(dict(zip(columns, row)))
+        else:
+            raise ValueError(
+                f"row {i + 1} has {len(row)} values for {len(columns)} columns"
+            )
+    return tuple(parsed)
+
+
+def _is_json_lines(json_path: str) -> bool:
+    return json_path.endswith(JSON_LINES_SUFFIXES)
+
+
+def _iter_raw_cases(json_path: str, header: Dict) -> Iterator[Tuple[int, Dict]]:
+    with open(json_path, "rb") as f:
+        if not _is_json_lines(json_path):
+            yield from iter_object_array(f, const.TEST_CASES, header)
+            return
+        for i, (offset, data) in enumerate(iter_json_lines(f)):
+            if i == 0 and const.STEPS not in data:
+                header.update(data)
+            else:
+                yield offset, data
+
+
+@dataclass(frozen=True)
+class CaseRef:
+    """Where one case lives in a suite file; cheap to hold, collect and pickle"""
+
+    path: str
+    offset: int
+    description: Optional[str] = None
+    tag: Any = None
+
+    @property
+    def suite(self) -> str:
+        """TestCase.suite of the case"""
+        return os.path.abspath(self.path)
+
+    def load(self) -> TestCase:
+        with open(self.path, "rb") as f:
+            if _is_json_lines(self.path):
+                f.seek(self.offset)
+                data = json.loads(f.readline())
+            else:
+                data = read_value_at(f, self.offset)
+        return _parse_test_case(data, self.suite)
+
+
+def iter_test_cases(json_path: str, header: Optional[Dict] = None) -> Iterator[TestCase]:
+    """
+    Parse the cases of a suite one at a time while reading the file, so
+    memory is bounded by the cases the caller still holds. Top-level suite
+    fields are collected into `header` as they are read.
+    """
+    for _, data in _iter_raw_cases(json_path, {} if header is None else header):
+        yield _parse_test_case(data, os.path.abspath(json_path))
+
+
+def iter_case_refs(json_path: str, header: Optional[Dict] = None) -> Iterator[CaseRef]:
+    """Like iter_test_cases, but yields CaseRefs to load each case on demand"""
+    for offset, data in _iter_raw_cases(json_path, {} if header is None else header):
+        yield CaseRef(
+            path=json_path,
+            offset=offset,
+            description=data.get(const.DESCRIPTION),
+            tag=data.get(const.TAG, ""),
+        )
+
+
 def load_test_cases(json_path: str) -> TestSuites:
-    with open(json_path, "r") as f:
-        json_data = json.load(f)
+    """Parse and validate a suite, reusing the on-disk cache when unchanged"""
+    suites = suite_cache.load(json_path, _load_test_cases)
+    # custom matchers are registered at run time, not part of the cache key
+    _check_matchers(suites.test_cases)
+    return suites
+
+
+def _check_matchers(test_cases: List[TestCase]):
+    assertion_types = {
+        step.assertion_type
+        for test_case in test_cases
+        for steps in (
+            test_case.steps,
+            test_case.setup_steps,
+            test_case.teardown_steps,
+        )
+        for step in steps or ()
+    }
+    for assertion_type in assertion_types:
+        get_matcher(assertion_type)
+
+
+def _load_test_cases(json_path: str) -> TestSuites:
+    if _is_json_lines(json_path):
+        json_data = {}
+        test_cases = [case for _, case in _iter_raw_cases(json_path, json_data)]
+    else:
+        with open(json_path, "r") as f:
+            json_data = json.load(f)
+        test_cases = json_data.get(const.TEST_CASES, [])
 
-    test_cases = json_data.get(const.TEST_CASES, [])
     if not test_cases:
         raise ValueError(f"no test cases found in {json_path}")
-    parsed_cases = [_parse_test_case(case) for case in test_cases]
+    suite = os.path.abspath(json_path)
+    parsed_cases = [_parse_test_case(case, suite) for case in test_cases]
     parsed_suites = TestSuites(
         description=json_data.get("description", "No description"),
-        tag=json_data.get("tag", []),
+        tag=json_data.get(const.TAG, []),
         test_cases=parsed_cases,
     )
     return parsed_suites
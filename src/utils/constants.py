@@ -8,11 +8,30 @@ EXPECTED_RESULT = "expected_result"
 ASSERTION_TYPE = "assertion_type"
 RETRY_COUNT = "retry_count"
 RETRY_DELAY = "retry_delay"
+RETRY_BACKOFF = "retry_backoff"
+RETRY_MAX_DELAY = "retry_max_delay"
+RETRY_JITTER = "retry_jitter"
+RETRY_DEADLINE = "retry_deadline"
+RETRY_ON = "retry_on"
+POLL = "poll"
+PROFILE = "profile"
+DEPENDS_ON = "depends_on"
+PARALLEL_STEPS = "parallel_steps"
+ROWS = "rows"
+COLUMNS = "columns"
 DESCRIPTION = "description"
 STATUS = "status"
 ERROR = "error"
 EXECUTION_TIME = "execution_time"
 SETUP_STEPS = "setup_steps"
 TEARDOWN_STEPS = "teardown_steps"
+SETUP_SCOPE = "setup_scope"
+CASE_SCOPE = "case"
+SUITE_SCOPE = "suite"
+SESSION_SCOPE = "session"
+SETUP_SCOPES = (CASE_SCOPE, SUITE_SCOPE, SESSION_SCOPE)
 VARIABLES = "variables"
 SAVE_RESULT_TO = "save_result_to"
+TAG = "tag"
+SERIAL_TAG = "serial"
+NOCACHE_TAG = "nocache"
@@ -0,0 +1,24 @@
+import os
+import tempfile
+from pathlib import Path
+from typing import Union
+
+
+def atomic_write(path: Union[str, Path], data: Union[str, bytes]):
+    """
+    Write `data` to `path` through a temporary file in the same directory,
+    renamed over `path` once complete, so other processes reading `path`
+    see the old content or the new, never a partial write. The directory
+    is created if missing; on OSError nothing is left behind and the error
+    is raised for the caller to ignore or report.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb" if isinstance(data, bytes) else "w") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
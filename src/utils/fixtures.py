@@ -0,0 +1,164 @@
+"""
+Setup and teardown steps, by scope.
+
+`setup_scope` in a case selects how its setup_steps and teardown_steps run:
+
+    case     around the case itself (default); teardown runs even when the
+             setup or a step failed
+    suite    once for all cases of a suite that declare the same setup
+    session  once per process for all cases that declare the same setup
+
+A shared setup runs within the first case that needs it. The variables its
+steps save (save_result_to) are handed to every case declaring the same
+setup; cases may read them but no step may save over them. Values are
+shared, not copied, so step functions must not mutate them either.
+
+Shared teardowns run when their scope ends: finish(suite) after the last
+case of a suite (CaseRunner.finish_suite), finish() at the end of the
+session (pytest_sessionfinish in tests/conftest.py, otherwise at exit).
+Each runs even if the setup or cases failed, and a failing one does not
+keep the others from running.
+"""
+
+import asyncio
+import atexit
+import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional
+
+import src.utils.constants as const
+from src.utils.case_utils import TestCase, status_of
+from src.utils.logger import logger
+
+Variables = Mapping[str, Any]
+# runs the teardown steps of a shared setup, given the variables it saved
+Teardown = Callable[[Variables], Any]
+
+
+class _Shared:
+    __slots__ = ("suite", "lock", "task", "variables", "error", "teardown")
+
+    def __init__(self, suite: Optional[str]):
+        self.suite = suite  # None for session scope
+        self.lock = threading.Lock()
+        self.task: Optional[asyncio.Future] = None
+        self.variables: Optional[Variables] = None
+        self.error: Optional[Exception] = None
+        self.teardown: Optional[Teardown] = None
+
+    @property
+    def done(self) -> bool:
+        return self.variables is not None or self.error is not None
+
+    def result(self, test_case: TestCase) -> Variables:
+        if self.error is None:
+            return self.variables
+        # a fresh exception per case, of the kind that gives the same status
+        message = f"{test_case.setup_scope} setup failed: {self.error}"
+        status = status_of(self.error)
+        if status == "FAILED":
+            raise AssertionError(message) from self.error
+        if status == "SKIPPED":
+            raise type(self.error)(message) from self.error
+        raise RuntimeError(message) from self.error
+
+
+class SharedSetups:
+    """Outcome and pending teardown of every suite and session scoped setup"""
+
+    def __init__(self):
+        self._entries: Dict[str, _Shared] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, test_case: TestCase) -> _Shared:
+        with self._lock:
+            entry = self._entries.get(test_case.setup_key)
+            if entry is None:
+                suite = (
+                    test_case.suite
+                    if test_case.setup_scope == const.SUITE_SCOPE
+                    else None
+                )
+                entry = self._entries[test_case.setup_key] = _Shared(suite)
+            return entry
+
+    def setup(
+        self,
+        test_case: TestCase,
+        run: Callable[[], Dict[str, Any]],
+        teardown: Teardown,
+    ) -> Variables:
+        """
+        Variables of the setup shared by `test_case`, calling `run` to
+        execute it if no case did yet; `teardown` is kept for finish()
+        """
+        entry = self._entry(test_case)
+        with entry.lock:
+            if not entry.done:
+                entry.teardown = teardown
+                try:
+                    entry.variables = MappingProxyType(run())
+                except Exception as e:
+                    entry.error = e
+        return entry.result(test_case)
+
+    async def asetup(
+        self,
+        test_case: TestCase,
+        run: Callable[[], Awaitable[Dict[str, Any]]],
+        teardown: Teardown,
+    ) -> Variables:
+        """setup() for asyncio runners: concurrent cases await one run"""
+        entry = self._entry(test_case)
+        if not entry.done:
+            if entry.task is None:
+                entry.teardown = teardown
+                entry.task = asyncio.ensure_future(self._arun(entry, run))
+            await asyncio.shield(entry.task)
+        return entry.result(test_case)
+
+    @staticmethod
+    async def _arun(entry: _Shared, run: Callable[[], Awaitable[Dict[str, Any]]]):
+        try:
+            entry.variables = MappingProxyType(await run())
+        except Exception as e:
+            entry.error = e
+
+    def finish(self, suite: Optional[str] = None) -> List[Exception]:
+        """
+        Run the teardowns of the setups shared within `suite`, or of all of
+        them when `suite` is None, latest setup first. Returns the errors
+        they raised, which are logged too.
+        """
+        with self._lock:
+            keys = [
+                key
+                for key, entry in self._entries.items()
+                if suite is None or entry.suite == suite
+            ]
+            entries = [self._entries.pop(key) for key in keys]
+        errors = []
+        for entry in reversed(entries):
+            if entry.teardown is None:
+                continue
+            try:
+                result = entry.teardown(entry.variables or {})
+                if inspect.isawaitable(result):
+                    _run_coroutine(result)
+            except Exception as e:
+                logger.error(f"Shared teardown failed: {e}")
+                errors.append(e)
+        return errors
+
+
+def _run_coroutine(coroutine: Awaitable) -> Any:
+    # on a thread of its own, so it works whether or not the caller is
+    # inside a running event loop
+    with ThreadPoolExecutor(1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
+shared_setups = SharedSetups()
+atexit.register(shared_setups.finish)
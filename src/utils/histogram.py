@@ -0,0 +1,87 @@
+import threading
+from typing import Dict, Iterable
+
+# recorded values are whole microseconds; with 7 bits of sub-buckets every
+# bucket is at most 1/64 (~1.6%) wide relative to the values it holds
+PRECISION_BITS = 7
+REPORTED_PERCENTILES = (50, 90, 99, 99.9)
+
+_LINEAR = 1 << PRECISION_BITS
+_HALF = _LINEAR >> 1
+
+
+def _bucket(value: int) -> int:
+    if value < _LINEAR:
+        return value
+    shift = value.bit_length() - PRECISION_BITS
+    return _LINEAR + (shift - 1) * _HALF + (value >> shift) - _HALF
+
+
+def _bucket_range(index: int) -> range:
+    """The values that land in bucket `index`"""
+    if index < _LINEAR:
+        return range(index, index + 1)
+    shift, offset = divmod(index - _LINEAR, _HALF)
+    shift += 1
+    low = (offset + _HALF) << shift
+    return range(low, low + (1 << shift))
+
+
+class Histogram:
+    """
+    Latency histogram in the spirit of HdrHistogram: log-linear buckets with
+    a bounded relative error, constant memory per order of magnitude, and
+    cheap merging. Thread-safe.
+    """
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        value = max(int(seconds * 1_000_000), 0)
+        index = _bucket(value)
+        with self._lock:
+            self.counts[index] = self.counts.get(index, 0) + 1
+            self.count += 1
+            self.total += value
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = max(self.max, value)
+
+    def merge(self, other: "Histogram"):
+        with self._lock:
+            for index, count in other.counts.items():
+                self.counts[index] = self.counts.get(index, 0) + count
+            self.count += other.count
+            self.total += other.total
+            if other.min is not None:
+                self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = max(self.max, other.max)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound, in seconds, of the bucket holding the q-th percentile"""
+        if not self.count:
+            return 0.0
+        rank = max(q / 100 * self.count, 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(_bucket_range(index)[-1], self.max) / 1_000_000
+        return self.max / 1_000_000
+
+    def summary(self, percentiles: Iterable[float] = REPORTED_PERCENTILES) -> Dict:
+        """count, mean/min/max and percentiles; durations in seconds"""
+        summary = {
+            "count": self.count,
+            "mean": self.total / self.count / 1_000_000 if self.count else 0.0,
+            "min": (self.min or 0) / 1_000_000,
+            "max": self.max / 1_000_000,
+        }
+        for q in percentiles:
+            summary[f"p{q:g}"] = self.percentile(q)
+        return summary
@@ -0,0 +1,118 @@
+import codecs
+import json
+import re
+from typing import Any, BinaryIO, Dict, Iterator, Tuple
+
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class JSONStreamReader:
+    """
+    Reads JSON values one at a time from a binary file, keeping only the
+    unconsumed part of the input in memory. Tracks the byte offset of every
+    value so callers can seek straight back to it later.
+    """
+
+    def __init__(self, f: BinaryIO):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.byte_offset = f.tell()  # file offset of buf[0]
+        self.eof = False
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+
+    def _fill(self) -> bool:
+        # read at least as much as is buffered, so a value spanning many
+        # chunks is re-decoded O(log n) times rather than once per chunk
+        chunk = self.f.read(max(CHUNK_SIZE, len(self.buf) - self.pos))
+        if not chunk:
+            self.eof = True
+            return False
+        consumed = self.buf[: self.pos]
+        self.byte_offset += len(consumed.encode("utf-8"))
+        self.buf = self.buf[self.pos :] + self._utf8.decode(chunk)
+        self.pos = 0
+        return True
+
+    def tell(self) -> int:
+        """Byte offset of the next unread character"""
+        return self.byte_offset + len(self.buf[: self.pos].encode("utf-8"))
+
+    def peek(self) -> str:
+        """Next non-whitespace character, without consuming it ('' at EOF)"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or not self._fill():
+                return self.buf[self.pos : self.pos + 1]
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"expected {char!r} at byte {self.tell()}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # a number ending exactly at the buffer end might be cut short
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return obj
+
+
+def iter_object_array(
+    f: BinaryIO, key: str, header: Dict[str, Any]
+) -> Iterator[Tuple[int, Any]]:
+    """
+    Yield (byte offset, element) for each element of the array stored under
+    `key` in the top-level JSON object of `f`. The other top-level members
+    are decoded into `header` as they are passed; members that come after
+    the array are only there once iteration is done.
+    """
+    reader = JSONStreamReader(f)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        name = reader.value()
+        reader.expect(":")
+        if name == key and reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() != "]":
+                while True:
+                    offset = reader.tell()
+                    yield offset, reader.value()
+                    if reader.peek() != ",":
+                        break
+                    reader.expect(",")
+            reader.expect("]")
+        else:
+            header[name] = reader.value()
+        if reader.peek() != ",":
+            break
+        reader.expect(",")
+    reader.expect("}")
+
+
+def read_value_at(f: BinaryIO, offset: int) -> Any:
+    """Decode the single JSON value starting at byte `offset`"""
+    f.seek(offset)
+    return JSONStreamReader(f).value()
+
+
+def iter_json_lines(f: BinaryIO) -> Iterator[Tuple[int, Any]]:
+    """Yield (byte offset, value) for every non-blank line of a JSON Lines file"""
+    offset = f.tell()
+    for line in f:
+        if line.strip():
+            yield offset, json.loads(line)
+        offset += len(line)
@@ -0,0 +1,47 @@
+import importlib
+import threading
+from typing import Any, Callable, Dict
+
+
+def lazy_singletons(
+    module_globals: Dict[str, Any], **factories: Callable[[], Any]
+) -> Callable[[str], Any]:
+    """
+    A module __getattr__ (PEP 562) that builds each named singleton on first
+    access. The instance is stored in the module, so later lookups are plain
+    attribute reads and never come back here.
+
+        __getattr__ = lazy_singletons(globals(), my_client=HTTPClient)
+    """
+    lock = threading.RLock()  # a factory may build another singleton
+    module = module_globals["__name__"]
+
+    def __getattr__(name: str) -> Any:
+        factory = factories.get(name)
+        if factory is None:
+            raise AttributeError(f"module {module!r} has no attribute {name!r}")
+        with lock:
+            if name not in module_globals:
+                module_globals[name] = factory()
+        return module_globals[name]
+
+    return __getattr__
+
+
+def lazy_exports(
+    module_globals: Dict[str, Any], exports: Dict[str, str]
+) -> Callable[[str], Any]:
+    """
+    A module __getattr__ that imports `exports` (name -> defining module) on
+    first access, so a package can re-export its API without importing it
+    """
+    module = module_globals["__name__"]
+
+    def __getattr__(name: str) -> Any:
+        if name not in exports:
+            raise AttributeError(f"module {module!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(exports[name]), name)
+        module_globals[name] = value
+        return value
+
+    return __getattr__
@@ -1,27 +1,174 @@
+"""
+Runner logging, written off the calling thread.
+
+Loggers made by setup_logger() only put records on a queue; a
+QueueListener thread formats and writes them, flushing once the queue is
+drained rather than after every record. The hot path never waits on stdout
+or a log file.
+
+    SIMPLYTEST_LOG_LEVEL   DEBUG shows every step, INFO (default) every case
+    SIMPLYTEST_LOG_FORMAT  text (default) or json, one object per line
+    SIMPLYTEST_LOG_FILE    also write the records to this file
+
+Records carry structured fields (event, case, step, function, status,
+duration, error) passed through `extra`; the json format includes them.
+"""
+
+import atexit
+import json
 import logging
+import os
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, TextIO, Union
+
+LOG_LEVEL_ENV = "SIMPLYTEST_LOG_LEVEL"
+LOG_FORMAT_ENV = "SIMPLYTEST_LOG_FORMAT"
+LOG_FILE_ENV = "SIMPLYTEST_LOG_FILE"
+
+STRUCTURED_FIELDS = (
+    "event",
+    "case",
+    "step",
+    "function",
+    "status",
+    "duration",
+    "error",
+)
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_listeners: Dict[str, QueueListener] = {}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for name in STRUCTURED_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                data[name] = value
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+class _BufferedStreamHandler(logging.StreamHandler):
+    """
+    Writes without flushing; the listener flushes once per batch. With no
+    stream given it writes to whatever sys.stdout is at the time, so
+    redirect_stdout and pytest's capturing still apply.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        super().__init__(stream)
+        self._stdout = stream is None
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            stream = sys.stdout if self._stdout else self.stream
+            stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
 
+    def flush(self):
+        self.stream = sys.stdout if self._stdout else self.stream
+        try:
+            super().flush()
+        except ValueError:
+            pass  # a capture stream closed since the write (pytest teardown)
 
-def setup_logger(name="simply_test", level=logging.INFO, log_file=None):
+
+class _BufferedFileHandler(logging.FileHandler):
+    def emit(self, record: logging.LogRecord):
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    Queues records as they are. The stock prepare() formats the message
+    and drops exc_info on the calling thread, which would leave the
+    listener's formatter nothing structured to work with (and the caller
+    the formatting work). Arguments are formatted later, so a mutable
+    argument changed right after the call may show its new value.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class _BatchingListener(QueueListener):
+    def handle(self, record: logging.LogRecord):
+        super().handle(record)
+        if self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+
+
+def parse_level(value: Union[str, int]) -> int:
+    if isinstance(value, int) or value.isdigit():
+        return int(value)
+    level = logging.getLevelName(value.strip().upper())
+    if not isinstance(level, int):
+        raise ValueError(f'"{value}" is not a log level')
+    return level
+
+
+def setup_logger(
+    name="simply_test",
+    level=None,
+    log_file=None,
+    log_format=None,
+    stream: Optional[TextIO] = None,
+):
     logger = logging.getLogger(name)
-    logger.setLevel(level)
+    logger.setLevel(parse_level(level or os.environ.get(LOG_LEVEL_ENV, "INFO")))
     if logger.handlers:
         return logger
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(level)
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    log_format = log_format or os.environ.get(LOG_FORMAT_ENV, "text")
+    if log_format == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
+    handlers = [_BufferedStreamHandler(stream)]
+    log_file = log_file or os.environ.get(LOG_FILE_ENV)
     if log_file:
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setLevel(level)
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        handlers.append(_BufferedFileHandler(log_file))
+    for handler in handlers:
+        handler.setFormatter(formatter)
 
+    records = queue.SimpleQueue()
+    listener = _BatchingListener(records, *handlers)
+    listener.start()
+    _listeners[name] = listener
+    logger.addHandler(_DeferredQueueHandler(records))
     return logger
 
 
+def flush(name="simply_test"):
+    """Block until every record logged so far by `name` is written"""
+    listener = _listeners.get(name)
+    if listener is not None:
+        listener.stop()
+        listener.start()
+
+
+@atexit.register
+def _stop_listeners():
+    for listener in _listeners.values():
+        listener.stop()
+
+
 logger = setup_logger()
@@ -0,0 +1,67 @@
+import importlib
+import inspect
+import threading
+from typing import TYPE_CHECKING, Callable, Dict, List
+
+if TYPE_CHECKING:
+    # hamcrest itself is imported by the first get_matcher()
+    from hamcrest.core.matcher import Matcher
+
+MATCHER_MODULES = [
+    "hamcrest.core.core",
+    "hamcrest.library.collection",
+    "hamcrest.library.number",
+    "hamcrest.library.object",
+    "hamcrest.library.text",
+    "hamcrest.library.string",
+]
+
+MatcherFactory = Callable[..., "Matcher"]
+
+_matchers: Dict[str, MatcherFactory] = {}
+_custom_matchers: Dict[str, MatcherFactory] = {}
+_matchers_loaded = False
+# parallel steps and worker threads may ask for the first matcher at once
+_load_lock = threading.Lock()
+
+
+def _load_hamcrest_matchers():
+    for module_name in MATCHER_MODULES:
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            continue
+        for name, obj in inspect.getmembers(module, inspect.isfunction):
+            if not name.startswith("_"):
+                # earlier modules win, same as the old per-call lookup
+                _matchers.setdefault(name, obj)
+
+
+def _hamcrest_matchers() -> Dict[str, MatcherFactory]:
+    """The hamcrest matchers by name, loaded in full before any is served"""
+    global _matchers_loaded
+    if not _matchers_loaded:
+        with _load_lock:
+            if not _matchers_loaded:
+                _load_hamcrest_matchers()
+                _matchers_loaded = True
+    return _matchers
+
+
+def register_matcher(name: str, factory: MatcherFactory):
+    """Make `factory` available as `assertion_type` `name` in suite JSON"""
+    _custom_matchers[name.lower()] = factory
+
+
+def get_matcher(name: str) -> MatcherFactory:
+    key = name.lower()
+    if key in _custom_matchers:
+        return _custom_matchers[key]
+    try:
+        return _hamcrest_matchers()[key]
+    except KeyError:
+        raise ValueError(f'"{name}" is not a valid matcher') from None
+
+
+def list_matchers() -> List[str]:
+    return sorted({*_hamcrest_matchers(), *_custom_matchers})
@@ -0,0 +1,290 @@
+"""
+Opt-in CPU and memory profiles of step executions.
+
+    SIMPLYTEST_PROFILE      "all", or comma separated case tags to profile
+    SIMPLYTEST_PROFILE_DIR  where profiles are written (default profiles)
+    SIMPLYTEST_PROFILE_TOP  rows in each summary (default 20)
+
+A step with "profile": true is profiled whatever the setting. Each profiled
+step writes <dir>/<case>/<step>.prof (cProfile data, for pstats or snakeviz)
+and <step>.mem.txt (the lines whose allocations grew during the step, from
+tracemalloc snapshots), and attaches both summaries to the report.
+
+The CPU profiles of a run are merged: at the end its hottest functions are
+logged and written to <dir>/run-<pid>.prof. Merge the files of several runs
+or worker processes with
+
+    python -m src.utils.profiling profiles --top 30
+
+cProfile can only run once at a time, so a step starting while another is
+profiled (parallel steps, concurrent asyncio cases) gets a memory profile
+only. tracemalloc is process wide: the allocations of steps running at the
+same time show up in each other's profiles.
+
+Under AsyncCaseRunner the CPU profile covers the step function only: a sync
+one is profiled in the executor thread that runs it, a coroutine one on the
+event loop while it is awaited, which includes whatever other tasks run
+during its awaits.
+"""
+
+import argparse
+import atexit
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, FrozenSet, Iterator, List, Optional, Sequence
+
+from src.utils.case_utils import TestCase, TestStep, has_tag
+from src.utils.logger import logger
+from src.utils.report import ReportLevel, attach_text
+
+PROFILE_ENV = "SIMPLYTEST_PROFILE"
+PROFILE_DIR_ENV = "SIMPLYTEST_PROFILE_DIR"
+PROFILE_TOP_ENV = "SIMPLYTEST_PROFILE_TOP"
+ALL = "all"
+DEFAULT_DIR = "profiles"
+DEFAULT_TOP = 20
+
+# memory profiles leave out the allocations of the profiler itself
+_MEMORY_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, pstats.__file__),
+)
+
+
+# the CPU profile of the running step, when it is to be enabled around the
+# step function rather than around the whole step (see Profiler.profile)
+_deferred_cpu: ContextVar[Optional[cProfile.Profile]] = ContextVar(
+    "deferred_cpu_profile", default=None
+)
+
+
+def profiled_call(func: Callable, *args, **kwargs) -> Any:
+    """Call `func`, under the deferred CPU profile of the running step if any"""
+    profile = _deferred_cpu.get()
+    if profile is None:
+        return func(*args, **kwargs)
+    return profile.runcall(func, *args, **kwargs)
+
+
+async def profiled_acall(func: Callable, *args, **kwargs) -> Any:
+    """profiled_call() for coroutine functions"""
+    profile = _deferred_cpu.get()
+    if profile is None:
+        return await func(*args, **kwargs)
+    profile.enable()
+    try:
+        return await func(*args, **kwargs)
+    finally:
+        profile.disable()
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", text).strip("_")[:80] or "unnamed"
+
+
+def stats_text(stats: pstats.Stats, top: int) -> str:
+    """The `top` functions of `stats` by cumulative time, as pstats prints them"""
+    stream = io.StringIO()
+    stats.stream = stream
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+    return stream.getvalue()
+
+
+def memory_text(diff: List[tracemalloc.StatisticDiff], top: int) -> str:
+    growth = sum(stat.size_diff for stat in diff)
+    lines = [f"net growth {growth:+,} bytes", f"{'bytes':>12} {'blocks':>8}  line"]
+    for stat in diff[:top]:
+        frame = stat.traceback[0]
+        lines.append(
+            f"{stat.size_diff:>+12,} {stat.count_diff:>+8}"
+            f"  {frame.filename}:{frame.lineno}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+class Profiler:
+    """
+    Decides which steps are profiled and keeps the merged CPU profile of the
+    run. Disabled unless SIMPLYTEST_PROFILE is set or enable() is called;
+    steps asking for a profile get one either way.
+    """
+
+    def __init__(self):
+        self.tags: FrozenSet[str] = frozenset()
+        self.directory = Path(os.environ.get(PROFILE_DIR_ENV, DEFAULT_DIR))
+        self.top = int(os.environ.get(PROFILE_TOP_ENV, DEFAULT_TOP))
+        self._run: Optional[pstats.Stats] = None
+        self._lock = threading.Lock()
+        self._cpu = threading.Lock()  # held by the one running cProfile
+        self._tracing = 0  # profiles in progress using tracemalloc
+        self._started_tracing = False
+        self._atexit = False
+
+    def enable(
+        self,
+        tags: Sequence[str] = (ALL,),
+        directory: Optional[str] = None,
+        top: Optional[int] = None,
+    ):
+        self.tags = frozenset(tags)
+        self.directory = Path(directory) if directory else self.directory
+        self.top = top or self.top
+        self._register_finish()
+
+    def _register_finish(self):
+        if not self._atexit:
+            atexit.register(self.finish)
+            self._atexit = True
+
+    def wanted(self, step: TestStep, test_case: TestCase) -> bool:
+        if step.profile or ALL in self.tags:
+            return True
+        return any(has_tag(test_case, tag) for tag in self.tags)
+
+    @contextmanager
+    def profile(self, case: str, step: str, defer_cpu: bool = False) -> Iterator[None]:
+        """
+        Profile the block, then write and attach what it did. With
+        `defer_cpu` the CPU profile only covers the functions called through
+        profiled_call()/profiled_acall() in the block, on whichever thread
+        they run, instead of everything this thread does meanwhile.
+        """
+        self._register_finish()
+        profile = cProfile.Profile() if self._cpu.acquire(blocking=False) else None
+        self._start_tracing()
+        before = tracemalloc.take_snapshot().filter_traces(_MEMORY_FILTERS)
+        token = None
+        if profile is not None:
+            if defer_cpu:
+                token = _deferred_cpu.set(profile)
+            else:
+                profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                if token is not None:
+                    _deferred_cpu.reset(token)
+                else:
+                    profile.disable()
+                self._cpu.release()
+            after = tracemalloc.take_snapshot().filter_traces(_MEMORY_FILTERS)
+            self._stop_tracing()
+            try:
+                self._save(case, step, profile, after.compare_to(before, "lineno"))
+            except OSError as e:
+                logger.warning("Failed to write the profile of %s: %s", step, e)
+
+    def _start_tracing(self):
+        with self._lock:
+            if self._tracing == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            self._tracing += 1
+
+    def _stop_tracing(self):
+        with self._lock:
+            self._tracing -= 1
+            if self._tracing == 0 and self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+    def _save(
+        self,
+        case: str,
+        step: str,
+        profile: Optional[cProfile.Profile],
+        memory: List[tracemalloc.StatisticDiff],
+    ):
+        directory = self.directory / _slug(case)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / _slug(step)
+
+        memory_summary = memory_text(memory, self.top)
+        Path(f"{path}.mem.txt").write_text(memory_summary)
+        attach_text(
+            f"{step}: memory profile", lambda: memory_summary, ReportLevel.SUMMARY
+        )
+        if profile is not None:
+            stats = pstats.Stats(profile)
+            stats.dump_stats(f"{path}.prof")
+            cpu_summary = stats_text(stats, self.top)
+            attach_text(
+                f"{step}: CPU profile", lambda: cpu_summary, ReportLevel.SUMMARY
+            )
+            with self._lock:
+                if self._run is None:
+                    self._run = pstats.Stats(profile)
+                else:
+                    self._run.add(profile)
+        logger.info(
+            "Profiled %s into %s.*",
+            step,
+            path,
+            extra={"event": "step_profiled", "case": case, "step": step},
+        )
+
+    def summary(self, top: Optional[int] = None) -> str:
+        """The hottest functions of the steps profiled so far"""
+        with self._lock:
+            if self._run is None:
+                return ""
+            return stats_text(self._run, top or self.top)
+
+    def finish(self):
+        """Write and log the merged profile of the run, then start a new one"""
+        with self._lock:
+            run, self._run = self._run, None
+        if run is None:
+            return
+        path = self.directory / f"run-{os.getpid()}.prof"
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            run.dump_stats(path)
+        except OSError as e:
+            logger.warning("Failed to write %s: %s", path, e)
+        logger.info(
+            "Hottest functions of the profiled steps (%s):\n%s",
+            path,
+            stats_text(run, self.top),
+        )
+
+
+profiler = Profiler()
+if os.environ.get(PROFILE_ENV):
+    profiler.enable(
+        [tag.strip() for tag in os.environ[PROFILE_ENV].split(",") if tag.strip()]
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Merge the run-*.prof files of a directory, print the top"
+    )
+    parser.add_argument("directory", nargs="?", default=DEFAULT_DIR)
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP)
+    parser.add_argument(
+        "--sort", default=pstats.SortKey.CUMULATIVE.value, help="a pstats sort key"
+    )
+    args = parser.parse_args(argv)
+
+    paths = sorted(Path(args.directory).glob("run-*.prof"))
+    if not paths:
+        print(f"no run-*.prof files in {args.directory}", file=sys.stderr)
+        return 1
+    stats = pstats.Stats(*map(str, paths), stream=sys.stdout)
+    stats.sort_stats(args.sort).print_stats(args.top)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
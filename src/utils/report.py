@@ -0,0 +1,158 @@
+import enum
+import json
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, List, Optional, Tuple, Union
+
+import allure
+
+from src.utils.logger import logger
+
+REPORT_LEVEL_ENV = "SIMPLYTEST_REPORT_LEVEL"
+REPORT_PRETTY_ENV = "SIMPLYTEST_REPORT_PRETTY"
+# attachments longer than this many bytes (or characters) are cut; 0 keeps
+# them whole
+ATTACHMENT_LIMIT_ENV = "SIMPLYTEST_ATTACHMENT_LIMIT"
+DEFAULT_ATTACHMENT_LIMIT = 1 << 20
+
+
+class ReportLevel(enum.IntEnum):
+    OFF = 0
+    FAILURES_ONLY = 1  # attachments of failing steps only
+    SUMMARY = 2  # + the context of every case after it ran
+    FULL = 3  # every attachment of every step and request
+
+    @classmethod
+    def parse(cls, value: Union[str, "ReportLevel"]) -> "ReportLevel":
+        if isinstance(value, cls):
+            return value
+        try:
+            return cls[value.strip().upper().replace("-", "_")]
+        except KeyError:
+            choices = ", ".join(level.name.lower().replace("_", "-") for level in cls)
+            raise ValueError(f'"{value}" is not a report level ({choices})') from None
+
+
+_level = ReportLevel.parse(os.environ.get(REPORT_LEVEL_ENV, "full"))
+_pretty = os.environ.get(REPORT_PRETTY_ENV, "").lower() in ("1", "true", "yes")
+_attachment_limit = int(
+    os.environ.get(ATTACHMENT_LIMIT_ENV, DEFAULT_ATTACHMENT_LIMIT)
+)
+
+Build = Callable[[], None]
+Body = Union[str, bytes]
+
+# a ContextVar rather than a thread-local, so that concurrent asyncio tasks
+# each get their own buffer
+_pending: ContextVar[Optional[List[Tuple[ReportLevel, Build]]]] = ContextVar(
+    "pending_report", default=None
+)
+
+
+def get_report_level() -> ReportLevel:
+    return _level
+
+
+def set_report_level(level: Union[str, ReportLevel]):
+    global _level
+    _level = ReportLevel.parse(level)
+
+
+def is_pretty() -> bool:
+    return _pretty
+
+
+def get_attachment_limit() -> int:
+    return _attachment_limit
+
+
+def set_attachment_limit(limit: int):
+    global _attachment_limit
+    _attachment_limit = limit
+
+
+def truncate(body: Body, limit: Optional[int] = None) -> Tuple[Body, bool]:
+    """
+    `body` cut to `limit` (default SIMPLYTEST_ATTACHMENT_LIMIT) with a note
+    of how much was dropped, and whether it was cut
+    """
+    limit = _attachment_limit if limit is None else limit
+    if not limit or len(body) <= limit:
+        return body, False
+    note = f"\n... [{len(body) - limit} more bytes truncated]"
+    if isinstance(body, str):
+        return body[:limit] + note, True
+    return body[:limit] + note.encode(), True
+
+
+def attach(body: Body, name: str, attachment_type=allure.attachment_type.TEXT):
+    """allure.attach with the body truncated to the attachment limit"""
+    body, truncated = truncate(body)
+    if truncated:
+        attachment_type = allure.attachment_type.TEXT  # no longer valid JSON
+    allure.attach(body, name=name, attachment_type=attachment_type)
+
+
+def dumps(obj: Any) -> str:
+    """Compact JSON unless SIMPLYTEST_REPORT_PRETTY is set"""
+    if _pretty:
+        return json.dumps(obj, default=str, indent=2)
+    return json.dumps(obj, default=str, separators=(",", ":"))
+
+
+def report(build: Build, level: ReportLevel = ReportLevel.FULL):
+    """
+    Run `build` (a callable making allure attachments) if `level` is
+    enabled. Inside deferred_report() it is held back until the outcome of
+    the enclosing block is known.
+    """
+    if _level == ReportLevel.OFF:
+        return
+    pending = _pending.get()
+    if pending is not None:
+        pending.append((level, build))
+    elif _level >= level:
+        build()
+
+
+def attach_json(
+    name: str, producer: Callable[[], Any], level: ReportLevel = ReportLevel.FULL
+):
+    """Attach `producer()` as JSON; it is only called if the attachment is made"""
+    report(
+        lambda: attach(dumps(producer()), name, allure.attachment_type.JSON), level
+    )
+
+
+def attach_text(
+    name: str, producer: Callable[[], str], level: ReportLevel = ReportLevel.FULL
+):
+    report(lambda: attach(producer(), name), level)
+
+
+@contextmanager
+def deferred_report():
+    """
+    Hold back attachments made inside the block. If the block raises they
+    are all built (unless reporting is off); otherwise each one is subject to
+    the report level as usual.
+    """
+    pending = []
+    token = _pending.set(pending)
+    try:
+        yield
+    except BaseException:
+        _pending.reset(token)
+        if _level >= ReportLevel.FAILURES_ONLY:
+            for _, build in pending:
+                try:
+                    build()
+                except Exception as e:
+                    # never hide the real failure behind a reporting error
+                    logger.warning("Failed to build report attachment: %s", e)
+        raise
+    else:
+        _pending.reset(token)
+        for level, build in pending:
+            report(build, level)
@@ -0,0 +1,126 @@
+import hashlib
+import inspect
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import src
+import src.utils.constants as const
+from src.functions.markers import is_nondeterministic
+from src.utils.case_utils import TestCase, case_to_dict, has_tag
+from src.utils.files import atomic_write
+from src.utils.suite_cache import cache_dir
+
+RESULT_CACHE_ENV = "SIMPLYTEST_RESULT_CACHE"  # set to 1 to replay passed cases
+# comma-separated names of environment variables that affect the results
+RESULT_CACHE_KEYS_ENV = "SIMPLYTEST_RESULT_CACHE_ENV"
+
+
+def enabled() -> bool:
+    return os.environ.get(RESULT_CACHE_ENV, "0").lower() in ("1", "true", "yes")
+
+
+def _all_steps(test_case: TestCase):
+    yield from test_case.setup_steps or ()
+    yield from test_case.steps
+    yield from test_case.teardown_steps or ()
+
+
+def _functions_of(
+    test_case: TestCase, functions: Callable[[str], Callable]
+) -> Dict[str, Optional[Callable]]:
+    found = {}
+    for name in {step.function for step in _all_steps(test_case)}:
+        try:
+            found[name] = functions(name)
+        except ValueError:
+            found[name] = None  # the run reports the unknown function
+    return found
+
+
+class ResultCache:
+    """
+    Last result of each case, keyed by a hash of the case definition, the
+    source modules of the step functions it calls and the environment
+    variables listed in SIMPLYTEST_RESULT_CACHE_ENV. A case whose key last
+    passed can be replayed instead of run, unless it is tagged `nocache` or
+    calls a function marked @nondeterministic.
+    """
+
+    def __init__(self, directory: Optional[Path] = None):
+        self.directory = directory or cache_dir() / "results"
+        self._sources: Dict[str, str] = {}
+
+    def _source_digest(self, func: Callable) -> str:
+        # the whole module, so edits to helpers next to the function count
+        func = inspect.unwrap(func)
+        module = sys.modules.get(func.__module__)
+        name = getattr(module, "__file__", None) or func.__qualname__
+        if name not in self._sources:
+            try:
+                source = Path(module.__file__).read_bytes()
+            except (AttributeError, TypeError, OSError):
+                source = func.__code__.co_code
+            self._sources[name] = hashlib.sha256(source).hexdigest()
+        return self._sources[name]
+
+    def cacheable(
+        self, test_case: TestCase, functions: Callable[[str], Callable]
+    ) -> bool:
+        if has_tag(test_case, const.NOCACHE_TAG):
+            return False
+        return not any(
+            func is not None and is_nondeterministic(func)
+            for func in _functions_of(test_case, functions).values()
+        )
+
+    def key(self, test_case: TestCase, functions: Callable[[str], Callable]) -> str:
+        digest = hashlib.sha256(src.__version__.encode())
+        digest.update(
+            json.dumps(case_to_dict(test_case), sort_keys=True, default=str).encode()
+        )
+        for name, func in sorted(_functions_of(test_case, functions).items()):
+            source = self._source_digest(func) if func is not None else ""
+            digest.update(f"{name}:{source}".encode())
+        env_names = os.environ.get(RESULT_CACHE_KEYS_ENV, "")
+        for name in sorted(filter(None, env_names.split(","))):
+            digest.update(f"{name}={os.environ.get(name)}".encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.directory / f"{key}.json") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, summary: Dict[str, Any]):
+        record = json.dumps({**summary, "recorded_at": time.time()}, default=str)
+        try:
+            atomic_write(self.directory / f"{key}.json", record)
+        except OSError:
+            pass  # read-only checkout: the case just runs again
+
+    def last_passed(
+        self, test_case: TestCase, functions: Callable[[str], Callable]
+    ) -> bool:
+        cached = self.get(self.key(test_case, functions))
+        return bool(cached) and cached.get(const.STATUS) == "PASSED"
+
+    def prioritize(
+        self, test_cases: Iterable[TestCase], functions: Callable[[str], Callable]
+    ) -> List[TestCase]:
+        """
+        Order `test_cases` so that new, changed and last-failed cases run
+        first, keeping the original order otherwise
+        """
+        return sorted(
+            test_cases, key=lambda test_case: self.last_passed(test_case, functions)
+        )
+
+
+def default_cache() -> Optional[ResultCache]:
+    return ResultCache() if enabled() else None
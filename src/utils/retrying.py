@@ -0,0 +1,160 @@
+import asyncio
+import builtins
+import importlib
+import random
+import sys
+import time
+from dataclasses import dataclass
+from typing import (
+    Awaitable,
+    Callable,
+    Iterator,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+)
+
+from src.utils import timing
+
+T = TypeVar("T")
+
+# `retry_on` shorthands for the transport errors of both HTTP clients
+RETRY_ON_ALIASES = {
+    "connection": (
+        "ConnectionError",
+        "requests.exceptions.ConnectionError",
+        "httpx.TransportError",
+    ),
+    "timeout": (
+        "TimeoutError",
+        "requests.exceptions.Timeout",
+        "httpx.TimeoutException",
+    ),
+}
+
+
+def is_skip(exception: BaseException) -> bool:
+    # a SkipTest can only exist once unittest is imported, so don't import it
+    unittest = sys.modules.get("unittest")
+    return unittest is not None and isinstance(exception, unittest.SkipTest)
+
+
+def exception_classes(names: Sequence[str]) -> Tuple[Type[BaseException], ...]:
+    """
+    Resolve `retry_on` names: aliases from RETRY_ON_ALIASES, builtin exception
+    names or dotted paths such as "requests.exceptions.HTTPError"
+    """
+    classes = []
+    for name in names:
+        for qualified in RETRY_ON_ALIASES.get(name, (name,)):
+            module_name, _, attr = qualified.rpartition(".")
+            try:
+                module = builtins
+                if module_name:
+                    module = importlib.import_module(module_name)
+                cls = getattr(module, attr)
+            except (ImportError, AttributeError):
+                raise ValueError(f'"{qualified}" is not a known exception class')
+            if not (isinstance(cls, type) and issubclass(cls, BaseException)):
+                raise ValueError(f'"{qualified}" is not an exception class')
+            classes.append(cls)
+    return tuple(classes)
+
+
+@dataclass(frozen=True, slots=True)
+class RetryPolicy:
+    """
+    When and how long to wait before trying a step again.
+
+    The n-th retry sleeps `delay * backoff ** (n - 1)` seconds, capped at
+    `max_delay` and spread by +/- `jitter` (a fraction of the sleep). The
+    step gives up after `tries` attempts, or once the next sleep would go
+    past `deadline` seconds since the first attempt; either may be None.
+    AssertionError is always retried, `exceptions` adds more; a skip
+    (unittest.SkipTest, such as CircuitOpenError) never is.
+    """
+
+    tries: Optional[int] = 3
+    delay: float = 1.0
+    backoff: float = 1.0
+    max_delay: Optional[float] = None
+    jitter: float = 0.0
+    deadline: Optional[float] = None
+    exceptions: Tuple[Type[BaseException], ...] = (AssertionError,)
+
+    def delays(self) -> Iterator[float]:
+        delay = self.delay
+        while True:
+            capped = delay if self.max_delay is None else min(delay, self.max_delay)
+            if self.jitter:
+                capped *= random.uniform(1 - self.jitter, 1 + self.jitter)
+            yield max(capped, 0.0)
+            delay *= self.backoff
+
+
+DEFAULT_POLICY = RetryPolicy()
+
+
+class _Attempts:
+    """Bookkeeping shared by call() and acall()"""
+
+    def __init__(self, policy: RetryPolicy):
+        self.policy = policy
+        self.count = 0
+        self.start = time.monotonic()
+        self._delays = policy.delays()
+
+    def next_delay(self) -> Optional[float]:
+        """Sleep before the next attempt, None when the policy is exhausted"""
+        policy = self.policy
+        if policy.tries is not None and self.count >= policy.tries:
+            return None
+        delay = next(self._delays)
+        if policy.deadline is not None:
+            if time.monotonic() - self.start + delay > policy.deadline:
+                return None
+        return delay
+
+
+def call(func: Callable[[], T], policy: RetryPolicy, logger=None) -> T:
+    """Call `func` until it succeeds or `policy` gives up; re-raises the last error"""
+    attempts = _Attempts(policy)
+    while True:
+        attempts.count += 1
+        attempt_start = time.perf_counter()
+        try:
+            return func()
+        except policy.exceptions as e:
+            delay = None if is_skip(e) else attempts.next_delay()
+            if delay is None:
+                raise
+            if logger is not None:
+                logger.warning("%s, retrying in %.3g seconds...", e, delay)
+        finally:
+            timing.record_attempt(time.perf_counter() - attempt_start)
+        with timing.phase(timing.RETRY_SLEEP):
+            time.sleep(delay)
+
+
+async def acall(
+    func: Callable[[], Awaitable[T]], policy: RetryPolicy, logger=None
+) -> T:
+    """call() for coroutine functions; sleeps without blocking the loop"""
+    attempts = _Attempts(policy)
+    while True:
+        attempts.count += 1
+        attempt_start = time.perf_counter()
+        try:
+            return await func()
+        except policy.exceptions as e:
+            delay = None if is_skip(e) else attempts.next_delay()
+            if delay is None:
+                raise
+            if logger is not None:
+                logger.warning("%s, retrying in %.3g seconds...", e, delay)
+        finally:
+            timing.record_attempt(time.perf_counter() - attempt_start)
+        with timing.phase(timing.RETRY_SLEEP):
+            await asyncio.sleep(delay)
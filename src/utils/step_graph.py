@@ -0,0 +1,87 @@
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Sequence, Set, Tuple
+
+# dependencies[i] holds the indices of the steps that must finish before step i
+Dependencies = Tuple[FrozenSet[int], ...]
+
+
+def build_dependencies(steps: Sequence) -> Dependencies:
+    """
+    Derive the data-flow graph of a case's steps: a step waits for the last
+    earlier step saving a variable it reads, a step saving a variable waits
+    for the earlier steps reading or saving it, and every step waits for the
+    steps named in its `depends_on`.
+    """
+    names = {step.name: i for i, step in enumerate(steps) if step.name}
+    last_writer: Dict[str, int] = {}
+    readers_since_write: Dict[str, List[int]] = defaultdict(list)
+    dependencies = []
+    for i, step in enumerate(steps):
+        deps: Set[int] = set()
+        for variable in step.reads:
+            if variable in last_writer:
+                deps.add(last_writer[variable])
+            readers_since_write[variable].append(i)
+        written = step.save_result_to
+        if written:
+            if written in last_writer:
+                deps.add(last_writer[written])
+            deps.update(readers_since_write.pop(written, ()))
+            last_writer[written] = i
+        for name in step.depends_on:
+            if name not in names:
+                raise ValueError(f'step "{name}" in depends_on not found')
+            deps.add(names[name])
+        deps.discard(i)
+        dependencies.append(frozenset(deps))
+    _check_acyclic(dependencies)
+    return tuple(dependencies)
+
+
+def _check_acyclic(dependencies: Sequence[FrozenSet[int]]):
+    # only depends_on can point forward, so a cycle always involves one
+    state = [0] * len(dependencies)  # 0 unvisited, 1 on stack, 2 done
+    for root in range(len(dependencies)):
+        if state[root]:
+            continue
+        stack = [(root, iter(dependencies[root]))]
+        while stack:
+            node, children = stack[-1]
+            state[node] = 1
+            for child in children:
+                if state[child] == 1:
+                    raise ValueError(
+                        f"steps {node + 1} and {child + 1} depend on each other"
+                    )
+                if state[child] == 0:
+                    stack.append((child, iter(dependencies[child])))
+                    break
+            else:
+                state[node] = 2
+                stack.pop()
+
+
+class StepScheduler:
+    """Hands out step indices as their dependencies complete"""
+
+    def __init__(self, dependencies: Dependencies):
+        self.waiting = {i: set(deps) for i, deps in enumerate(dependencies)}
+        self.dependents: Dict[int, List[int]] = defaultdict(list)
+        for i, deps in enumerate(dependencies):
+            for dep in deps:
+                self.dependents[dep].append(i)
+
+    def initial(self) -> List[int]:
+        return self._pop_ready(list(self.waiting))
+
+    def done(self, index: int) -> List[int]:
+        """Mark step `index` finished, return the steps that became ready"""
+        for dependent in self.dependents[index]:
+            self.waiting[dependent].discard(index)
+        return self._pop_ready(self.dependents[index])
+
+    def _pop_ready(self, candidates: Iterable[int]) -> List[int]:
+        ready = [i for i in candidates if i in self.waiting and not self.waiting[i]]
+        for i in ready:
+            del self.waiting[i]
+        return ready
@@ -0,0 +1,86 @@
+import hashlib
+import os
+import pickle
+import shutil
+import sys
+from pathlib import Path
+from typing import Callable, Optional, TypeVar
+
+import src
+from src.utils.files import atomic_write
+
+CACHE_DIR_ENV = "SIMPLYTEST_CACHE_DIR"
+SUITE_CACHE_ENV = "SIMPLYTEST_SUITE_CACHE"  # set to 0 to always re-parse
+DEFAULT_CACHE_DIR = ".simplytest_cache"
+
+# modules whose classes end up in the pickles, or that decide how suites
+# are parsed and validated; editing any of them invalidates the cache even
+# without a version bump
+_PICKLED_MODULES = (
+    "src.utils.case_utils",
+    "src.utils.constants",
+    "src.utils.matchers",
+    "src.utils.retrying",
+    "src.utils.step_graph",
+    "src.utils.templates",
+)
+
+T = TypeVar("T")
+
+_fingerprint: Optional[bytes] = None
+
+
+def cache_dir() -> Path:
+    return Path(os.environ.get(CACHE_DIR_ENV, DEFAULT_CACHE_DIR))
+
+
+def enabled() -> bool:
+    return os.environ.get(SUITE_CACHE_ENV, "1").lower() not in ("0", "false", "no")
+
+
+def _framework_fingerprint() -> bytes:
+    global _fingerprint
+    if _fingerprint is None:
+        digest = hashlib.sha256(src.__version__.encode())
+        digest.update(f"{sys.version_info[:2]}:{pickle.HIGHEST_PROTOCOL}".encode())
+        for module_name in _PICKLED_MODULES:
+            digest.update(Path(sys.modules[module_name].__file__).read_bytes())
+        _fingerprint = digest.digest()
+    return _fingerprint
+
+
+def load(json_path: str, parse: Callable[[str], T]) -> T:
+    """
+    Return `parse(json_path)`, served from a pickle keyed by the file's
+    content hash and the framework fingerprint when one exists.
+    """
+    if not enabled():
+        return parse(json_path)
+
+    with open(json_path, "rb") as f:
+        digest = hashlib.sha256(_framework_fingerprint())
+        # parsed cases record the path of their suite
+        digest.update(os.path.abspath(json_path).encode())
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    entry = cache_dir() / "suites" / f"{digest.hexdigest()}.pickle"
+
+    try:
+        with open(entry, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        pass
+    except Exception:
+        # corrupt or unreadable entry: fall through and rewrite it
+        pass
+
+    parsed = parse(json_path)
+    try:
+        atomic_write(entry, pickle.dumps(parsed, protocol=pickle.HIGHEST_PROTOCOL))
+    except OSError:
+        pass  # read-only checkout: parse again next time
+    return parsed
+
+
+def clear():
+    shutil.rmtree(cache_dir() / "suites", ignore_errors=True)
@@ -0,0 +1,166 @@
+import re
+from typing import Any, Dict, FrozenSet, List, Optional, Union
+
+import jmespath
+
+PLACEHOLDER_START = "${"
+_ROOT_NAME = re.compile(r"[.\[]")
+# jmespath quotes: raw strings, quoted identifiers and JSON literals
+_QUOTES = "'\"`"
+
+
+def split_placeholders(text: str) -> List[str]:
+    """
+    `text` cut at its `${...}` placeholders: even indexes are literal text,
+    odd indexes are expressions. Braces nest, so a jmespath multiselect
+    such as `${resp.{id: id}}` is one expression; braces in quoted jmespath
+    literals don't count.
+    """
+    parts = []
+    literal_start = 0
+    start = text.find(PLACEHOLDER_START)
+    while start != -1:
+        end = _closing_brace(text, start + len(PLACEHOLDER_START))
+        expression = text[start + len(PLACEHOLDER_START) : end]
+        if not expression.strip():
+            raise ValueError(f'empty placeholder in "{text}"')
+        parts += [text[literal_start:start], expression]
+        literal_start = end + 1
+        start = text.find(PLACEHOLDER_START, literal_start)
+    parts.append(text[literal_start:])
+    return parts
+
+
+def _closing_brace(text: str, index: int) -> int:
+    depth = 0
+    quote = None
+    while index < len(text):
+        char = text[index]
+        if quote is not None:
+            if char == "\\":
+                index += 1  # an escaped character, quote or not
+            elif char == quote:
+                quote = None
+        elif char in _QUOTES:
+            quote = char
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            if depth == 0:
+                return index
+            depth -= 1
+        index += 1
+    raise ValueError(f'unterminated placeholder in "{text}"')
+
+
+def lookup(expression: str, variables: Dict[str, Any]) -> Any:
+    """
+    Value of a `${...}` expression: a plain variable name, or a jmespath
+    expression rooted at one (`res_1.items[0]`). Falsy values are valid.
+    """
+    if expression in variables:
+        return variables[expression]
+    root = _ROOT_NAME.split(expression, 1)[0]
+    if root not in variables:
+        raise ValueError(f"Variable ${{{expression}}} not found in context")
+    return jmespath.search(expression, variables)
+
+
+class Placeholder:
+    """A string containing one or more `${...}` references"""
+
+    __slots__ = ("parts", "whole")
+
+    def __init__(self, text: str):
+        # even indexes are literal text, odd indexes are expressions
+        self.parts: List[str] = split_placeholders(text)
+        self.whole = len(self.parts) == 3 and not self.parts[0] and not self.parts[2]
+
+    @property
+    def expressions(self) -> List[str]:
+        return self.parts[1::2]
+
+    def render(self, variables: Dict[str, Any]) -> Any:
+        if self.whole:
+            # "${x}" keeps the type of x, anything else is interpolated
+            return lookup(self.parts[1], variables)
+        return "".join(
+            str(lookup(part, variables)) if i % 2 else part
+            for i, part in enumerate(self.parts)
+        )
+
+
+# a plan is either a Placeholder (for a string) or a dict from the keys or
+# indexes of a container to the plans of the children holding placeholders
+Plan = Union[Placeholder, Dict[Any, "Plan"]]
+
+
+def _compile(node: Any) -> Optional[Plan]:
+    if isinstance(node, str):
+        return Placeholder(node) if PLACEHOLDER_START in node else None
+    if isinstance(node, (list, tuple)):
+        children = enumerate(node)
+    elif isinstance(node, dict):
+        children = node.items()
+    else:
+        return None
+    plan = {}
+    for key, child in children:
+        child_plan = _compile(child)
+        if child_plan is not None:
+            plan[key] = child_plan
+    return plan or None
+
+
+def _render(node: Any, plan: Plan, variables: Dict[str, Any]) -> Any:
+    if isinstance(plan, Placeholder):
+        return plan.render(variables)
+    rendered = list(node) if isinstance(node, (list, tuple)) else dict(node)
+    for key, child_plan in plan.items():
+        rendered[key] = _render(node[key], child_plan, variables)
+    return tuple(rendered) if isinstance(node, tuple) else rendered
+
+
+def _placeholders(plan: Optional[Plan]):
+    if isinstance(plan, Placeholder):
+        yield plan
+    elif plan:
+        for child_plan in plan.values():
+            yield from _placeholders(child_plan)
+
+
+class Template:
+    """
+    A step argument tree compiled once at load time. Rendering fills only
+    the recorded placeholder slots, copying just the containers on the way
+    to them; the source object itself is never modified, and a tree without
+    placeholders is returned as is.
+    """
+
+    __slots__ = ("source", "plan")
+
+    def __init__(self, source: Any):
+        self.source = source
+        self.plan = _compile(source)
+
+    @property
+    def references(self) -> FrozenSet[str]:
+        """Root variable names this template reads"""
+        return frozenset(
+            _ROOT_NAME.split(expression, 1)[0]
+            for placeholder in _placeholders(self.plan)
+            for expression in placeholder.expressions
+        )
+
+    def render(self, variables: Dict[str, Any]) -> Any:
+        if self.plan is None:
+            return self.source
+        return _render(self.source, self.plan, variables)
+
+    def __deepcopy__(self, memo) -> "Template":
+        # templates are never mutated, so copies (e.g. by dataclasses.asdict)
+        # can share them
+        return self
+
+    def __repr__(self) -> str:
+        return f"Template({self.source!r})"
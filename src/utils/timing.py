@@ -0,0 +1,234 @@
+import atexit
+import csv
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+TIMING_FILE_ENV = "SIMPLYTEST_TIMING_FILE"
+
+# phases of a step execution, all measured with time.perf_counter
+RESOLVE = "resolve"  # filling ${...} placeholders
+CALL = "call"  # the step function itself, HTTP time included
+HTTP = "http"  # time spent inside HTTPClient requests
+ASSERTION = "assertion"  # expected_key lookup and the matcher
+RETRY_SLEEP = "retry_sleep"  # waiting between attempts
+PHASES = (RESOLVE, CALL, HTTP, ASSERTION, RETRY_SLEEP)
+
+PERCENTILES = (50, 95, 99)
+
+
+class StepTimer:
+    """Phase durations and attempt durations of one step execution"""
+
+    __slots__ = ("phases", "attempts")
+
+    def __init__(self):
+        self.phases: Dict[str, float] = defaultdict(float)
+        self.attempts: List[float] = []
+
+    def add(self, phase: str, seconds: float):
+        self.phases[phase] += seconds
+
+
+_current: ContextVar[Optional[StepTimer]] = ContextVar("step_timer", default=None)
+
+
+@contextmanager
+def step_timer() -> Iterator[StepTimer]:
+    """Make a new StepTimer current for the step executed in the block"""
+    timer = StepTimer()
+    token = _current.set(timer)
+    try:
+        yield timer
+    finally:
+        _current.reset(token)
+
+
+def current() -> Optional[StepTimer]:
+    return _current.get()
+
+
+def record(phase: str, seconds: float):
+    """Add `seconds` to `phase` of the current step, if one is being timed"""
+    timer = _current.get()
+    if timer is not None:
+        timer.add(phase, seconds)
+
+
+def record_attempt(seconds: float):
+    timer = _current.get()
+    if timer is not None:
+        timer.attempts.append(seconds)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted `values`"""
+    if not values:
+        return 0.0
+    rank = max(math.ceil(q / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def _summarize(values: List[float]) -> Dict[str, float]:
+    values = sorted(values)
+    summary = {
+        "count": len(values),
+        "total": sum(values),
+        "mean": sum(values) / len(values) if values else 0.0,
+        "max": values[-1] if values else 0.0,
+    }
+    for q in PERCENTILES:
+        summary[f"p{q}"] = percentile(values, q)
+    return summary
+
+
+class TimingCollector:
+    """
+    Per-step and per-case timing records of a run, with per-function
+    aggregates. Disabled unless SIMPLYTEST_TIMING_FILE is set or enable()
+    is called, in which case the file is written when the process exits.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.path: Optional[str] = None
+        self.steps: List[Dict[str, Any]] = []
+        self.cases: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._atexit = False
+
+    def enable(self, path: Optional[str] = None):
+        self.enabled = True
+        self.path = path or self.path
+        if self.path and not self._atexit:
+            atexit.register(self._write_at_exit)
+            self._atexit = True
+
+    def add_step(
+        self,
+        case: str,
+        description: str,
+        function: str,
+        status: str,
+        duration: float,
+        timer: StepTimer,
+    ):
+        if not self.enabled:
+            return
+        row = {
+            "case": case,
+            "step": description,
+            "function": function,
+            "status": status,
+            "duration": duration,
+            "attempts": len(timer.attempts),
+            "attempt_durations": list(timer.attempts),
+        }
+        row.update({name: timer.phases.get(name, 0.0) for name in PHASES})
+        with self._lock:
+            self.steps.append(row)
+
+    def add_case(self, case: str, status: str, duration: float):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.cases.append({"case": case, "status": status, "duration": duration})
+
+    def drain(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Take the records collected so far (e.g. to ship them to another process)"""
+        with self._lock:
+            drained = {"steps": self.steps, "cases": self.cases}
+            self.steps, self.cases = [], []
+        return drained
+
+    def extend(self, records: Dict[str, List[Dict[str, Any]]]):
+        with self._lock:
+            self.steps.extend(records.get("steps", []))
+            self.cases.extend(records.get("cases", []))
+
+    def aggregates(self) -> Dict[str, Dict[str, Any]]:
+        """Duration and phase percentiles per step function name"""
+        by_function = defaultdict(list)
+        for row in self.steps:
+            by_function[row["function"]].append(row)
+        aggregates = {}
+        for function, rows in sorted(by_function.items()):
+            summary = _summarize([row["duration"] for row in rows])
+            summary["attempts"] = sum(row["attempts"] for row in rows)
+            summary["failures"] = sum(row["status"] != "PASSED" for row in rows)
+            summary["phases"] = {
+                name: _summarize([row[name] for row in rows]) for name in PHASES
+            }
+            aggregates[function] = summary
+        return aggregates
+
+    def write(self, path: Optional[str] = None):
+        """Write the records to `path`: CSV if it ends with .csv, else JSON"""
+        path = path or self.path
+        with self._lock:
+            steps, cases = list(self.steps), list(self.cases)
+        aggregates = self.aggregates()
+        if path.endswith(".csv"):
+            self._write_csv(path, steps, cases, aggregates)
+            return
+        with open(path, "w") as f:
+            json.dump(
+                {"cases": cases, "steps": steps, "functions": aggregates}, f, indent=2
+            )
+
+    @staticmethod
+    def _write_csv(path, steps, cases, aggregates):
+        # one table; the `kind` column tells case, step and function rows apart
+        columns = [
+            "kind",
+            "case",
+            "step",
+            "function",
+            "status",
+            "count",
+            "duration",
+            "attempts",
+            *PHASES,
+            *(f"p{q}" for q in PERCENTILES),
+            "max",
+        ]
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, columns, extrasaction="ignore")
+            writer.writeheader()
+            for row in cases:
+                writer.writerow({"kind": "case", **row})
+            for row in steps:
+                writer.writerow({"kind": "step", **row})
+            for function, summary in aggregates.items():
+                writer.writerow(
+                    {
+                        "kind": "function",
+                        "function": function,
+                        "duration": summary["total"],
+                        **summary,
+                    }
+                )
+
+    def _write_at_exit(self):
+        if self.steps or self.cases:
+            self.write()
+
+
+collector = TimingCollector()
+if os.environ.get(TIMING_FILE_ENV):
+    collector.enable(os.environ[TIMING_FILE_ENV])
@@ -0,0 +1,97 @@
+import threading
+from typing import Optional, Union
+import pytest
+import simply_serve
+from src.case_runner import case_runner
+from src.utils import case_history, fixtures, suite_cache
+from src.utils.profiling import profiler
+from src.utils.case_utils import CaseRef, TestCase
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """
+    Keep what tests cache (suites, results, history) out of the checkout;
+    the suite cases run by pytest itself still record into the real history
+    """
+    directory = tmp_path / "simplytest_cache"
+    monkeypatch.setenv(suite_cache.CACHE_DIR_ENV, str(directory))
+    monkeypatch.setattr(case_history, "history", case_history.CaseHistory())
+    return directory
+
+
+@pytest.fixture(scope="session")
+def base_url():
+    """A simply_serve server for the whole session: it keeps no state"""
+    server = simply_serve.make_server("localhost", 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://localhost:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _test_case(item) -> Optional[Union[TestCase, CaseRef]]:
+    """The case a suite-driven test runs, as a TestCase or a CaseRef"""
+    callspec = getattr(item, "callspec", None)
+    if callspec is None:
+        return None
+    for name in ("case_ref", "test_case"):
+        test_case = callspec.params.get(name)
+        if isinstance(test_case, (TestCase, CaseRef)):
+            return test_case
+    return None
+
+
+def _sort_cases(items, key):
+    """
+    Sort the suite-driven items by `key(test_case)` among the slots they
+    hold in their class or module, so each parent's setup and teardown
+    still run once; other tests keep their place
+    """
+    slots_by_parent = {}
+    for n, item in enumerate(items):
+        if _test_case(item) is not None:
+            slots_by_parent.setdefault(item.parent, []).append(n)
+    for slots in slots_by_parent.values():
+        ordered = sorted((items[n] for n in slots), key=lambda i: key(_test_case(i)))
+        for n, item in zip(slots, ordered):
+            items[n] = item
+
+
+def pytest_collection_modifyitems(session, config, items):
+    """
+    With SIMPLYTEST_SCHEDULE=history, run the cases most likely to fail
+    first; with the result cache on, run new, changed and last-failed cases
+    before the ones that would be replayed
+    """
+    if case_history.schedule() == case_history.HISTORY_ORDER:
+
+        def likely_to_fail(test_case):
+            key = case_history.case_key(test_case.suite, test_case.description)
+            return case_history.history.priority(key)
+
+        _sort_cases(items, likely_to_fail)
+
+    cache = case_runner.result_cache
+    if cache is None:
+        return
+    functions = case_runner.function_pool.get_function
+
+    def already_passed(test_case) -> bool:
+        if isinstance(test_case, CaseRef):
+            # the key covers the steps: parse the case now, not just at run time
+            test_case = test_case.load()
+        return cache.last_passed(test_case, functions)
+
+    _sort_cases(items, already_passed)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    """
+    Tear down suite and session scoped setups, whatever the outcome, log
+    the hottest functions of the profiled steps and save the case history
+    """
+    fixtures.shared_setups.finish()
+    profiler.finish()
+    case_history.history.save()
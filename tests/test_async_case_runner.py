@@ -0,0 +1,102 @@
+import asyncio
+import pytest
+from src.async_case_runner import AsyncCaseRunner
+from src.case_runner import CaseRunner
+from src.functions.function_pool import FunctionPool
+from src.utils.case_utils import _parse_test_case
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def pool(calls):
+    pool = FunctionPool()
+
+    async def fetch(key):
+        calls.append(f"fetch {key}")
+        await asyncio.sleep(0)
+        return {"key": key, "value": len(key)}
+
+    def double(value):
+        calls.append(f"double {value}")
+        return value * 2
+
+    pool.register("fetch", fetch)
+    pool.register("double", double)
+    return pool
+
+
+def _run(runner, test_case):
+    async def run():
+        summary = await runner.execute_test_case(test_case)
+        return summary, runner.ctx
+
+    return asyncio.run(run())
+
+
+def test_steps_run_in_order_and_pass_results_on(pool, calls):
+    test_case = _parse_test_case(
+        {
+            "variables": {"name": "abcd"},
+            "steps": [
+                {
+                    "function": "fetch",
+                    "input_args": ["${name}"],
+                    "save_result_to": "fetched",
+                },
+                {
+                    "function": "double",
+                    "input_args": ["${fetched.value}"],
+                    "expected_result": 8,
+                    "save_result_to": "doubled",
+                },
+                {
+                    "function": "fetch",
+                    "input_args": ["${fetched.key}-${doubled}"],
+                    "expected_result": {"key": "abcd-8", "value": 6},
+                },
+            ],
+        }
+    )
+    summary, ctx = _run(AsyncCaseRunner(pool), test_case)
+
+    assert summary["status"] == "PASSED"
+    assert calls == ["fetch abcd", "double 4", "fetch abcd-8"]
+    assert ctx.variables["fetched"] == {"key": "abcd", "value": 4}
+    assert ctx.variables["doubled"] == 8
+    assert [step.status for step in ctx.steps] == ["PASSED"] * 3
+    # the case's own variables are left as they were
+    assert test_case.variables == {"name": "abcd"}
+
+
+def test_a_failing_step_stops_the_case(pool, calls):
+    test_case = _parse_test_case(
+        {
+            "steps": [
+                {
+                    "function": "fetch",
+                    "input_args": ["ab"],
+                    "expected_result": 1,
+                    "retry_count": 1,
+                },
+                {"function": "double", "input_args": [1]},
+            ]
+        }
+    )
+    with pytest.raises(AssertionError):
+        _run(AsyncCaseRunner(pool), test_case)
+    assert calls == ["fetch ab"]
+
+
+def test_the_sync_runner_refuses_coroutine_steps(pool, calls):
+    test_case = _parse_test_case(
+        {"steps": [{"function": "fetch", "input_args": ["a"]}]}
+    )
+    runner = CaseRunner(pool)
+    with pytest.raises(TypeError, match="AsyncCaseRunner"):
+        runner.execute_test_case(test_case)
+    assert runner.ctx.status == "BROKEN"
+    assert calls == []
@@ -0,0 +1,110 @@
+import asyncio
+import pytest
+from src.async_case_runner import AsyncCaseRunner
+from src.case_runner import CaseRunner
+from src.functions import markers
+from src.functions.function_pool import FunctionPool
+from src.utils.case_utils import _parse_test_case
+
+
+@pytest.fixture
+def bulk_calls():
+    return []
+
+
+@pytest.fixture
+def pool(bulk_calls):
+    pool = FunctionPool()
+
+    def add_batch(calls):
+        bulk_calls.append(len(calls))
+        return [sum(args) for args, _ in calls]
+
+    @markers.batch(add_batch)
+    def add(*args):
+        return sum(args)
+
+    def divide(a, b):
+        return a / b
+
+    async def async_double(value):
+        await asyncio.sleep(0)
+        return 2 * value
+
+    pool.register("add", add)
+    pool.register("divide", divide)
+    pool.register("async_double", async_double)
+    return pool
+
+
+def _case(step, rows, **extra):
+    return _parse_test_case({"steps": [step], "rows": rows, **extra})
+
+
+def test_batch_function_gets_all_rows_in_one_call(pool, bulk_calls):
+    case = _case(
+        {
+            "function": "add",
+            "input_args": ["${a}", "${b}"],
+            "expected_result": "${sum}",
+            "save_result_to": "sums",
+        },
+        [[i, i, 2 * i] for i in range(1, 1001)],
+        columns=["a", "b", "sum"],
+    )
+    runner = CaseRunner(pool)
+    assert runner.execute_test_case(case)["status"] == "PASSED"
+    assert bulk_calls == [1000]
+    assert runner.ctx.variables["sums"][:3] == [2, 4, 6]
+    # the batch call, then one result per row
+    assert len(runner.ctx.steps) == 1001
+    assert runner.ctx.steps[3].description.startswith("Row 3:")
+
+
+def test_rows_pass_and_fail_individually(pool):
+    case = _case(
+        {"function": "divide", "input_args": ["${a}", "${b}"], "expected_result": 2},
+        [{"a": 4, "b": 2}, {"a": 1, "b": 0}, {"a": 6, "b": 2}, {"a": 8, "b": 4}],
+    )
+    runner = CaseRunner(pool)
+    with pytest.raises(AssertionError, match="2 of 4 rows failed, first Row 2"):
+        runner.execute_test_case(case)
+    rows = runner.ctx.steps[1:]
+    assert [row.status for row in rows] == ["PASSED", "BROKEN", "FAILED", "PASSED"]
+    assert "division by zero" in rows[1].error
+    assert runner.ctx.status == "FAILED"
+
+
+def test_case_variables_are_shared_by_rows(pool):
+    case = _case(
+        {"function": "add", "input_args": ["${base}", "${x}"]},
+        [{"x": 1}, {"x": 2, "base": 100}],
+        variables={"base": 10},
+    )
+    runner = CaseRunner(pool)
+    runner.execute_test_case(case)
+    assert runner.ctx.steps[0].func_return == [11, 102]
+
+
+def test_async_runner(pool, bulk_calls):
+    add = _case(
+        {"function": "add", "input_args": ["${a}", 1], "expected_result": "${b}"},
+        [{"a": i, "b": i + 1} for i in range(50)],
+    )
+    double = _case(
+        {"function": "async_double", "input_args": ["${a}"], "expected_result": 4},
+        [{"a": 2}, {"a": 3}],
+    )
+    runner = AsyncCaseRunner(pool)
+    results = asyncio.run(runner.run_test_cases([add, double]))
+    assert results[0]["status"] == "PASSED"
+    assert bulk_calls == [50]
+    assert isinstance(results[1], AssertionError)
+
+
+def test_rows_are_validated_at_load_time():
+    step = {"function": "add", "input_args": ["${a}"]}
+    with pytest.raises(ValueError, match="exactly one step"):
+        _parse_test_case({"steps": [step, step], "rows": [{"a": 1}]})
+    with pytest.raises(ValueError, match="row 2 has 1 values for 2 columns"):
+        _case(step, [[1, 2], [3]], columns=["a", "b"])
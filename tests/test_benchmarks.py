@@ -0,0 +1,34 @@
+import json
+from benchmarks import harness
+
+
+@harness.benchmark("test.noop")
+def noop():
+    closed = []
+
+    def op():
+        pass
+
+    op.close = lambda: closed.append(True)
+    noop.closed = closed
+    return op
+
+
+def test_run_calibrates_and_closes():
+    result = harness.run("test.noop", repetitions=3, warmup=0, min_time=0.001)
+    assert result.number > 1
+    assert result.repetitions == 3
+    assert result.min <= result.median
+    assert noop.closed == [True]
+
+
+def test_regressions_against_baseline(tmp_path):
+    result = harness.run("test.noop", repetitions=3, warmup=0, min_time=0.001)
+    baseline = tmp_path / "baseline.json"
+    harness.dump([result], str(baseline))
+    assert harness.regressions([result], str(baseline), 0.1) == {}
+
+    data = json.loads(baseline.read_text())
+    data["results"]["test.noop"]["median"] = result.median / 2
+    baseline.write_text(json.dumps(data))
+    assert harness.regressions([result], str(baseline), 0.1) == {"test.noop": 2.0}
@@ -0,0 +1,198 @@
+import asyncio
+import copy
+import dataclasses
+import itertools
+import json
+import pickle
+import sys
+import threading
+import pytest
+import src.utils.case_utils as case_utils
+import src.utils.json_stream as json_stream
+from src.async_case_runner import AsyncCaseRunner
+from src.case_runner import CaseRunner
+from src.functions.function_pool import FunctionPool
+from src.utils import suite_cache
+from src.utils.case_utils import iter_case_refs, iter_test_cases, load_test_cases
+
+
+def _case(i):
+    return {
+        "description": f"case {i} – ünïcödé",
+        "tag": "serial" if i % 2 else "",
+        "steps": [
+            {"function": "int_add", "input_args": [i, 1.5e3], "expected_result": i + 1500}
+        ],
+    }
+
+
+@pytest.fixture
+def suite_json(tmp_path):
+    path = tmp_path / "suite.json"
+    data = {
+        "tag": ["big"],
+        "test_cases": [_case(i) for i in range(50)],
+        "description": "generated suite",
+    }
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def suite_jsonl(tmp_path):
+    path = tmp_path / "suite.jsonl"
+    lines = [{"description": "generated suite"}] + [_case(i) for i in range(50)]
+    path.write_text("\n".join(json.dumps(line) for line in lines), encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("suite", ["suite_json", "suite_jsonl"])
+def test_iter_test_cases_matches_load(suite, request, monkeypatch):
+    path = request.getfixturevalue(suite)
+    # force values to straddle chunk boundaries
+    monkeypatch.setattr(json_stream, "CHUNK_SIZE", 7)
+    header = {}
+    streamed = list(iter_test_cases(path, header))
+    assert streamed == load_test_cases(path).test_cases
+    assert header["description"] == "generated suite"
+
+
+@pytest.mark.parametrize("suite", ["suite_json", "suite_jsonl"])
+def test_case_refs_load_single_case(suite, request):
+    path = request.getfixturevalue(suite)
+    refs = list(iter_case_refs(path))
+    assert len(refs) == 50
+    assert refs[7].tag == "serial"
+    assert refs[7].load() == load_test_cases(path).test_cases[7]
+
+
+def test_iter_test_cases_is_lazy(suite_json):
+    cases = iter_test_cases(suite_json)
+    assert next(cases).description == "case 0 – ünïcödé"
+
+
+def test_load_test_cases_uses_cache(suite_json, tmp_path, monkeypatch):
+    monkeypatch.setenv("SIMPLYTEST_CACHE_DIR", str(tmp_path / "cache"))
+    parsed = load_test_cases(suite_json)
+
+    def fail(json_path):
+        raise AssertionError("suite was parsed again")
+
+    monkeypatch.setattr(case_utils, "_load_test_cases", fail)
+    assert load_test_cases(suite_json) == parsed
+
+    with open(suite_json, "a") as f:
+        f.write("\n")
+    with pytest.raises(AssertionError, match="parsed again"):
+        load_test_cases(suite_json)
+
+
+def test_cached_cases_keep_their_compiled_internals(tmp_path):
+    test_case = case_utils._parse_test_case(
+        {
+            "setup_scope": "suite",
+            "setup_steps": [{"function": "ping", "save_result_to": "pong"}],
+            "steps": [{"function": "int_add", "input_args": ["${x}", 1]}],
+        },
+        str(tmp_path / "suite.json"),
+    )
+    restored = pickle.loads(pickle.dumps(test_case, pickle.HIGHEST_PROTOCOL))
+    assert restored == test_case
+    assert restored.setup_key == test_case.setup_key
+    step = restored.steps[0]
+    assert step.resolve("input_args", {"x": 41}) == (41, 1)
+    assert step.retry_policy is not None
+
+
+@pytest.mark.parametrize("module", ["src.utils.constants", "src.utils.matchers"])
+def test_parsing_modules_are_part_of_the_cache_key(module, tmp_path, monkeypatch):
+    monkeypatch.setattr(suite_cache, "_fingerprint", None)
+    before = suite_cache._framework_fingerprint()
+
+    edited = tmp_path / "edited.py"
+    edited.write_text(open(sys.modules[module].__file__).read() + "\n# edited\n")
+    monkeypatch.setattr(sys.modules[module], "__file__", str(edited))
+    monkeypatch.setattr(suite_cache, "_fingerprint", None)
+    assert suite_cache._framework_fingerprint() != before
+
+
+def _counting_case():
+    pool = FunctionPool()
+    counter = itertools.count(1)
+    lock = threading.Lock()
+
+    def take():
+        with lock:
+            return next(counter)
+
+    pool.register("take", take)
+    pool.register("same", lambda value: value)
+    test_case = case_utils._parse_test_case(
+        {
+            "variables": {"base": 10},
+            "setup_steps": [{"function": "take", "save_result_to": "n"}],
+            "steps": [
+                {
+                    "function": "same",
+                    "input_args": ["${n}"],
+                    "save_result_to": "echoed",
+                },
+                {"function": "same", "input_args": ["${base}"], "expected_result": 10},
+            ],
+        }
+    )
+    return pool, test_case
+
+
+def test_specs_are_frozen_and_slotted():
+    _, test_case = _counting_case()
+    step = test_case.steps[0]
+    for spec, field in ((test_case, "description"), (step, "function")):
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            setattr(spec, field, "changed")
+        assert not hasattr(spec, "__dict__")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        test_case.variables = {}
+
+
+def test_runs_share_the_specs_and_keep_their_state_in_results():
+    pool, test_case = _counting_case()
+    pristine = copy.deepcopy(test_case)
+    results = []
+
+    def run_once():
+        runner = CaseRunner(pool)
+        runner.execute_test_case(test_case)
+        results.append(runner.ctx)
+
+    run_once()
+    run_once()
+    threads = [threading.Thread(target=run_once) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    async def run_concurrently():
+        runner = AsyncCaseRunner(pool)
+
+        async def run_one():
+            await runner.execute_test_case(test_case)
+            return runner.ctx
+
+        return await asyncio.gather(*(run_one() for _ in range(4)))
+
+    results.extend(asyncio.run(run_concurrently()))
+
+    assert test_case == pristine
+    assert test_case.variables == {"base": 10}
+    assert [result.status for result in results] == ["PASSED"] * 10
+    # every run took its own number, and kept it to itself
+    assert sorted(result.variables["n"] for result in results) == list(range(1, 11))
+    specs = test_case.setup_steps + test_case.steps
+    for result in results:
+        assert result.case is test_case
+        assert len(result.steps) == len(specs)
+        assert all(ours.step is spec for ours, spec in zip(result.steps, specs))
+        assert result.variables["echoed"] == result.variables["n"]
+        assert result.steps[1].func_return == result.variables["n"]
@@ -0,0 +1,141 @@
+import asyncio
+import json
+from unittest import mock
+
+import pytest
+from src import parallel_runner
+from src.api_clients.async_client import AsyncHTTPClient
+from src.api_clients.cassette import (
+    CASSETTE_ENV,
+    HTTP_MODE_ENV,
+    RECORD,
+    REPLAY,
+    Cassette,
+    CassetteMiss,
+    Interaction,
+)
+from src.api_clients.simple_client import HTTPClient
+from src.functions.function_pool import FunctionPool
+
+
+def test_replay_answers_without_the_server(tmp_path, base_url):
+    path = tmp_path / "http.cassette"
+    recorder = Cassette(path, RECORD)
+    client = HTTPClient(base_url, cassette=recorder)
+    assert client.echo({"id": 1}) == {"id": 1}
+    assert client.health_check()["health"] == "healthy"
+    client.close()
+    recorder.save()
+
+    replayer = Cassette(path, REPLAY)
+    assert len(replayer) == 2
+    client = HTTPClient(base_url, cassette=replayer)
+    client.session.get_adapter = None  # any real request would fail
+    assert client.echo({"id": 1}) == {"id": 1}
+    response = client.get("/api/health")
+    assert response.status_code == 200
+    assert response.json()["health"] == "healthy"
+    with pytest.raises(CassetteMiss):
+        client.echo({"id": 2})
+
+
+def test_stream_and_body_view_replay(tmp_path, base_url):
+    path = tmp_path / "http.cassette"
+    recorder = Cassette(path, RECORD)
+    client = HTTPClient(base_url, cassette=recorder)
+    recorded = b"".join(client.stream("post", "/api/echo", json={"id": 1}))
+    health = bytes(client.body_view("get", "/api/health"))
+    recorder.save()
+
+    client = HTTPClient(base_url, cassette=Cassette(path, REPLAY))
+    client.session.get_adapter = None
+    pool = FunctionPool()
+    with mock.patch("src.api_clients.my_client", client, create=True):
+        chunks = pool.get_function("stream_body")(
+            "/api/echo", method="post", chunk_size=4, json={"id": 1}
+        )
+        assert list(chunks)[0] == recorded[:4]
+        assert b"".join(client.stream("post", "/api/echo", json={"id": 1})) == (
+            recorded
+        )
+        assert bytes(pool.get_function("body_view")("/api/health")) == health
+
+
+def test_async_client_replays_what_the_sync_client_recorded(tmp_path, base_url):
+    path = tmp_path / "http.cassette"
+    recorder = Cassette(path, RECORD)
+    HTTPClient(base_url, cassette=recorder).echo({"id": 1})
+    recorder.save()
+
+    async def replay():
+        client = AsyncHTTPClient(base_url, cassette=Cassette(path, REPLAY))
+        async with client:
+            return await client.echo({"id": 1})
+
+    assert asyncio.run(replay()) == {"id": 1}
+
+
+def test_large_cassette_lookups(tmp_path):
+    path = tmp_path / "big.cassette"
+    recorder = Cassette(path, RECORD)
+    for i in range(5000):
+        recorder.record(
+            "GET", f"http://x/{i}", None, Interaction(200, "OK", {}, str(i).encode())
+        )
+    recorder.save()
+
+    replayer = Cassette(path, REPLAY)
+    assert len(replayer) == 5000
+    assert replayer.lookup("get", "http://x/4321").body == b"4321"
+    with pytest.raises(CassetteMiss):
+        replayer.lookup("GET", "http://x/5000")
+    # recording again keeps what is already on tape
+    assert len(Cassette(path, RECORD)) == 5000
+
+
+ECHO_FUNCS = """
+import os
+from src.api_clients.simple_client import HTTPClient
+from src.functions.function_pool import FunctionPool
+
+_client = None
+
+
+def echo(value):
+    global _client
+    if _client is None:
+        _client = HTTPClient(os.environ["ECHO_BASE_URL"])
+    return _client.echo(value)
+"""
+
+
+def test_recording_with_several_workers_keeps_every_interaction(
+    tmp_path, base_url, monkeypatch
+):
+    (tmp_path / "cassette_funcs.py").write_text(ECHO_FUNCS)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setenv("SIMPLYTEST_FUNCTION_MODULES", "rec=cassette_funcs")
+    monkeypatch.setenv("ECHO_BASE_URL", base_url)
+    path = tmp_path / "http.cassette"
+    monkeypatch.setenv(CASSETTE_ENV, str(path))
+    monkeypatch.setenv(HTTP_MODE_ENV, RECORD)
+    suite = tmp_path / "echo_suite.json"
+    cases = [
+        {
+            "description": f"echo {i}",
+            "steps": [
+                {"function": "rec.echo", "input_args": [i], "expected_result": i}
+            ],
+        }
+        for i in range(8)
+    ]
+    suite.write_text(json.dumps({"test_cases": cases}))
+
+    outcomes = parallel_runner.run_suites([str(suite)], workers=4)
+    assert [o.status for o in outcomes] == ["PASSED"] * 8
+
+    replayer = Cassette(path, REPLAY)
+    assert len(replayer) == 8
+    for i in range(8):
+        interaction = replayer.lookup("POST", f"{base_url}/api/echo", str(i))
+        assert json.loads(interaction.body) == i
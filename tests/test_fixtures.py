@@ -0,0 +1,172 @@
+import asyncio
+import json
+import pytest
+from src.async_case_runner import AsyncCaseRunner
+from src.case_runner import CaseRunner
+from src.functions.function_pool import FunctionPool
+from src.utils import fixtures
+from src.utils.case_utils import _parse_test_case, load_test_cases
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def pool(calls):
+    pool = FunctionPool()
+
+    def login(user):
+        calls.append(f"login {user}")
+        return f"token-{user}"
+
+    def logout(token):
+        calls.append(f"logout {token}")
+
+    def use(token):
+        calls.append(f"use {token}")
+        return token
+
+    def explode():
+        raise RuntimeError("boom")
+
+    pool.register("login", login)
+    pool.register("logout", logout)
+    pool.register("use", use)
+    pool.register("explode", explode)
+    return pool
+
+
+@pytest.fixture(autouse=True)
+def shared_setups(monkeypatch):
+    setups = fixtures.SharedSetups()
+    monkeypatch.setattr(fixtures, "shared_setups", setups)
+    return setups
+
+
+def _case(scope="case", steps=None, suite="/suites/a.json"):
+    return _parse_test_case(
+        {
+            "setup_scope": scope,
+            "setup_steps": [
+                {"function": "login", "input_args": ["ann"], "save_result_to": "token"}
+            ],
+            "steps": steps or [{"function": "use", "input_args": ["${token}"]}],
+            "teardown_steps": [{"function": "logout", "input_args": ["${token}"]}],
+        },
+        suite,
+    )
+
+
+def test_case_scope_tears_down_after_a_failure(pool, calls):
+    runner = CaseRunner(pool)
+    runner.execute_test_case(_case())
+    with pytest.raises(RuntimeError, match="boom"):
+        runner.execute_test_case(_case(steps=[{"function": "explode"}]))
+    assert calls == [
+        "login ann",
+        "use token-ann",
+        "logout token-ann",
+        "login ann",
+        "logout token-ann",
+    ]
+    descriptions = [step.description for step in runner.ctx.steps]
+    assert descriptions[0].startswith("Setup 1:")
+    assert descriptions[-1].startswith("Teardown 1:")
+
+
+def test_suite_scope_runs_setup_once(pool, calls, shared_setups):
+    runner = CaseRunner(pool)
+    for _ in range(3):
+        runner.execute_test_case(_case("suite"))
+    runner.execute_test_case(_case("suite", suite="/suites/b.json"))
+    assert calls.count("login ann") == 2
+    assert calls.count("use token-ann") == 4
+    assert "logout token-ann" not in calls
+
+    assert runner.finish_suite("/suites/a.json") == []
+    assert calls.count("logout token-ann") == 1
+    shared_setups.finish()
+    assert calls.count("logout token-ann") == 2
+
+
+def test_shared_setup_failure_fails_every_case(pool, calls, shared_setups):
+    case = _parse_test_case(
+        {
+            "setup_scope": "session",
+            "setup_steps": [{"function": "explode", "retry_count": 1}],
+            "steps": [{"function": "use", "input_args": ["x"]}],
+            "teardown_steps": [{"function": "logout", "input_args": ["x"]}],
+        }
+    )
+    runner = CaseRunner(pool)
+    for _ in range(2):
+        with pytest.raises(RuntimeError, match="session setup failed: boom"):
+            runner.execute_test_case(case)
+    assert calls == []
+    # the teardown still runs at the end of the session
+    shared_setups.finish()
+    assert calls == ["logout x"]
+
+
+def test_shared_variables_are_read_only():
+    with pytest.raises(ValueError, match="shares read-only"):
+        _case("suite", steps=[{"function": "use", "save_result_to": "token"}])
+
+
+def test_async_cases_share_one_setup(pool, calls, shared_setups):
+    runner = AsyncCaseRunner(pool)
+    results = asyncio.run(runner.run_test_cases([_case("session")] * 5))
+    assert [result["status"] for result in results] == ["PASSED"] * 5
+    assert calls.count("login ann") == 1
+    shared_setups.finish()
+    assert calls[-1] == "logout token-ann"
+
+
+@pytest.mark.parametrize("runner_class", [CaseRunner, AsyncCaseRunner])
+def test_shared_teardown_leaves_the_running_case_alone(
+    pool, calls, shared_setups, runner_class
+):
+    runner = runner_class(pool)
+
+    def run(test_case):
+        """The context the case ends with"""
+        if runner_class is CaseRunner:
+            runner.execute_test_case(test_case)
+            return runner.ctx
+
+        async def execute():
+            await runner.execute_test_case(test_case)
+            return runner.ctx
+
+        return asyncio.run(execute())
+
+    run(_case("session"))
+    # the session ends (on another thread, say) while a case is running
+    pool.register("end_session", lambda: shared_setups.finish())
+    case = _parse_test_case(
+        {
+            "steps": [
+                {"function": "use", "input_args": ["mine"], "save_result_to": "mine"},
+                {"function": "end_session"},
+                {"function": "use", "input_args": ["${mine}"]},
+            ]
+        }
+    )
+    ctx = run(case)
+    assert calls[-2:] == ["logout token-ann", "use mine"]
+    assert [step.description for step in ctx.steps] == [
+        "Step 1: No step description provided",
+        "Step 2: No step description provided",
+        "Step 3: No step description provided",
+    ]
+
+
+def test_loaded_cases_know_their_suite(tmp_path, monkeypatch):
+    monkeypatch.setenv("SIMPLYTEST_CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "suite.json"
+    path.write_text(
+        json.dumps({"test_cases": [{"steps": [{"function": "ping"}]}]})
+    )
+    assert load_test_cases(str(path)).test_cases[0].suite == str(path)
@@ -0,0 +1,120 @@
+import sys
+import pytest
+from src.functions import function_index
+from src.functions.function_index import FunctionIndex, scan_source
+from src.functions.function_pool import FunctionPool
+
+PLUGIN_SOURCE = '''
+import json
+
+
+def echo(value):
+    return value
+
+
+async def fetch(value):
+    return value
+
+
+def _helper():
+    pass
+'''
+
+
+REEXPORTING_SOURCE = """
+from acme_steps import echo
+from acme_steps import fetch as fetch_again
+from json import dumps
+
+__all__ = ["fetch_again", "dumps", "missing"]
+"""
+
+
+@pytest.fixture
+def plugin(tmp_path, monkeypatch):
+    """An importable `acme_steps` module that no test has imported yet"""
+    (tmp_path / "acme_steps.py").write_text(PLUGIN_SOURCE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setenv("SIMPLYTEST_CACHE_DIR", str(tmp_path / "cache"))
+    yield "acme_steps"
+    sys.modules.pop("acme_steps", None)
+
+
+@pytest.fixture
+def reexporting(plugin, tmp_path):
+    """`acme_reexports`, which only imports functions from `acme_steps`"""
+    (tmp_path / "acme_reexports.py").write_text(REEXPORTING_SOURCE)
+    yield "acme_reexports"
+    sys.modules.pop("acme_reexports", None)
+
+
+def test_scan_source_lists_public_top_level_functions():
+    assert scan_source(PLUGIN_SOURCE) == ["echo", "fetch"]
+
+
+def test_scan_source_lists_what_all_reexports():
+    assert scan_source(REEXPORTING_SOURCE) == ["fetch_again", "dumps"]
+
+
+def test_reexported_functions_are_found(plugin, reexporting):
+    pool = FunctionPool({"re": reexporting})
+    assert {"re.fetch_again", "re.dumps"} <= set(pool.list_functions())
+    assert pool.get_function("re.echo")(4) == 4
+    assert pool.get_function("re.fetch_again").__name__ == "fetch"
+    with pytest.raises(ValueError, match="not found in function pool"):
+        pool.get_function("re.missing")
+
+
+def test_module_is_imported_on_first_use(plugin):
+    pool = FunctionPool({"http": plugin})
+    assert "http.echo" in pool.list_functions()
+    assert "http._helper" not in pool.list_functions()
+    assert plugin not in sys.modules
+
+    assert pool.get_function("http.echo")(3) == 3
+    assert plugin in sys.modules
+    # built-ins keep their un-prefixed names
+    assert pool.get_function("ping")() == "pong"
+
+
+def test_unknown_functions(plugin):
+    pool = FunctionPool({"http": plugin})
+    for name in ("http.json", "http._helper", "nope.echo", "missing"):
+        with pytest.raises(ValueError, match="not found in function pool"):
+            pool.get_function(name)
+
+
+def test_modules_from_environment(plugin, monkeypatch):
+    monkeypatch.setenv(function_index.FUNCTION_MODULES_ENV, f"{plugin},web={plugin}")
+    pool = FunctionPool()
+    assert pool.get_function("acme_steps.echo") is pool.get_function("web.echo")
+
+
+def test_entry_points_are_read_only_for_unknown_namespaces(plugin, monkeypatch):
+    calls = []
+
+    def entry_point_modules():
+        calls.append(1)
+        return {"acme": plugin}
+
+    monkeypatch.setattr(function_index, "entry_point_modules", entry_point_modules)
+    pool = FunctionPool()
+    pool.get_function("ping")
+    assert calls == []
+    assert pool.get_function("acme.fetch") is not None
+    assert calls == [1]
+
+
+def test_index_is_reused_until_the_module_changes(plugin, tmp_path):
+    path = tmp_path / "cache" / "functions.json"
+    assert FunctionIndex(path).functions(plugin) == ["echo", "fetch"]
+    assert path.exists()
+
+    # a fresh process reads the cached entry instead of parsing the source
+    index = FunctionIndex(path)
+    index._load()[plugin]["functions"] = ["cached"]
+    assert index.functions(plugin) == ["cached"]
+
+    changed = PLUGIN_SOURCE + "\ndef added():\n    pass\n"
+    (tmp_path / "acme_steps.py").write_text(changed)
+    assert FunctionIndex(path).functions(plugin) == ["echo", "fetch", "added"]
@@ -0,0 +1,44 @@
+import subprocess
+import sys
+import pytest
+
+# dependencies that only the code paths using them should pay for
+HEAVY_MODULES = ("requests", "httpx", "curlify", "hamcrest", "jmespath", "allure")
+IMPORT_BUDGET = 0.25  # seconds, far above the expected cost, to catch regressions
+
+
+def _run(code: str) -> str:
+    return subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+
+
+@pytest.mark.parametrize("module", ["src", "src.functions.function_pool"])
+def test_import_does_not_load_heavy_dependencies(module):
+    loaded = _run(
+        f"import sys, {module}\n"
+        f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    ).split()
+    assert loaded == []
+
+
+def test_import_within_budget():
+    elapsed = float(
+        _run(
+            "import time\n"
+            "start = time.perf_counter()\n"
+            "import src, src.functions.function_pool\n"
+            "print(time.perf_counter() - start)"
+        )
+    )
+    assert elapsed < IMPORT_BUDGET
+
+
+def test_singletons_are_built_on_first_use():
+    assert _run(
+        "import sys\n"
+        "from src.case_runner import case_runner\n"
+        "from src.functions import function_pool\n"
+        "assert case_runner.function_pool is function_pool.function_pool\n"
+        "print('requests' in sys.modules)"
+    ).strip() == "False"
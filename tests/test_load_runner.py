@@ -0,0 +1,93 @@
+import pytest
+from src.functions.function_pool import FunctionPool
+from src.load_runner import LoadRunner, run_load
+from src.utils.case_utils import _parse_test_case
+from src.utils.histogram import Histogram
+from src.utils.report import ReportLevel, get_report_level, set_report_level
+
+
+def test_histogram_percentiles_are_within_bucket_error():
+    histogram = Histogram()
+    for ms in range(1, 1001):
+        histogram.record(ms / 1000)
+    summary = histogram.summary()
+    assert summary["count"] == 1000
+    assert summary["p50"] == pytest.approx(0.5, rel=0.02)
+    assert summary["p99"] == pytest.approx(0.99, rel=0.02)
+    assert summary["max"] == 1.0
+
+    other = Histogram()
+    other.record(5)
+    histogram.merge(other)
+    assert (histogram.count, histogram.summary()["max"]) == (1001, 5.0)
+
+
+@pytest.fixture
+def cases():
+    return [
+        _parse_test_case(
+            {
+                "steps": [
+                    {"function": "int_add", "input_args": [1, 2], "expected_result": 3},
+                    {"function": "fail", "retry_count": 1},
+                ]
+            }
+        ),
+        _parse_test_case({"steps": [{"function": "int_add", "input_args": [1, 1]}]}),
+    ]
+
+
+@pytest.fixture
+def pool():
+    pool = FunctionPool()
+
+    def fail():
+        raise AssertionError("boom")
+
+    pool.register("fail", fail)
+    return pool
+
+
+def test_rate_mode_reports_per_function_errors(cases, pool):
+    report = LoadRunner(cases, pool).run_at_rate(rate=200, duration=0.25, workers=4)
+    data = report.to_dict()
+    assert data["cases"]["count"] == 50
+    assert data["statuses"] == {"FAILED": 25, "PASSED": 25}
+    assert data["functions"]["int_add"]["error_rate"] == 0
+    assert data["functions"]["fail"]["error_rate"] == 1
+    assert "int_add" in report.format()
+
+
+def test_concurrency_mode_runs_for_duration(cases, pool):
+    report = LoadRunner(cases, pool).run_with_concurrency(concurrency=3, duration=0.2)
+    assert report.cases.count > 3
+    assert 0.2 <= report.duration < 1
+
+
+def test_run_load_restores_the_report_level(tmp_path, pool):
+    suite = tmp_path / "suite.json"
+    suite.write_text(
+        '{"test_cases": [{"steps": [{"function": "int_add", "input_args": [1]}]}]}'
+    )
+    previous_level = get_report_level()
+    set_report_level(ReportLevel.SUMMARY)
+    try:
+        run_load([str(suite)], duration=0.05, concurrency=1, function_pool=pool)
+        assert get_report_level() == ReportLevel.SUMMARY
+    finally:
+        set_report_level(previous_level)
+
+
+@pytest.mark.parametrize("mode", ["rate", "concurrency"])
+def test_worker_crashes_are_raised(cases, pool, monkeypatch, mode):
+    runner = LoadRunner(cases, pool)
+
+    def crash(scheduled=None):
+        raise KeyError("lost")
+
+    monkeypatch.setattr(runner, "_run_one", crash)
+    with pytest.raises(RuntimeError, match="crashed, the first with: KeyError"):
+        if mode == "rate":
+            runner.run_at_rate(rate=100, duration=0.05, workers=2)
+        else:
+            runner.run_with_concurrency(concurrency=2, duration=0.05)
@@ -0,0 +1,77 @@
+import io
+import json
+import threading
+from logging.handlers import QueueHandler
+import pytest
+from src.utils import logger as logs
+
+
+@pytest.fixture
+def stream():
+    return io.StringIO()
+
+
+def _logger(stream, name, **options):
+    return logs.setup_logger(name, stream=stream, **options)
+
+
+def test_records_are_written_by_the_listener_thread():
+    writers = []
+
+    class Recording(io.StringIO):
+        def write(self, text):
+            writers.append(threading.current_thread())
+            return super().write(text)
+
+    stream = Recording()
+    logger = _logger(stream, "test_listener")
+    assert isinstance(logger.handlers[0], QueueHandler)
+    for i in range(100):
+        logger.info("record %d", i)
+    logs.flush("test_listener")
+    assert stream.getvalue().count("record") == 100
+    assert threading.current_thread() not in writers
+
+
+def test_json_records_carry_structured_fields(stream):
+    logger = _logger(stream, "test_json", log_format="json")
+    logger.info(
+        "PASSED %s",
+        "login",
+        extra={"event": "case_finished", "case": "login", "duration": 0.5},
+    )
+    logger.debug("not at INFO")
+    logs.flush("test_json")
+    (line,) = stream.getvalue().splitlines()
+    record = json.loads(line)
+    assert record["message"] == "PASSED login"
+    assert record["level"] == "INFO"
+    assert (record["event"], record["case"], record["duration"]) == (
+        "case_finished",
+        "login",
+        0.5,
+    )
+    assert "status" not in record
+
+
+def test_level_from_environment(stream, monkeypatch):
+    monkeypatch.setenv(logs.LOG_LEVEL_ENV, "debug")
+    logger = _logger(stream, "test_level")
+    logger.debug("step")
+    logs.flush("test_level")
+    assert "DEBUG - step" in stream.getvalue()
+    with pytest.raises(ValueError, match="not a log level"):
+        logs.parse_level("chatty")
+
+
+def test_exceptions_are_formatted_by_the_listener(stream):
+    logger = _logger(stream, "test_exception", log_format="json")
+    try:
+        raise KeyError("missing")
+    except KeyError:
+        logger.exception("step %s broke", "login")
+    logs.flush("test_exception")
+    record = json.loads(stream.getvalue())
+    assert record["message"] == "step login broke"
+    assert record["exc_info"].startswith("Traceback")
+    assert "KeyError: 'missing'" in record["exc_info"]
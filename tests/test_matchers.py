@@ -0,0 +1,100 @@
+import importlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from hamcrest import equal_to, has_length
+from hamcrest.core.base_matcher import BaseMatcher
+from src.case_runner import CaseRunner
+from src.functions.function_pool import FunctionPool
+from src.utils import matchers
+from src.utils.case_utils import TestCase, _parse_step, load_test_cases
+from src.utils.matchers import get_matcher, list_matchers, register_matcher
+
+
+class IsEven(BaseMatcher):
+    def _matches(self, item):
+        return item % 2 == 0
+
+    def describe_to(self, description):
+        description.append_text("an even number")
+
+
+@pytest.fixture(autouse=True)
+def custom_matchers(monkeypatch):
+    monkeypatch.setattr(matchers, "_custom_matchers", {})
+
+
+def test_hamcrest_matchers_are_found_by_name():
+    assert get_matcher("equal_to") is equal_to
+    assert get_matcher("Equal_To") is equal_to
+    assert "has_length" in list_matchers()
+
+
+def test_unknown_assertion_type_fails_at_load():
+    with pytest.raises(ValueError, match='"no_such_matcher" is not a valid matcher'):
+        _parse_step({"function": "int_add", "assertion_type": "no_such_matcher"})
+
+
+def test_custom_matcher_is_used_by_steps():
+    register_matcher("is_even", lambda expected: IsEven())
+    assert "is_even" in list_matchers()
+    step_data = {
+        "function": "int_add",
+        "assertion_type": "IS_EVEN",
+        "expected_result": True,
+        "retry_count": 1,
+    }
+    runner = CaseRunner(FunctionPool())
+    even = _parse_step({**step_data, "input_args": [1, 1]})
+    runner.execute_test_case(TestCase(steps=[even]))
+
+    odd = _parse_step({**step_data, "input_args": [1, 2]})
+    with pytest.raises(AssertionError, match="does not match"):
+        runner.execute_test_case(TestCase(steps=[odd]))
+
+
+def test_cached_suite_still_checks_its_matchers(tmp_path, monkeypatch):
+    monkeypatch.setenv("SIMPLYTEST_CACHE_DIR", str(tmp_path / "cache"))
+    suite = tmp_path / "suite.json"
+    suite.write_text(
+        json.dumps(
+            {
+                "test_cases": [
+                    {
+                        "steps": [
+                            {
+                                "function": "int_add",
+                                "input_args": [2],
+                                "assertion_type": "is_even",
+                                "expected_result": True,
+                            }
+                        ]
+                    }
+                ]
+            }
+        )
+    )
+    register_matcher("is_even", lambda expected: IsEven())
+    load_test_cases(str(suite))
+    assert list((tmp_path / "cache" / "suites").iterdir())
+
+    monkeypatch.setattr(matchers, "_custom_matchers", {})
+    with pytest.raises(ValueError, match='"is_even" is not a valid matcher'):
+        load_test_cases(str(suite))
+
+
+def test_threads_asking_for_the_first_matcher_all_get_it(monkeypatch):
+    monkeypatch.setattr(matchers, "_matchers", {})
+    monkeypatch.setattr(matchers, "_matchers_loaded", False)
+    import_module = importlib.import_module
+
+    def slow_import(name):
+        time.sleep(0.01)  # widen the window in which the registry fills
+        return import_module(name)
+
+    monkeypatch.setattr(matchers.importlib, "import_module", slow_import)
+    with ThreadPoolExecutor(8) as executor:
+        found = list(executor.map(get_matcher, ["has_length"] * 8))
+    assert found == [has_length] * 8
@@ -0,0 +1,107 @@
+import json
+import pytest
+from allure_commons import plugin_manager
+from src import parallel_runner
+from src.utils.allure_utils import AllureCaseReporter
+
+
+def _case(description, total, tag=None):
+    case = {
+        "description": description,
+        "steps": [
+            {
+                "function": "int_add",
+                "input_args": [1, 2],
+                "expected_result": total,
+                "retry_count": 1,
+            }
+        ],
+    }
+    if tag:
+        case["tag"] = tag
+    return case
+
+
+@pytest.fixture
+def suites(tmp_path):
+    first = tmp_path / "first.json"
+    first.write_text(
+        json.dumps(
+            {
+                "description": "first",
+                "test_cases": [
+                    _case("adds", 3),
+                    _case("serial adds", 3, tag=["serial"]),
+                    _case("fails", 4),
+                ],
+            }
+        )
+    )
+    second = tmp_path / "second.json"
+    second.write_text(
+        json.dumps(
+            {
+                "description": "second",
+                "test_cases": [_case("serial only", 3, tag="serial"), _case("adds", 3)],
+            }
+        )
+    )
+    return [str(first), str(second)]
+
+
+def _results(alluredir):
+    return [
+        json.loads(path.read_text()) for path in alluredir.glob("*-result.json")
+    ]
+
+
+def test_collect_jobs_keeps_serial_cases_out_of_the_pool(suites):
+    parallel, serial = parallel_runner.collect_jobs(suites)
+    assert [(path, index) for path, index, _, _ in parallel] == [
+        (suites[0], 0),
+        (suites[0], 2),
+        (suites[1], 1),
+    ]
+    assert [(path, index) for path, index, _, _ in serial] == [
+        (suites[0], 1),
+        (suites[1], 0),
+    ]
+    assert {name for _, _, name, _ in parallel} == {"first", "second"}
+
+
+def test_run_suites_shards_cases_and_lists_them_in_suite_order(suites, tmp_path):
+    alluredir = tmp_path / "allure"
+    outcomes = parallel_runner.run_suites(suites, workers=2, alluredir=str(alluredir))
+
+    assert [(o.suite, o.index, o.status) for o in outcomes] == [
+        (suites[0], 0, "PASSED"),
+        (suites[0], 1, "PASSED"),
+        (suites[0], 2, "FAILED"),
+        (suites[1], 0, "PASSED"),
+        (suites[1], 1, "PASSED"),
+    ]
+    assert "does not match" in outcomes[2].error
+
+    results = _results(alluredir)
+    assert sorted(r["fullName"] for r in results) == sorted(
+        f"{o.suite}::{o.index}" for o in outcomes
+    )
+    statuses = {r["fullName"]: r["status"] for r in results}
+    assert statuses[f"{suites[0]}::2"] == "failed"
+    assert statuses[f"{suites[1]}::0"] == "passed"
+    assert {label["value"] for r in results for label in r["labels"]} == {
+        "first",
+        "second",
+    }
+
+
+def test_serial_cases_report_once_per_run(suites, tmp_path):
+    for run in range(2):
+        alluredir = tmp_path / f"allure-{run}"
+        parallel_runner.run_suites(suites[1:], workers=1, alluredir=str(alluredir))
+        assert len(_results(alluredir)) == 2
+    # the main process's reporter is gone once the run is over
+    assert not any(
+        isinstance(plugin, AllureCaseReporter)
+        for plugin in plugin_manager.get_plugins()
+    )
@@ -0,0 +1,104 @@
+import asyncio
+import pytest
+from src.async_case_runner import AsyncCaseRunner
+from src.case_runner import CaseRunner
+from src.functions.function_pool import FunctionPool
+from src.utils import profiling
+from src.utils.case_utils import _parse_test_case
+
+
+def churn(n):
+    kept = [str(i) * 10 for i in range(n)]
+    return len(kept)
+
+
+async def async_churn(n):
+    return churn(n)
+
+
+@pytest.fixture
+def pool():
+    pool = FunctionPool()
+    pool.register("churn", churn)
+    pool.register("async_churn", async_churn)
+    return pool
+
+
+@pytest.fixture
+def profiler(tmp_path, monkeypatch):
+    profiler = profiling.Profiler()
+    profiler.directory = tmp_path
+    monkeypatch.setattr(profiling, "profiler", profiler)
+    monkeypatch.setattr("src.case_runner.profiler", profiler)
+    yield profiler
+    # rather than at exit, where it would log its summary after pytest's
+    profiler.finish()
+
+
+def _case(profile=False, tag=None, function="churn"):
+    return _parse_test_case(
+        {
+            "description": "churning",
+            "tag": tag,
+            "steps": [
+                {
+                    "function": function,
+                    "input_args": [1000],
+                    "expected_result": 1000,
+                    "description": "churn",
+                    "profile": profile,
+                }
+            ],
+        }
+    )
+
+
+def test_only_steps_asking_for_it_are_profiled_by_default(pool, profiler, tmp_path):
+    CaseRunner(pool).execute_test_case(_case())
+    assert list(tmp_path.iterdir()) == []
+
+    CaseRunner(pool).execute_test_case(_case(profile=True))
+    step_dir = tmp_path / "churning"
+    assert sorted(p.name for p in step_dir.iterdir()) == [
+        "Step_1_churn.mem.txt",
+        "Step_1_churn.prof",
+    ]
+    assert "net growth" in (step_dir / "Step_1_churn.mem.txt").read_text()
+    assert "churn" in profiler.summary()
+
+
+def test_tags_and_all_select_cases(pool, profiler):
+    step = _case().steps[0]
+    profiler.enable(["slow"])
+    assert profiler.wanted(step, _case(tag="slow"))
+    assert profiler.wanted(step, _case(tag=["db", "slow"]))
+    assert not profiler.wanted(step, _case(tag="fast"))
+    profiler.enable()
+    assert profiler.wanted(step, _case(tag="fast"))
+
+
+def test_async_steps_are_profiled(pool, profiler, tmp_path):
+    runner = AsyncCaseRunner(pool)
+    asyncio.run(runner.execute_test_case(_case(True, function="async_churn")))
+    assert (tmp_path / "churning" / "Step_1_churn.prof").exists()
+    assert "churn" in profiler.summary()
+
+
+def test_async_sync_steps_are_profiled_in_the_executor(pool, profiler):
+    runner = AsyncCaseRunner(pool)
+    asyncio.run(runner.execute_test_case(_case(True)))
+    summary = profiler.summary()
+    assert "test_profiling.py" in summary and "(churn)" in summary
+    assert "poll" not in summary
+
+
+def test_run_profiles_are_merged(pool, profiler, tmp_path, capsys):
+    CaseRunner(pool).execute_test_case(_case(profile=True))
+    profiler.finish()
+    assert profiler.summary() == ""
+    run_files = list(tmp_path.glob("run-*.prof"))
+    assert len(run_files) == 1
+
+    assert profiling.main([str(tmp_path), "--top", "5"]) == 0
+    assert "churn" in capsys.readouterr().out
+    assert profiling.main([str(tmp_path / "empty")]) == 1
@@ -0,0 +1,147 @@
+import asyncio
+from contextlib import nullcontext
+from unittest import mock
+
+import allure
+import pytest
+from src.async_case_runner import AsyncCaseRunner
+from src.case_runner import CaseRunner
+from src.functions.function_pool import FunctionPool
+from src.utils import report
+from src.utils.allure_utils import allure_step
+from src.utils.case_utils import _parse_test_case
+from src.utils.report import ReportLevel
+
+
+@pytest.fixture
+def level():
+    previous_level = report.get_report_level()
+    yield report.set_report_level
+    report.set_report_level(previous_level)
+
+
+@pytest.fixture
+def attachments():
+    made = []
+    with mock.patch.object(
+        allure, "attach", side_effect=lambda body, name, **_: made.append(name)
+    ):
+        yield made
+
+
+@pytest.fixture
+def steps():
+    opened = []
+
+    def step(title):
+        opened.append(title)
+        return nullcontext()
+
+    with mock.patch.object(allure, "step", side_effect=step):
+        yield opened
+
+
+def _attach_all():
+    for attachment_level in ReportLevel:
+        if attachment_level != ReportLevel.OFF:
+            report.attach_text(attachment_level.name, lambda: "body", attachment_level)
+
+
+def test_level_parses_names_from_the_environment():
+    assert ReportLevel.parse("failures-only") == ReportLevel.FAILURES_ONLY
+    assert ReportLevel.parse(" Summary ") == ReportLevel.SUMMARY
+    with pytest.raises(ValueError, match="off, failures-only, summary, full"):
+        ReportLevel.parse("verbose")
+
+
+@pytest.mark.parametrize(
+    "current, expected",
+    [
+        (ReportLevel.OFF, []),
+        (ReportLevel.FAILURES_ONLY, ["FAILURES_ONLY"]),
+        (ReportLevel.SUMMARY, ["FAILURES_ONLY", "SUMMARY"]),
+        (ReportLevel.FULL, ["FAILURES_ONLY", "SUMMARY", "FULL"]),
+    ],
+)
+def test_attachments_up_to_the_level_are_made(level, attachments, current, expected):
+    level(current)
+    _attach_all()
+    assert attachments == expected
+
+
+def test_producers_of_dropped_attachments_are_not_called(level, attachments):
+    level(ReportLevel.SUMMARY)
+    producer = mock.Mock(return_value={"big": "payload"})
+    report.attach_json("full only", producer)
+    producer.assert_not_called()
+    report.attach_json("summary", producer, ReportLevel.SUMMARY)
+    producer.assert_called_once()
+    assert attachments == ["summary"]
+
+
+def test_deferred_attachments_of_a_passing_block_follow_the_level(
+    level, attachments
+):
+    level(ReportLevel.FAILURES_ONLY)
+    with report.deferred_report():
+        _attach_all()
+        assert attachments == []
+    assert attachments == ["FAILURES_ONLY"]
+
+
+@pytest.mark.parametrize(
+    "current, expected",
+    [
+        (ReportLevel.OFF, []),
+        (ReportLevel.FAILURES_ONLY, ["FAILURES_ONLY", "SUMMARY", "FULL"]),
+    ],
+)
+def test_deferred_attachments_of_a_failing_block_are_all_made(
+    level, attachments, current, expected
+):
+    level(current)
+    with pytest.raises(AssertionError):
+        with report.deferred_report():
+            _attach_all()
+            raise AssertionError("step failed")
+    assert attachments == expected
+
+
+def test_allure_step_checks_the_level_when_the_step_runs(level, steps):
+    level(ReportLevel.FULL)
+
+    @allure_step("decorated at full")
+    def decorated_at_full():
+        return "result"
+
+    level(ReportLevel.OFF)
+
+    @allure_step("decorated at off")
+    def decorated_at_off():
+        return "result"
+
+    assert decorated_at_full() == "result"
+    with allure_step("block at off"):
+        pass
+    assert steps == []
+
+    level(ReportLevel.FULL)
+    assert decorated_at_off() == "result"
+    with allure_step("block at full"):
+        pass
+    assert steps == ["decorated at off", "block at full"]
+
+
+def test_no_steps_or_attachments_with_reporting_off(level, steps, attachments):
+    level(ReportLevel.OFF)
+    test_case = _parse_test_case(
+        {
+            "steps": [
+                {"function": "int_add", "input_args": [1, 2], "expected_result": 3},
+                {"function": "int_add", "input_args": [3], "poll": True},
+            ]
+        }
+    )
+    CaseRunner(FunctionPool()).execute_test_case(test_case)
+    asyncio.run(AsyncCaseRunner(FunctionPool()).execute_test_case(test_case))
+    assert (steps, attachments) == ([], [])
@@ -0,0 +1,97 @@
+import asyncio
+import json
+from unittest import mock
+
+import allure
+import pytest
+from src.api_clients import simple_client
+from src.api_clients.async_client import AsyncHTTPClient
+from src.api_clients.simple_client import HTTPClient
+from src.functions.function_pool import FunctionPool
+from src.utils import report
+
+
+@pytest.fixture
+def attachments():
+    made = {}
+
+    def record(body, name, attachment_type=None):
+        made[name] = (body, attachment_type)
+
+    with mock.patch.object(allure, "attach", side_effect=record):
+        yield made
+
+
+def test_truncate_cuts_and_notes_what_was_dropped():
+    assert report.truncate(b"abcdef", 4) == (b"abcd\n... [2 more bytes truncated]", True)
+    assert report.truncate("abc", 4) == ("abc", False)
+    assert report.truncate("abcdef", 0) == ("abcdef", False)
+
+
+def test_json_is_parsed_once_and_shared_with_the_report(base_url, attachments):
+    client = HTTPClient(base_url)
+    with mock.patch.object(
+        simple_client, "json", wraps=json
+    ) as client_json, mock.patch.object(report, "_pretty", True):
+        assert client.echo({"id": 1}) == {"id": 1}
+    assert client_json.loads.call_count == 1
+    body, attachment_type = attachments["Response Body"]
+    assert json.loads(body) == {"id": 1}
+    assert attachment_type == allure.attachment_type.JSON
+
+
+def test_attachments_are_capped(base_url, attachments, monkeypatch):
+    monkeypatch.setattr(report, "_attachment_limit", 16)
+    client = HTTPClient(base_url)
+    assert client.echo({"data": "x" * 100}) == {"data": "x" * 100}
+    body, attachment_type = attachments["Response Body"]
+    assert body.startswith(b'{"data":')
+    assert body.endswith(b"more bytes truncated]")
+    assert attachment_type == allure.attachment_type.TEXT
+    assert attachments["cURL Command"][0].endswith("more bytes truncated]")
+
+
+def test_stream_leaves_the_body_to_the_step(base_url, attachments):
+    client = HTTPClient(base_url)
+    chunks = client.stream("post", "/api/echo", chunk_size=4, json={"id": 1})
+    assert attachments["Response Body"][0] == "(streamed to the step, not kept)"
+    assert json.loads(b"".join(chunks)) == {"id": 1}
+
+
+def test_body_view_and_stream_are_step_functions(base_url):
+    client = HTTPClient(base_url)
+    pool = FunctionPool()
+    with mock.patch("src.api_clients.my_client", client, create=True):
+        view = pool.get_function("body_view")("/api/health")
+        assert isinstance(view, memoryview)
+        assert json.loads(bytes(view))["health"] == "healthy"
+        chunks = pool.get_function("stream_body")("/api/health", chunk_size=8)
+        assert json.loads(b"".join(chunks))["health"] == "healthy"
+
+
+def test_async_stream(base_url):
+    async def run():
+        async with AsyncHTTPClient(base_url) as client:
+            chunks = await client.stream("post", "/api/echo", json={"id": 2})
+            body = b"".join([chunk async for chunk in chunks])
+            view = await client.body_view("get", "/api/health")
+            return body, view, await client.echo({"id": 3})
+
+    body, view, echoed = asyncio.run(run())
+    assert json.loads(body) == {"id": 2}
+    assert json.loads(bytes(view))["health"] == "healthy"
+    assert echoed == {"id": 3}
+
+
+def test_async_client_is_closed_with_each_event_loop(base_url):
+    client = AsyncHTTPClient(base_url)
+    opened = []
+
+    async def run():
+        assert await client.echo({"id": 1}) == {"id": 1}
+        opened.append(client.client)
+
+    asyncio.run(run())
+    asyncio.run(run())
+    assert opened[0] is not opened[1]
+    assert [httpx_client.is_closed for httpx_client in opened] == [True, True]
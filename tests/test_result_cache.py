@@ -0,0 +1,100 @@
+import pytest
+from src.case_runner import CaseRunner
+from src.functions import markers
+from src.functions.function_pool import FunctionPool
+from src.utils.case_utils import _parse_test_case
+from src.utils.result_cache import ResultCache
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def pool(calls):
+    pool = FunctionPool()
+
+    def counted(value):
+        calls.append(value)
+        return value
+
+    @markers.nondeterministic
+    def random_value(value):
+        calls.append(value)
+        return value
+
+    pool.register("counted", counted)
+    pool.register("random_value", random_value)
+    return pool
+
+
+@pytest.fixture
+def runner(pool, tmp_path):
+    return CaseRunner(pool, ResultCache(tmp_path / "results"))
+
+
+def _case(function="counted", expected=1, **extra):
+    return _parse_test_case(
+        {
+            "steps": [
+                {
+                    "function": function,
+                    "input_args": [1],
+                    "expected_result": expected,
+                    "retry_count": 1,
+                }
+            ],
+            **extra,
+        }
+    )
+
+
+def test_unchanged_passed_case_is_replayed(runner, calls):
+    first = runner.execute_test_case(_case())
+    second = runner.execute_test_case(_case())
+    assert calls == [1]
+    assert second["cached"] is True
+    assert second["status"] == first["status"] == "PASSED"
+
+
+def test_failed_case_runs_again(runner, calls):
+    for _ in range(2):
+        with pytest.raises(AssertionError):
+            runner.execute_test_case(_case(expected=2))
+    assert calls == [1, 1]
+
+
+@pytest.mark.parametrize(
+    "case",
+    [_case(function="random_value"), _case(tag="nocache")],
+    ids=["nondeterministic", "nocache"],
+)
+def test_uncacheable_cases_always_run(runner, calls, case):
+    runner.execute_test_case(case)
+    runner.execute_test_case(case)
+    assert calls == [1, 1]
+
+
+def test_key_covers_case_and_selected_env(runner, monkeypatch):
+    cache, functions = runner.result_cache, runner.function_pool.get_function
+    key = cache.key(_case(), functions)
+    assert cache.key(_case(), functions) == key
+    assert cache.key(_case(expected=3), functions) != key
+
+    monkeypatch.setenv("SIMPLYTEST_RESULT_CACHE_ENV", "TARGET_URL")
+    monkeypatch.setenv("TARGET_URL", "http://a")
+    with_env = cache.key(_case(), functions)
+    monkeypatch.setenv("TARGET_URL", "http://b")
+    assert cache.key(_case(), functions) != with_env
+
+
+def test_changed_and_failed_cases_go_first(runner):
+    passed, failed, new = _case(), _case(expected=2), _case(expected=3)
+    runner.execute_test_case(passed)
+    with pytest.raises(AssertionError):
+        runner.execute_test_case(failed)
+    ordered = runner.result_cache.prioritize(
+        [passed, failed, new], runner.function_pool.get_function
+    )
+    assert ordered == [failed, new, passed]
@@ -0,0 +1,114 @@
+import asyncio
+import pytest
+from src.async_case_runner import AsyncCaseRunner
+from src.case_runner import CaseRunner
+from src.functions.function_pool import FunctionPool
+from src.utils import retrying
+from src.utils.case_utils import TestCase, _parse_step
+from src.utils.retrying import RetryPolicy
+
+
+def _flaky(failures, exc=AssertionError):
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise exc("not yet")
+        return len(calls)
+
+    return func, calls
+
+
+def test_backoff_is_capped():
+    policy = RetryPolicy(delay=1, backoff=2, max_delay=5)
+    delays = policy.delays()
+    assert [next(delays) for _ in range(5)] == [1, 2, 4, 5, 5]
+
+
+def test_jitter_stays_within_bounds():
+    delays = RetryPolicy(delay=1, jitter=0.5).delays()
+    assert all(0.5 <= next(delays) <= 1.5 for _ in range(100))
+
+
+def test_call_retries_until_success():
+    func, calls = _flaky(2)
+    assert retrying.call(func, RetryPolicy(tries=3, delay=0)) == 3
+
+
+def test_call_gives_up_after_tries():
+    func, calls = _flaky(5)
+    with pytest.raises(AssertionError):
+        retrying.call(func, RetryPolicy(tries=2, delay=0))
+    assert len(calls) == 2
+
+
+def test_deadline_replaces_tries():
+    func, calls = _flaky(1000)
+    with pytest.raises(AssertionError):
+        retrying.call(func, RetryPolicy(tries=None, delay=0.01, deadline=0.05))
+    assert 2 <= len(calls) <= 6
+
+
+def test_only_listed_exceptions_are_retried():
+    func, calls = _flaky(1, ConnectionError)
+    with pytest.raises(ConnectionError):
+        retrying.call(func, RetryPolicy(delay=0))
+    assert len(calls) == 1
+
+    func, calls = _flaky(1, ConnectionError)
+    exceptions = (AssertionError, *retrying.exception_classes(["connection"]))
+    assert retrying.call(func, RetryPolicy(delay=0, exceptions=exceptions)) == 2
+
+
+def test_unknown_retry_on_fails_at_load():
+    with pytest.raises(ValueError, match="not a known exception class"):
+        _parse_step({"function": "echo", "retry_on": ["NoSuchError"]})
+
+
+def test_step_without_retry_options_shares_default_policy():
+    step = _parse_step({"function": "echo"})
+    assert step.retry_policy is retrying.DEFAULT_POLICY
+    deadline_only = _parse_step({"function": "echo", "retry_deadline": 5})
+    assert deadline_only.retry_policy.tries is None
+
+
+def test_poll_reports_only_last_attempt(monkeypatch):
+    pool = FunctionPool()
+    func, calls = _flaky(3)
+    pool.register("flaky", func)
+    runner = CaseRunner(pool)
+    attached = []
+    monkeypatch.setattr(
+        runner, "_attach_step_input", lambda args, kwargs: attached.append(args)
+    )
+    step = _parse_step(
+        {"function": "flaky", "poll": True, "retry_delay": 0, "retry_count": 5}
+    )
+    runner.execute_test_case(TestCase(steps=[step]))
+
+    assert len(calls) == 4
+    assert len(attached) == 1
+    assert runner.ctx.steps[0].attempts == 4
+
+
+def test_poll_reraises_when_the_function_itself_fails():
+    pool = FunctionPool()
+
+    def check():
+        assert False, "backend not ready"
+
+    pool.register("check", check)
+    step = _parse_step(
+        {
+            "function": "check",
+            "poll": True,
+            "retry_delay": 0,
+            "retry_count": 2,
+            "expected_result": True,
+        }
+    )
+    with pytest.raises(AssertionError, match="backend not ready"):
+        CaseRunner(pool).execute_test_case(TestCase(steps=[step]))
+    with pytest.raises(AssertionError, match="backend not ready"):
+        asyncio.run(AsyncCaseRunner(pool).execute_test_case(TestCase(steps=[step])))
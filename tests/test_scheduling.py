@@ -0,0 +1,170 @@
+import socket
+import time
+import unittest
+import pytest
+import requests
+from src.api_clients.circuit import CircuitBreaker, CircuitOpenError
+from src.api_clients.simple_client import HTTPClient
+from src.case_runner import CaseRunner
+from src.functions.function_pool import FunctionPool
+from src.load_runner import LoadRunner
+from src.utils import case_history
+from src.utils.case_history import CaseHistory
+from src.utils.case_utils import _parse_test_case
+
+
+@pytest.fixture
+def closed_url():
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        port = s.getsockname()[1]
+    return f"http://localhost:{port}"
+
+
+def test_circuit_opens_after_consecutive_connection_failures(closed_url):
+    client = HTTPClient(closed_url, breaker=CircuitBreaker(threshold=2))
+    for _ in range(2):
+        with pytest.raises(requests.ConnectionError):
+            client.get("/api/health")
+    client.session.get_adapter = None  # any real request would fail
+    with pytest.raises(CircuitOpenError, match="2 connection failures"):
+        client.get("/api/health")
+    assert isinstance(CircuitOpenError(), unittest.SkipTest)
+
+
+def test_one_probe_after_the_cooldown(closed_url):
+    breaker = CircuitBreaker(threshold=1, cooldown=0.05)
+    error = ConnectionError("refused")
+    breaker.failure(closed_url, error)
+    with pytest.raises(CircuitOpenError):
+        breaker.check(closed_url)
+    time.sleep(0.05)
+    breaker.check(closed_url)  # the probe
+    with pytest.raises(CircuitOpenError):
+        breaker.check(closed_url)
+    breaker.success(closed_url)
+    breaker.check(closed_url)
+    assert not breaker.is_open(closed_url)
+
+
+def test_disabled_by_default(closed_url):
+    breaker = CircuitBreaker(threshold=0)
+    for _ in range(10):
+        breaker.failure(closed_url, ConnectionError())
+    breaker.check(closed_url)
+
+
+def test_open_circuit_skips_the_case_without_retrying(closed_url):
+    client = HTTPClient(closed_url, breaker=CircuitBreaker(threshold=1))
+    calls = []
+
+    def health():
+        calls.append(1)
+        return client.get("/api/health").status_code
+
+    pool = FunctionPool()
+    pool.register("health", health)
+    case = _parse_test_case(
+        {
+            "description": "health",
+            "steps": [
+                {
+                    "function": "health",
+                    "expected_result": 200,
+                    "retry_on": ["connection"],
+                    "retry_count": 5,
+                    "retry_delay": 0,
+                }
+            ],
+        }
+    )
+    runner = CaseRunner(pool)
+    with pytest.raises(CircuitOpenError):
+        runner.execute_test_case(case)
+    assert len(calls) == 2  # the failed connection, then the open circuit
+    assert runner.ctx.status == "SKIPPED"
+
+
+def test_history_runs_likely_failures_first(tmp_path):
+    history = CaseHistory(tmp_path / "history.json")
+    history.record("a", "PASSED", 0.1)
+    history.record("b", "FAILED", 2.0)
+    history.record("c", "BROKEN", 0.5)
+    history.record("d", "SKIPPED", 0.0)
+    history.save()
+
+    history = CaseHistory(tmp_path / "history.json")
+    assert "d" not in history.records()
+    assert history.prioritize(["a", "b", "c", "new"]) == [3, 2, 1, 0]
+
+    history.record("b", "PASSED", 2.0)
+    history.save()
+    record = history.records()["b"]
+    assert record["runs"] == 2
+    assert record["failure_rate"] == pytest.approx(1 - case_history.WEIGHT)
+
+
+def test_pending_runs_are_folded_per_case(tmp_path):
+    statuses = ["FAILED", "PASSED", "PASSED", "BROKEN", "PASSED"]
+    one_by_one = CaseHistory(tmp_path / "one_by_one.json")
+    folded = CaseHistory(tmp_path / "folded.json")
+    for history in (one_by_one, folded):
+        history.record("a", "PASSED", 1.0)
+        history.save()
+    for n, status in enumerate(statuses):
+        one_by_one.record("a", status, float(n))
+        one_by_one.save()
+        folded.record("a", status, float(n))
+    pending = folded.drain()
+    assert list(pending) == ["a"] and pending["a"].runs == len(statuses)
+
+    worker = CaseHistory(tmp_path / "folded.json")
+    worker.record("a", "FAILED", 10.0)
+    folded.extend(pending)
+    folded.extend(worker.drain())
+    folded.save()
+    one_by_one.record("a", "FAILED", 10.0)
+    one_by_one.save()
+
+    expected, record = one_by_one.records()["a"], folded.records()["a"]
+    assert record["runs"] == expected["runs"] == 7
+    assert record["failure_rate"] == pytest.approx(expected["failure_rate"])
+    assert record["duration"] == pytest.approx(expected["duration"])
+
+
+def test_cases_are_recorded_only_with_the_history_on(monkeypatch):
+    test_case = _parse_test_case(
+        {"description": "adds", "steps": [{"function": "int_add", "input_args": [1]}]}
+    )
+    key = case_history.case_key(test_case.suite, test_case.description)
+    monkeypatch.delenv(case_history.SCHEDULE_ENV, raising=False)
+    monkeypatch.delenv(case_history.HISTORY_ENV, raising=False)
+    assert CaseRunner(FunctionPool()).case_history is None
+    monkeypatch.setenv(case_history.HISTORY_ENV, "1")
+    assert CaseRunner(FunctionPool()).case_history is case_history.history
+
+    monkeypatch.setenv(case_history.HISTORY_ENV, "0")
+    monkeypatch.setenv(case_history.SCHEDULE_ENV, case_history.HISTORY_ORDER)
+    runner = CaseRunner(FunctionPool())
+    runner.case_history = CaseHistory()
+    runner.execute_test_case(test_case)
+    assert list(runner.case_history.drain()) == [key]
+
+    LoadRunner([test_case], FunctionPool()).run_with_concurrency(2, 0.2)
+    assert case_history.history.drain() == {}
+
+
+def test_history_updates_travel_between_processes(tmp_path):
+    worker, main = CaseHistory(tmp_path / "h.json"), CaseHistory(tmp_path / "h.json")
+    worker.record("a", "FAILED", 1.0)
+    main.extend(worker.drain())
+    worker.save()  # nothing left to write
+    assert not (tmp_path / "h.json").exists()
+    main.save()
+    assert main.records()["a"]["failure_rate"] == 1.0
+
+
+def test_schedule_is_validated(monkeypatch):
+    monkeypatch.setenv(case_history.SCHEDULE_ENV, "random")
+    with pytest.raises(ValueError, match="file, history"):
+        case_history.schedule()
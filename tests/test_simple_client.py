@@ -0,0 +1,23 @@
+import pytest
+from src.api_clients.simple_client import HTTPClient
+
+
+def test_keep_alive_reuses_one_connection(base_url):
+    with HTTPClient(base_url) as client:
+        for i in range(5):
+            assert client.echo({"id": i}) == {"id": i}
+        stats = client.stats
+    assert stats.requests == 5
+    assert stats.connections_opened == 1
+    assert stats.connections_reused == 4
+    assert stats.reuse_rate == pytest.approx(0.8)
+    assert stats.connect_time > 0
+
+
+def test_without_keep_alive_every_request_connects(base_url):
+    with HTTPClient(base_url, keep_alive=False) as client:
+        for i in range(3):
+            client.health_check()
+        assert (client.stats.connections_opened, client.stats.reuse_rate) == (3, 0.0)
+        client.reset_stats()
+        assert client.stats.as_dict()["requests"] == 0
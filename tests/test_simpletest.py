@@ -1,15 +1,23 @@
 import pytest
 import allure
 from src.case_runner import case_runner as runner
-from src.utils.case_utils import load_test_cases
+from src.utils.case_utils import iter_case_refs
 
+SUITE = "tests/simpletest.json"
 
-test_suites = load_test_cases("tests/simpletest.json")
+# only where each case is: every case is parsed when its test runs
+suite_header = {}
+case_refs = list(iter_case_refs(SUITE, suite_header))
 
 
-@allure.feature(test_suites.description)
+@allure.feature(suite_header.get("description", "No description"))
 class TestSimpleTestOne:
-    @pytest.mark.parametrize("test_case", test_suites.test_cases)
-    def test_my_func(self, test_case):
-        # print("runing test case:", test_case.description)
-        runner.execute_test_case(test_case)
+    @classmethod
+    def teardown_class(cls):
+        # suite scoped setups end with the suite, not with the session
+        runner.finish_suite(SUITE)
+
+    @pytest.mark.parametrize("case_ref", case_refs)
+    def test_my_func(self, case_ref):
+        # print("runing test case:", case_ref.description)
+        runner.execute_test_case(case_ref.load())
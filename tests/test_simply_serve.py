@@ -0,0 +1,60 @@
+import http.client
+import json
+import threading
+import pytest
+from simply_serve import Route, make_server
+
+
+@pytest.fixture
+def server():
+    routes = [
+        Route("GET", "/api/slow", body={"ok": True}, latency=0.05),
+        Route("GET", "/api/broken", error_rate=1, error_status=503),
+        Route("GET", "/api/dropped", drop_rate=1),
+    ]
+    server = make_server("localhost", 0, routes)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _connect(server):
+    return http.client.HTTPConnection("localhost", server.server_address[1], timeout=5)
+
+
+def test_connection_is_kept_alive(server):
+    conn = _connect(server)
+    for payload in ({"a": 1}, [1, 2], "text"):
+        conn.request("POST", "/api/echo", body=json.dumps(payload))
+        response = conn.getresponse()
+        assert json.loads(response.read()) == payload
+        sock = conn.sock
+    conn.request("GET", "/api/health")
+    response = conn.getresponse()
+    assert json.loads(response.read())["health"] == "healthy"
+    # still the same socket: the server never closed the connection
+    assert conn.sock is sock
+
+
+def test_latency_and_error_injection(server):
+    conn = _connect(server)
+    conn.request("GET", "/api/broken")
+    response = conn.getresponse()
+    assert response.status == 503
+    assert json.loads(response.read())["error"] == "injected failure"
+
+    conn.request("GET", "/api/slow")
+    assert json.loads(conn.getresponse().read()) == {"ok": True}
+
+    conn.request("GET", "/api/dropped")
+    with pytest.raises(http.client.RemoteDisconnected):
+        conn.getresponse()
+
+
+def test_unknown_route(server):
+    conn = _connect(server)
+    conn.request("GET", "/nope")
+    response = conn.getresponse()
+    assert (response.status, response.read()) == (404, b"Not Found")
@@ -0,0 +1,111 @@
+import asyncio
+import time
+import pytest
+from src.async_case_runner import AsyncCaseRunner
+from src.case_runner import CaseRunner
+from src.functions.function_pool import FunctionPool
+from src.utils.case_utils import _parse_test_case
+
+
+def _step(value, save="", **extra):
+    return {
+        "function": "slow_echo",
+        "input_args": [value],
+        "save_result_to": save,
+        **extra,
+    }
+
+
+@pytest.fixture
+def pool():
+    pool = FunctionPool()
+
+    def slow_echo(value):
+        time.sleep(0.2)
+        return value
+
+    async def async_slow_echo(value):
+        await asyncio.sleep(0.2)
+        return value
+
+    pool.register("slow_echo", slow_echo)
+    pool.register("async_slow_echo", async_slow_echo)
+    return pool
+
+
+def _case(steps):
+    return _parse_test_case({"parallel_steps": True, "steps": steps})
+
+
+def test_dependencies_follow_data_flow():
+    case = _case(
+        [
+            _step(1, "a"),
+            _step(2, "b"),
+            _step("${a}-${b}", "c"),
+            _step(3, "a"),  # must not overtake the read of ${a} above
+            _step(4, name="last", depends_on=[]),
+            _step(5, depends_on=["last"]),
+        ]
+    )
+    assert case.step_dependencies == (
+        frozenset(),
+        frozenset(),
+        frozenset({0, 1}),
+        frozenset({0, 2}),
+        frozenset(),
+        frozenset({4}),
+    )
+
+
+def test_dependency_cycle_is_rejected():
+    with pytest.raises(ValueError, match="depend on each other"):
+        _case(
+            [
+                _step(1, name="x", depends_on=["y"]),
+                _step(2, name="y", depends_on=["x"]),
+            ]
+        )
+
+
+def test_unknown_dependency_is_rejected():
+    with pytest.raises(ValueError, match="not found"):
+        _case([_step(1, depends_on=["nope"])])
+
+
+def test_independent_steps_run_concurrently(pool):
+    case = _case(
+        [
+            _step(1, "a"),
+            _step(2, "b"),
+            _step(3, "c"),
+            _step("${a}${b}${c}", expected_result="123"),
+        ]
+    )
+    runner = CaseRunner(pool)
+    start = time.perf_counter()
+    runner.execute_test_case(case)
+    # three independent steps, then the one reading all of them
+    assert time.perf_counter() - start < 0.7
+    assert [r.step.input_args for r in runner.ctx.steps] == [
+        s.input_args for s in case.steps
+    ]
+
+
+def test_failure_stops_dependent_steps(pool):
+    case = _case([_step(1, "a", expected_result=2, retry_count=1), _step("${a}")])
+    runner = CaseRunner(pool)
+    with pytest.raises(AssertionError):
+        runner.execute_test_case(case)
+    assert [r.status for r in runner.ctx.steps] == ["FAILED"]
+
+
+def test_async_runner_runs_independent_steps_concurrently(pool):
+    case = _case(
+        [{**_step(i, f"v{i}"), "function": "async_slow_echo"} for i in range(5)]
+    )
+    runner = AsyncCaseRunner(pool)
+    start = time.perf_counter()
+    result = asyncio.run(runner.execute_test_case(case))
+    assert result["status"] == "PASSED"
+    assert time.perf_counter() - start < 0.6
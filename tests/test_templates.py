@@ -0,0 +1,65 @@
+import pytest
+from src.utils.templates import Template
+
+
+VARIABLES = {
+    "x": 7,
+    "zero": 0,
+    "empty": "",
+    "res_1": {"items": [{"id": "a"}, {"id": "b"}]},
+}
+
+
+@pytest.mark.parametrize(
+    "source, expected",
+    [
+        ("${x}", 7),
+        ("id-${x}", "id-7"),
+        ("${x}-${x}", "7-7"),
+        ("${zero}", 0),
+        ("${empty}", ""),
+        ("${res_1.items[1].id}", "b"),
+        (["${x}", {"k": ["${zero}", 3]}], [7, {"k": [0, 3]}]),
+        ("no placeholders", "no placeholders"),
+    ],
+)
+def test_render(source, expected):
+    assert Template(source).render(VARIABLES) == expected
+
+
+def test_render_leaves_source_untouched():
+    source = {"a": ["${x}"], "b": {"big": list(range(100))}}
+    rendered = Template(source).render(VARIABLES)
+    assert rendered == {"a": [7], "b": {"big": list(range(100))}}
+    assert source["a"] == ["${x}"]
+    # containers without placeholders are shared, not copied
+    assert rendered["b"] is source["b"]
+
+
+def test_missing_variable():
+    with pytest.raises(ValueError, match="not found in context"):
+        Template("${missing.path}").render(VARIABLES)
+
+
+def test_references():
+    template = Template({"a": "${x}", "b": ["id-${res_1.items[0]}"]})
+    assert template.references == {"x", "res_1"}
+
+
+@pytest.mark.parametrize(
+    "source, expected",
+    [
+        ("${res_1.items[0].{key: id}}", {"key": "a"}),
+        ("ids: ${res_1.items[*].{id: id}}", "ids: [{'id': 'a'}, {'id': 'b'}]"),
+        ("${res_1.items[?id == '}'] | length(@)}", 0),
+        ("{literal} ${x} {braces}", "{literal} 7 {braces}"),
+    ],
+)
+def test_placeholders_with_braces(source, expected):
+    assert Template(source).render(VARIABLES) == expected
+
+
+@pytest.mark.parametrize("source", ["${res_1.{id: id}", "${x", "a ${}"])
+def test_malformed_placeholders_fail_at_compile(source):
+    with pytest.raises(ValueError, match="unterminated|empty"):
+        Template(source)
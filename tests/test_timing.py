@@ -0,0 +1,66 @@
+import csv
+import json
+import pytest
+from src.case_runner import CaseRunner
+from src.functions.function_pool import FunctionPool
+from src.utils import timing
+from src.utils.case_utils import TestCase, TestStep
+
+
+@pytest.fixture
+def collector(monkeypatch):
+    collector = timing.TimingCollector()
+    collector.enable()
+    monkeypatch.setattr(timing, "collector", collector)
+    return collector
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert timing.percentile(values, 50) == 50
+    assert timing.percentile(values, 99) == 99
+    assert timing.percentile([3.0], 95) == 3.0
+    assert timing.percentile([], 50) == 0.0
+
+
+def test_steps_are_timed_per_phase(collector, tmp_path):
+    case = TestCase(
+        description="timed",
+        steps=[
+            TestStep(
+                function="int_add",
+                input_args=(1, 2),
+                input_kwargs={},
+                expected_result=3,
+            ),
+            TestStep(
+                function="int_add",
+                input_args=(1, 1),
+                input_kwargs={},
+                expected_result=3,
+                retry_count=2,
+                retry_delay=0.01,
+            ),
+        ],
+    )
+    with pytest.raises(AssertionError):
+        CaseRunner(FunctionPool()).execute_test_case(case)
+
+    passed, failed = collector.steps
+    assert (passed["status"], passed["attempts"]) == ("PASSED", 1)
+    assert (failed["status"], failed["attempts"]) == ("FAILED", 2)
+    assert failed["retry_sleep"] >= 0.01
+    assert passed[timing.CALL] <= passed["duration"]
+    assert collector.cases == [
+        {"case": "timed", "status": "FAILED", "duration": collector.cases[0]["duration"]}
+    ]
+
+    aggregates = collector.aggregates()["int_add"]
+    assert (aggregates["count"], aggregates["attempts"], aggregates["failures"]) == (2, 3, 1)
+
+    collector.write(str(tmp_path / "timing.json"))
+    assert json.loads((tmp_path / "timing.json").read_text())["functions"]["int_add"]
+    collector.write(str(tmp_path / "timing.csv"))
+    with open(tmp_path / "timing.csv") as f:
+        kinds = [row["kind"] for row in csv.DictReader(f)]
+    assert kinds == ["case", "step", "step", "function"]